@@ -0,0 +1,64 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compare the time to load an episode from the filesystem cache when its
+compact dtypes are computed after each load, as previous versions did, and
+when the episode is saved with them, in the pickle and the columnar formats.
+
+Usage: python benchmarks/benchmark_cache_load.py [agents_dir] [agent] [scenario]
+"""
+
+import os
+import sys
+import tempfile
+
+from grid2viz.src.kpi import compression, episode_store
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
+
+from benchmark_fs_cache import load_columnar, load_pickle, timeit
+
+N_RUNS = 5
+
+
+def read_episode(agent_path, scenario, agent):
+    episode_data = EpisodeReader(agent_path, scenario)
+    episode = EpisodeAnalytics(episode_data, scenario, agent)
+    episode.decorate_light_without_reboot(episode_data)
+    return episode
+
+
+def optimize_after_load(load, opt_obs_act):
+    def load_and_optimize(path, agent_path):
+        episode = load(path, agent_path)
+        episode.optimize_memory_footprint(opt_obs_act=opt_obs_act)
+        return episode
+
+    return load_and_optimize
+
+
+if __name__ == "__main__":
+    agents_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("tests", "data", "agents")
+    agent = sys.argv[2] if len(sys.argv) > 2 else "greedy-baseline"
+    scenario = sys.argv[3] if len(sys.argv) > 3 else "000"
+    agent_path = os.path.join(agents_dir, agent)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for format_name, save, load, opt_obs_act in [
+            ("pickle", compression.dump, load_pickle, True),
+            ("columnar", episode_store.save_episode, load_columnar, False),
+        ]:
+            for name, optimized in [("optimized after load", False), ("saved optimized", True)]:
+                episode = read_episode(agent_path, scenario, agent)
+                if optimized:
+                    episode.optimize_memory_footprint(opt_obs_act=opt_obs_act)
+                path = os.path.join(cache_dir, f"{format_name}_{optimized}")
+                if format_name == "pickle":
+                    save(episode, path)
+                else:
+                    save(path, episode)
+                loader = load if optimized else optimize_after_load(load, opt_obs_act)
+                load_time = min(timeit(loader, path, agent_path)[0] for _ in range(N_RUNS))
+                print(f"{format_name:<9}{name:<21}: load {load_time:.3f} s")
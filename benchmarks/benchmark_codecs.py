@@ -0,0 +1,73 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compare the compression codecs of the filesystem cache installed, along with
+gzip at level 9 used by previous versions: size on disk, time to save and
+time to load all the episodes of the agents, in the pickle and the columnar
+formats.
+
+Usage: python benchmarks/benchmark_codecs.py [agents_dir]
+"""
+
+import os
+import sys
+import tempfile
+
+from grid2viz.src.kpi import compression, episode_store
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
+
+from benchmark_fs_cache import load_columnar, size, timeit
+
+
+def read_episodes(agents_dir):
+    episodes = []
+    for agent in sorted(os.listdir(agents_dir)):
+        agent_path = os.path.join(agents_dir, agent)
+        if agent.startswith("_") or not os.path.isdir(agent_path):
+            continue
+        for scenario in sorted(os.listdir(agent_path)):
+            if not os.path.isdir(os.path.join(agent_path, scenario)):
+                continue
+            episode_data = EpisodeReader(agent_path, scenario)
+            episode = EpisodeAnalytics(episode_data, scenario, agent)
+            episode.decorate_light_without_reboot(episode_data)
+            episodes.append((agent_path, episode))
+    return episodes
+
+
+def load_pickle(path, agent_path):
+    episode = compression.load(path)
+    episode.decorate_obs_act_spaces(agent_path)
+    return episode
+
+
+if __name__ == "__main__":
+    agents_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("tests", "data", "agents")
+    episodes = read_episodes(agents_dir)
+    print(f"{len(episodes)} episodes, codecs installed: {compression.available_codecs()}")
+
+    codecs = [("gzip-9", "gzip", 9)] + [
+        (codec, codec, None) for codec in compression.available_codecs()
+    ]
+    for name, codec, level in codecs:
+        for format_name in ["pickle", "columnar"]:
+            total_size, save_time, load_time = 0, 0, 0
+            with tempfile.TemporaryDirectory() as cache_dir:
+                for i, (agent_path, episode) in enumerate(episodes):
+                    path = os.path.join(cache_dir, str(i))
+                    if format_name == "pickle":
+                        save_time += timeit(compression.dump, episode, path, codec, level)[0]
+                        load_time += timeit(load_pickle, path, agent_path)[0]
+                    else:
+                        save_time += timeit(
+                            episode_store.save_episode, path, episode, False, codec, level
+                        )[0]
+                        load_time += timeit(load_columnar, path, agent_path)[0]
+                    total_size += size(path)
+            print(
+                f"{name:<7} {format_name:<9}: size {total_size / 1e6:.1f} MB, "
+                f"save {save_time:.3f} s, load {load_time:.3f} s"
+            )
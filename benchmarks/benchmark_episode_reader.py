@@ -0,0 +1,43 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compare the time to load an episode and compute its EpisodeAnalytics from a
+grid2op EpisodeData and from the raw npz matrices of an EpisodeReader.
+
+Usage: python benchmarks/benchmark_episode_reader.py [agents_dir] [agent] [scenario]
+"""
+
+import os
+import sys
+import time
+
+from grid2op.Episode import EpisodeData
+
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
+
+
+def timeit(func, *args):
+    beg = time.perf_counter()
+    res = func(*args)
+    return time.perf_counter() - beg, res
+
+
+if __name__ == "__main__":
+    agents_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("tests", "data", "agents")
+    agent = sys.argv[2] if len(sys.argv) > 2 else "greedy-baseline"
+    scenario = sys.argv[3] if len(sys.argv) > 3 else "000"
+    agent_path = os.path.join(agents_dir, agent)
+
+    for name, reader in [
+        ("EpisodeData.from_disk", EpisodeData.from_disk),
+        ("EpisodeReader", EpisodeReader),
+    ]:
+        load_time, episode_data = timeit(reader, agent_path, scenario)
+        analytics_time, _ = timeit(EpisodeAnalytics, episode_data, scenario, agent)
+        print(
+            f"{name:<22}: load {load_time:.3f} s, EpisodeAnalytics {analytics_time:.3f} s, "
+            f"total {load_time + analytics_time:.3f} s"
+        )
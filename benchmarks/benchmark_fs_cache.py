@@ -0,0 +1,94 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compare the pickle and the columnar formats of the filesystem cache:
+size on disk, time to save an episode, time to load it entirely, time to
+load only the tables of a page (rho and action_data_table) and memory held
+by a loaded episode once one of its observations has been read.
+
+Usage: python benchmarks/benchmark_fs_cache.py [agents_dir] [agent] [scenario]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from grid2viz.src.kpi import compression, episode_store
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
+
+TABLES = ["rho", "action_data_table"]
+
+
+def timeit(func, *args):
+    beg = time.perf_counter()
+    res = func(*args)
+    return time.perf_counter() - beg, res
+
+
+def traced_memory(func, *args):
+    tracemalloc.start()
+    episode = func(*args)
+    episode.observations[37]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memory
+
+
+def size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(path, file_name)) for file_name in os.listdir(path)
+    )
+
+
+def save_pickle(path, episode):
+    # Same as save_in_fs_cache with the pickle format
+    compression.dump(episode, path)
+
+
+def load_pickle(path, agent_path):
+    episode = compression.load(path)
+    episode.decorate_obs_act_spaces(agent_path)
+    return episode
+
+
+def load_columnar(path, agent_path, tables=None):
+    episode = episode_store.load_episode(path)
+    episode.decorate_obs_act_spaces(agent_path)
+    for table in episode_store.EpisodeStore(path).names if tables is None else tables:
+        getattr(episode, table)
+    return episode
+
+
+if __name__ == "__main__":
+    agents_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("tests", "data", "agents")
+    agent = sys.argv[2] if len(sys.argv) > 2 else "greedy-baseline"
+    scenario = sys.argv[3] if len(sys.argv) > 3 else "000"
+    agent_path = os.path.join(agents_dir, agent)
+
+    episode_data = EpisodeReader(agent_path, scenario)
+    episode = EpisodeAnalytics(episode_data, scenario, agent)
+    episode.decorate_light_without_reboot(episode_data)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        pickle_path = os.path.join(cache_dir, agent + ".dill.bz")
+        columnar_path = os.path.join(cache_dir, agent)
+        for name, save, load, path in [
+            ("pickle", save_pickle, load_pickle, pickle_path),
+            ("columnar", episode_store.save_episode, load_columnar, columnar_path),
+        ]:
+            save_time, _ = timeit(save, path, episode)
+            load_time, _ = timeit(load, path, agent_path)
+            memory = traced_memory(load, path, agent_path)
+            print(
+                f"{name:<9}: size {size(path) / 1e6:.1f} MB, save {save_time:.3f} s, "
+                f"load {load_time:.3f} s, memory {memory / 1e6:.1f} MB"
+            )
+        tables_time, _ = timeit(load_columnar, columnar_path, agent_path, TABLES)
+        print(f"columnar : load of {' and '.join(TABLES)} only {tables_time:.3f} s")
@@ -0,0 +1,87 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compare the per time step ``.loc`` filling of the load, production and rho
+tables with the matrix based builder used by EpisodeAnalytics.
+
+Usage: python benchmarks/benchmark_make_df.py [agents_dir] [agent] [scenario]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from grid2op.Episode import EpisodeData
+
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import extract_attributes
+
+
+def loc_based_tables(episode_data):
+    """Reference implementation: one ``.loc`` slice assignment per time step."""
+    size = len(episode_data.actions)
+    n_rho = len(episode_data.observations[0].rho)
+    load_data = pd.DataFrame(
+        index=range(size * episode_data.n_loads), columns=["timestamp", "value"]
+    )
+    production = pd.DataFrame(index=range(size * episode_data.n_prods), columns=["value"])
+    rho = pd.DataFrame(index=range(size * n_rho), columns=["value"])
+    for time_step, obs in enumerate(episode_data.observations[:size]):
+        begin = time_step * episode_data.n_loads
+        end = (time_step + 1) * episode_data.n_loads - 1
+        load_data.loc[begin:end, "value"] = obs.load_p.astype(float)
+        load_data.loc[begin:end, "timestamp"] = EpisodeAnalytics.timestamp(obs)
+        begin = time_step * episode_data.n_prods
+        end = (time_step + 1) * episode_data.n_prods - 1
+        production.loc[begin:end, "value"] = obs.prod_p.astype(float)
+        begin = time_step * n_rho
+        end = (time_step + 1) * n_rho - 1
+        rho.loc[begin:end, "value"] = obs.rho.astype(float)
+    return (
+        load_data["value"].astype("float32"),
+        production["value"].astype("float32"),
+        rho["value"].astype("float16"),
+    )
+
+
+def matrix_based_tables(episode_data):
+    size = len(episode_data.actions)
+    obs_matrices = extract_attributes(
+        episode_data.observations, ["load_p", "gen_p", "rho"], stop=size
+    )
+    return (
+        pd.Series(obs_matrices["load_p"].reshape(-1).astype("float32"), name="value"),
+        pd.Series(obs_matrices["gen_p"].reshape(-1).astype("float32"), name="value"),
+        pd.Series(obs_matrices["rho"].reshape(-1).astype("float16"), name="value"),
+    )
+
+
+def timeit(func, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        beg = time.perf_counter()
+        res = func(*args)
+        timings.append(time.perf_counter() - beg)
+    return min(timings), res
+
+
+if __name__ == "__main__":
+    agents_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join("tests", "data", "agents")
+    agent = sys.argv[2] if len(sys.argv) > 2 else "greedy-baseline"
+    scenario = sys.argv[3] if len(sys.argv) > 3 else "000"
+
+    episode_data = EpisodeData.from_disk(os.path.join(agents_dir, agent), scenario)
+
+    loc_time, loc_res = timeit(loc_based_tables, episode_data, repeat=1)
+    matrix_time, matrix_res = timeit(matrix_based_tables, episode_data)
+    for expected, computed in zip(loc_res, matrix_res):
+        np.testing.assert_array_equal(expected.values, computed.values)
+
+    print(f"{len(episode_data.actions)} time steps of agent {agent} on scenario {scenario}")
+    print(f".loc per time step : {loc_time:.3f} s")
+    print(f"stacked matrices   : {matrix_time:.3f} s")
+    print(f"speedup            : x{loc_time / matrix_time:.1f}")
@@ -35,18 +35,7 @@ from grid2viz.src.overview.overview_clbk import (
 )  # as overview_clbk
 from grid2viz.src.macro.macro_clbk import register_callbacks_macro  # as macro_clbk
 from grid2viz.src.micro.micro_clbk import register_callbacks_micro  # as micro_clbk
-from grid2viz.src.simulation.simulation_clbk import register_callbacks_simulation
-
-try:
-    from grid2viz.src.simulation.ExpertAssist import Assist
-except (ImportError, ModuleNotFoundError):
-    from grid2viz.src.simulation.simulation_assist import EmptyAssist as Assist
-
-    warnings.warn(
-        "ExpertOp4Grid is not installed and the assist feature will not be available."
-        " To use the Assist feature, you can install ExpertOp4Grid by "
-        "\n\t{} -m pip install ExpertOp4Grid\n".format(sys.executable)
-    )
+from grid2viz.src.manager import start_background_tasks
 
 """
 End Warning
@@ -87,6 +76,20 @@ def define_layout_and_callbacks(
     register_callbacks_macro(app)
     register_callbacks_micro(app)
     if activate_simulation:
+        # Imported only now, as they import grid2op and ExpertOp4Grid
+        from grid2viz.src.simulation.simulation_clbk import register_callbacks_simulation
+
+        try:
+            from grid2viz.src.simulation.ExpertAssist import Assist
+        except (ImportError, ModuleNotFoundError):
+            from grid2viz.src.simulation.simulation_assist import EmptyAssist as Assist
+
+            warnings.warn(
+                "ExpertOp4Grid is not installed and the assist feature will not be available."
+                " To use the Assist feature, you can install ExpertOp4Grid by "
+                "\n\t{} -m pip install ExpertOp4Grid\n".format(sys.executable)
+            )
+
         assistant = Assist()
         register_callbacks_simulation(app, assistant)
         assistant.register_callbacks(app)
@@ -96,6 +99,7 @@ def define_layout_and_callbacks(
 
 
 def app_run(port=8050, debug=False, page=None):
+    start_background_tasks()
     if page is not None:
         print(f"Warm start is running on http://127.0.0.1:{port}/{page}")
     app.run_server(port=port, debug=debug)
@@ -36,6 +36,7 @@ from grid2viz.src.overview.overview_clbk import (
 from grid2viz.src.macro.macro_clbk import register_callbacks_macro  # as macro_clbk
 from grid2viz.src.micro.micro_clbk import register_callbacks_micro  # as micro_clbk
 from grid2viz.src.simulation.simulation_clbk import register_callbacks_simulation
+from grid2viz.src.manager import start_background_tasks
 
 try:
     from grid2viz.src.simulation.ExpertAssist import Assist
@@ -101,6 +102,8 @@ app.server.secret_key = "Grid2Viz"
 #define_layout_and_callbacks(activate_simulation=True)
 define_layout_and_callbacks(activate_simulation=False)#as we don't always have the grid2op environment available for demos
 server=app.server
+# Served by the gunicorn workers of the Procfile, without app_run
+start_background_tasks()
 
 
 if __name__ == "__main__":
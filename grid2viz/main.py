@@ -8,9 +8,8 @@ import os
 
 ## A bug can appear with MacOSX if matplotlib is not set to a non-interactive mode
 # issue: https://github.com/matplotlib/matplotlib/issues/14304/
-import matplotlib
-
-matplotlib.use("agg")
+# Set through the environment, matplotlib being only imported when first used
+os.environ.setdefault("MPLBACKEND", "agg")
 
 CONFIG_FILE_CONTENT = """
 # This file have been automatically generated, please do not modify it. 
@@ -19,9 +18,19 @@ CONFIG_FILE_CONTENT = """
 agents_dir={agents_dir}
 env_dir={env_dir}
 n_cores={n_cores}
-# This file will be re generated to each call of "python -m grid2viz.main"
+{options}# This file will be re generated to each call of "python -m grid2viz.main"
 """
 
+# Keys of the DEFAULT section of the --config-path file copied as they are
+CONFIG_FILE_OPTIONS = [
+    "cache_format",
+    "cache_codec",
+    "cache_codec_level",
+    "shared_cache",
+    "ram_cache_budget",
+    "watch_interval",
+]
+
 ARG_AGENTS_PATH_DESC = (
     "The path where the episode logs of the Agents to compare are stored."
     " (default to None to study the example agents provided with the package)"
@@ -36,12 +45,18 @@ ARG_N_CORES_DESC = "The number of cores to use for the first loading of the best
 
 ARG_CACHE_DESC = "Enable the building of  all the cache data for all agents at once before relaunching grid2viz."
 
+ARG_AGENTS_DESC = "With --cache, the names of the only agents whose cache is built. (default to all of them)"
+
+ARG_SCENARIOS_DESC = "With --cache, the names of the only scenarios whose cache is built. (default to all of them)"
+
 ARG_WARM_START_DESC = "Enable the application to warm start to a given section based on the parameters defined in the WARMSTART section of the config.ini file."
 
 ARG_CONFIG_PATH_DESC = "Path to the configuration file config.ini."
 
 ARG_ACTIVATE_BETA_DESC = "Enable beta features. (default to False)"
 
+ARG_PROFILE_STARTUP_DESC = "Print the time taken by each step of the startup and the import time of the slowest packages, then exit without serving the app."
+
 
 def main():
     parser_main = argparse.ArgumentParser(description="Grid2Viz")
@@ -62,6 +77,12 @@ def main():
 
     parser_main.add_argument("--n_cores", default=2, type=int, help=ARG_N_CORES_DESC)
     parser_main.add_argument("--cache", action="store_true", help=ARG_CACHE_DESC)
+    parser_main.add_argument(
+        "--agents", default=None, nargs="+", type=str, help=ARG_AGENTS_DESC
+    )
+    parser_main.add_argument(
+        "--scenarios", default=None, nargs="+", type=str, help=ARG_SCENARIOS_DESC
+    )
     parser_main.add_argument(
         "--warm-start", action="store_true", help=ARG_WARM_START_DESC
     )
@@ -75,6 +96,9 @@ def main():
     parser_main.add_argument(
         "--activate-beta", action="store_true", help=ARG_ACTIVATE_BETA_DESC
     )
+    parser_main.add_argument(
+        "--profile-startup", action="store_true", help=ARG_PROFILE_STARTUP_DESC
+    )
 
     args = parser_main.parse_args()
 
@@ -116,10 +140,18 @@ def main():
 
     n_cores = args.n_cores
 
+    options = ""
+    if args.config_path is not None:
+        parser = configparser.ConfigParser()
+        parser.read(args.config_path)
+        for option in CONFIG_FILE_OPTIONS:
+            if parser.has_option("DEFAULT", option):
+                options += f"{option}={parser.get('DEFAULT', option)}\n"
+
     with open(config_path, "w") as f:
         f.write(
             CONFIG_FILE_CONTENT.format(
-                agents_dir=agents_dir, env_dir=env_dir, n_cores=n_cores
+                agents_dir=agents_dir, env_dir=env_dir, n_cores=n_cores, options=options
             )
         )
 
@@ -127,7 +159,11 @@ def main():
     activate_beta = args.activate_beta
 
     # Inline import to load app only now
-    if is_makeCache_only:
+    if args.profile_startup:
+        from grid2viz.src.utils.startup_profile import profile_startup
+
+        profile_startup(activate_simulation=activate_beta)
+    elif is_makeCache_only:
         from grid2viz.src.manager import (
             scenarios,
             agents,
@@ -135,7 +171,14 @@ def main():
             cache_dir,
             make_cache
         )
-        make_cache(scenarios,agents,n_cores,cache_dir)
+        make_cache(
+            scenarios,
+            agents,
+            n_cores,
+            cache_dir,
+            agent_selection=args.agents,
+            scenario_selection=args.scenarios,
+        )
     else:
         from grid2viz.app import app_run, define_layout_and_callbacks
 
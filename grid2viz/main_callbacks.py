@@ -356,6 +356,7 @@ def register_callbacks_main(app):
         [State("scenario", "data")],
     )
     def update_agent_study_store(agent, scenario):
+        manager.pin_in_ram_cache(scenario, agent)
         manager.make_episode(agent, scenario)
         return agent
 
@@ -365,6 +366,7 @@ def register_callbacks_main(app):
         [State("scenario", "data")],
     )
     def update_agent_ref_store(agent, scenario):
+        manager.pin_in_ram_cache(scenario, agent)
         manager.make_episode(agent, scenario)
         return agent
 
@@ -2,26 +2,32 @@
 # See AUTHORS.txt
 # SPDX-License-Identifier: MPL-2.0
 
+import math
 from pathlib import Path
 
 import dash_antd_components as dac
 import dash_bootstrap_components as dbc
 from dash import dcc
 from dash import html
-import plotly.figure_factory as ff
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sn
 
-from grid2viz.src.manager import survival_df, attention_df, grid2viz_home_directory, scenarios
+from grid2viz.src import manager
+from grid2viz.src.manager import grid2viz_home_directory, scenarios
 from grid2viz.src.utils.constants import DONT_SHOW_FILENAME
 from grid2viz.src.utils.layout_helpers import modal, should_help_open
 
+# Number of scenario cards rendered at once, the others being reached through
+# the pagination below the cards
+CARDS_PER_PAGE = 15
+
 
 # This is to improve readability of the heatmap of survival steps for agents
 def get_heatmap_survival_attention_score(df_survival,df_attention):
     if (df_survival.shape[0] >= 2) and (df_survival.shape[1] >= 2):
+        # Imported on first use, matplotlib and seaborn being slow to import
+        import matplotlib
+        matplotlib.use('Agg')
+        import seaborn as sn
+
         clustered_df = sn.clustermap(df_survival)
         reordered_scenarios = clustered_df.dendrogram_row.reordered_ind
         reordered_agents = clustered_df.dendrogram_col.reordered_ind
@@ -31,6 +37,8 @@ def get_heatmap_survival_attention_score(df_survival,df_attention):
 
 
 def create_heatmap_figures(df_survival, df_attention):
+    import plotly.figure_factory as ff
+
     clustered_survival_df, clustered_attention_df = get_heatmap_survival_attention_score(df_survival, df_attention)
 
     z_text = clustered_survival_df.copy().astype(str)
@@ -122,6 +130,18 @@ def scenarios_filter(scenarios):
     )
 
 
+def cards_pagination(n_scenarios):
+    return dbc.Pagination(
+        id="cards_pagination",
+        max_value=max(1, math.ceil(n_scenarios / CARDS_PER_PAGE)),
+        active_page=1,
+        first_last=True,
+        previous_next=True,
+        fully_expanded=False,
+        className="justify-content-center",
+    )
+
+
 def comparison_button():
     return html.Div(
         className="row comparison-btn",
@@ -153,8 +173,10 @@ def layout():
         children=[
             dcc.Store(id="relayoutStoreScenario"),
             comparison_button(),
-            generate_heatmap_components(survival_df, attention_df),
+            # Read from manager as they are replaced when new episodes are found
+            generate_heatmap_components(manager.survival_df, manager.attention_df),
             dbc.Row(id="cards_container", className="m-1"),
+            cards_pagination(len(scenarios)),
             modal(id_suffix="episodes", is_open=open_help, header=header, body=body),
         ],
     )
@@ -3,15 +3,17 @@
 # SPDX-License-Identifier: MPL-2.0
 
 import datetime as dt
+import pickle
 import time
+import zlib
 
 import numpy as np
 import pandas as pd
 from grid2op.Episode import EpisodeData
-from tqdm import tqdm
 
-from . import EpisodeTrace, maintenances, consumption_profiles
+from . import EpisodeTrace, compression, maintenances, consumption_profiles
 from .env_actions import env_actions
+from .episode_reader import VectCollection, extract_attributes, load_space
 
 import os
 import json
@@ -19,6 +21,21 @@ from grid2op.Exceptions import Grid2OpException, EnvError, IncorrectNumberOfElem
 from grid2op.Action import ActionSpace
 from grid2op.Observation import ObservationSpace
 
+OBS_SPACE = "dict_observation_space.json"
+ACTION_SPACE = "dict_action_space.json"
+
+
+def load_observation_space(agent_path):
+    """
+    Observation space of the episodes of an agent, shared by all of them.
+
+    Parameters
+    ----------
+    agent_path: :class:`str`
+        Directory of the logs of the agent
+    """
+    return load_space(ObservationSpace, os.path.join(agent_path, OBS_SPACE))
+
 
 # TODO: configure the reward key you want to visualize in agent overview.
 # Either as an argument or a dropdown list in the app from which we can choose.
@@ -30,45 +47,138 @@ def compute_losses(obs):
     return (obs.prod_p.sum() - obs.load_p.sum()) / obs.load_p.sum()
 
 
-class ActionImpacts:
-    def __init__(
-        self,
-        action_line,
-        action_subs,
-        action_redisp,
-        action_curtail,
-        action_storage,
-        redisp_impact,
-        curtail_impact,
-        storage_impact,
-        line_name,
-        sub_name,
-        gen_name,
-        ren_name,
-        storage_name,
-        action_id,
-    ):
-
-        self.action_line = action_line
-        self.action_subs = action_subs
-        self.action_redisp = action_redisp
-        self.action_curtail=action_curtail
-        self.action_storage = action_storage
-        self.redisp_impact = redisp_impact
-        self.curtail_impact=curtail_impact
-        self.storage_impact = storage_impact
-        self.line_name = line_name
-        self.sub_name = sub_name
-        self.gen_name = gen_name
-        self.ren_name = ren_name
-        self.storage_name = storage_name
-        self.action_id = action_id
+def _replay_states(initial, is_set, set_value, toggle, toggle_after_set):
+    """
+    Boolean state of elements after each time step, replaying the values set
+    and the toggles of each time step from their initial state.
+
+    Parameters
+    ----------
+    initial: :class:`numpy.ndarray`
+        The (n,) initial states
+    is_set: :class:`numpy.ndarray`
+        The (T x n) matrix of the states set at each time step
+    set_value: :class:`numpy.ndarray`
+        The (T x n) matrix of the values set, where is_set
+    toggle: :class:`numpy.ndarray`
+        The (T x n) matrix of the states toggled at each time step
+    toggle_after_set: :class:`bool`
+        Whether a state set and toggled at the same time step is toggled
+        after being set, or overridden by the value set
+
+    Returns
+    -------
+    res: :class:`numpy.ndarray`
+        The (T x n) matrix of the states after each time step
+    """
+    steps = np.arange(len(is_set))[:, None]
+    elements = np.arange(is_set.shape[1])
+    # Last time step each state was set at, -1 if never
+    last_set = np.maximum.accumulate(np.where(is_set, steps, -1), axis=0)
+    was_set = last_set >= 0
+    last_set = np.maximum(last_set, 0)
+    state = np.where(was_set, set_value[last_set, elements], initial)
+    # Number of toggles since the state was last set
+    n_toggles = np.cumsum(toggle, axis=0)
+    toggles_until_set = n_toggles[last_set, elements]
+    if toggle_after_set:
+        toggles_until_set = toggles_until_set - toggle[last_set, elements]
+    n_toggles = n_toggles - np.where(was_set, toggles_until_set, 0)
+    return state ^ (n_toggles % 2 == 1)
+
+
+class LazyKPI:
+    """
+    Indicator of an EpisodeAnalytics computed on first access only.
+
+    Used as a decorator on the method computing the indicator. The value is then
+    memoized in the instance and, when the episode has a ``kpi_cache_dir``, saved
+    in its own file of this directory so that it is read back instead of being
+    recomputed the next time the episode is loaded from the filesystem cache.
+    Values stored directly in the instance (e.g. by older caches) take precedence.
+    """
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.__doc__ = compute.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, episode, owner=None):
+        if episode is None:
+            return self
+        path = None
+        kpi_cache_dir = getattr(episode, "kpi_cache_dir", None)
+        if kpi_cache_dir is not None:
+            path = os.path.join(kpi_cache_dir, self.name + ".bz")
+        loaded = False
+        if path is not None and os.path.exists(path):
+            try:
+                value = compression.load(path)
+                loaded = True
+            except (EOFError, OSError, ValueError, pickle.UnpicklingError, zlib.error) as e:
+                # e.g. truncated by a crash of a previous version
+                print(f"Could not read {self.name} from the filesystem cache: {e}")
+        if not loaded:
+            value = self.compute(episode)
+            if path is not None:
+                try:
+                    os.makedirs(kpi_cache_dir, exist_ok=True)
+                    compression.dump(value, path)
+                except OSError as e:
+                    print(f"Could not save {self.name} in the filesystem cache: {e}")
+        episode.__dict__[self.name] = value
+        return value
+
+
+class StoredTable:
+    """
+    Table of an EpisodeAnalytics loaded from a columnar cache, read from disk
+    on first access only.
+
+    See :func:`grid2viz.src.kpi.episode_store.load_episode`. Like for
+    :class:`LazyKPI`, the value is then memoized in the instance, and values
+    stored directly in the instance take precedence.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, episode, owner=None):
+        if episode is None:
+            return self
+        store = episode.__dict__.get("_table_store")
+        if store is None or self.name not in store.names:
+            raise AttributeError(
+                f"'{type(episode).__name__}' object has no attribute '{self.name}'"
+            )
+        value = store.load(self.name, episode)
+        episode.__dict__[self.name] = value
+        return value
 
 
 class EpisodeAnalytics:
+    load = StoredTable()
+    production = StoredTable()
+    rho = StoredTable()
+    action_data_table = StoredTable()
+    computed_reward = StoredTable()
+    flow_and_voltage_line = StoredTable()
+    target_redispatch = StoredTable()
+    actual_redispatch = StoredTable()
+    attacks_data_table = StoredTable()
+    hazards = StoredTable()
+    maintenances = StoredTable()
+    observations = StoredTable()
+    actions = StoredTable()
+
     def __init__(self, episode_data, episode_name, agent):
         self.episode_name = episode_name
         self.agent = agent
+        # Directory where the lazy indicators are persisted, set by the manager
+        # for the episodes of the filesystem cache
+        self.kpi_cache_dir = None
 
         self.timesteps = list(range(len(episode_data.actions)))
         print(
@@ -89,25 +199,96 @@ class EpisodeAnalytics:
         ) = self._make_df_from_data(episode_data)
         print("Hazards-Maintenances")
         self.hazards, self.maintenances = self._env_actions_as_df(episode_data)
-        print("Computing computation intensive indicators...")
-        self.total_overflow_trace = EpisodeTrace.get_total_overflow_trace(
-            self, episode_data
-        )
-        self.usage_rate_trace = EpisodeTrace.get_usage_rate_trace(self)
-        self.reward_trace = EpisodeTrace.get_df_rewards_trace(self)
-        self.total_overflow_ts = EpisodeTrace.get_total_overflow_ts(self, episode_data)
-        self.profile_traces = consumption_profiles.profiles_traces(self)
-        self.total_maintenance_duration = maintenances.total_duration_maintenance(self)
-        self.nb_hazards = env_actions(self, which="hazards", kind="nb", aggr=True)
-        self.nb_maintenances = env_actions(
-            self, which="maintenances", kind="nb", aggr=True
-        )
-
+        # Kept until the episode is pickled, for the indicators computed lazily
+        self._episode_data = episode_data
 
         end = time.time()
         print(f"end computing df: {end - beg}")
 
+    def cache_state(self):
+        """
+        Attributes of the episode saved in the filesystem cache.
 
+        The observations and actions are kept as they are, possibly as
+        :class:`grid2viz.src.kpi.episode_reader.VectCollection`.
+
+        Returns
+        -------
+        res: :class:`dict`
+        """
+        # Tables not read yet from a columnar cache are read before
+        # the store is dropped
+        store = self.__dict__.get("_table_store")
+        if store is not None:
+            for name in store.names:
+                getattr(self, name)
+        # The episode logs cannot be pickled and the lazy indicators are
+        # persisted on their own
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in ["_episode_data", "_table_store"]
+            and not isinstance(getattr(type(self), key, None), LazyKPI)
+        }
+
+    def __getstate__(self):
+        state = self.cache_state()
+        # The spaces of the collections cannot be pickled, their objects can
+        for key in ["observations", "actions"]:
+            if isinstance(state.get(key), VectCollection):
+                state[key] = list(state[key])
+        return state
+
+    def _get_episode_data(self):
+        # Once decorated or loaded from the cache, the episode itself holds
+        # the observations and the line names
+        episode_data = self.__dict__.get("_episode_data")
+        return self if episode_data is None else episode_data
+
+    @LazyKPI
+    def overflow_csr(self):
+        # The overflow timeline needs the three of them, computed together
+        return EpisodeTrace.get_total_overflow_ts(self, self._get_episode_data())
+
+    @property
+    def total_overflow_ts(self):
+        return self.overflow_csr[0]
+
+    @property
+    def overflow_line_offsets(self):
+        return self.overflow_csr[1]
+
+    @property
+    def overflow_line_ids(self):
+        return self.overflow_csr[2]
+
+    @LazyKPI
+    def total_overflow_trace(self):
+        return EpisodeTrace.get_total_overflow_trace(self, self._get_episode_data())
+
+    @LazyKPI
+    def usage_rate_trace(self):
+        return EpisodeTrace.get_usage_rate_trace(self)
+
+    @LazyKPI
+    def reward_trace(self):
+        return EpisodeTrace.get_df_rewards_trace(self)
+
+    @LazyKPI
+    def profile_traces(self):
+        return consumption_profiles.profiles_traces(self)
+
+    @LazyKPI
+    def total_maintenance_duration(self):
+        return maintenances.total_duration_maintenance(self)
+
+    @LazyKPI
+    def nb_hazards(self):
+        return env_actions(self, which="hazards", kind="nb", aggr=True)
+
+    @LazyKPI
+    def nb_maintenances(self):
+        return env_actions(self, which="maintenances", kind="nb", aggr=True)
 
     @staticmethod
     def timestamp(obs):
@@ -139,47 +320,38 @@ class EpisodeAnalytics:
         """
         size = len(episode_data.actions)
         timesteps = list(range(size))
-        load_size = size * len(episode_data.observations[0].load_p)
-        prod_size = size * len(episode_data.observations[0].prod_p)
-        n_rho = len(episode_data.observations[0].rho)
-        rho_size = size * n_rho
-
-        load_data = pd.DataFrame(index=range(load_size), columns=["timestamp", "value"])
-        load_data.loc[:, "value"] = load_data.loc[:, "value"].astype(float)
-
-        production = pd.DataFrame(index=range(prod_size), columns=["value"])
-
-        rho = pd.DataFrame(index=range(rho_size), columns=["value"])
-
-        cols_loop_action_data_table =[
-                "action_id",
-                "action_line",
-                "action_subs",
-                "action_redisp",
-                "action_curtail",
-                "action_storage",
-                "redisp_impact",
-                "curtail_impact",
-                "storage_impact",
-                "line_name",
-                "sub_name",
-                "gen_name",
-                "ren_name",
-                "storage_name",
-                "distance",
-                "lines_modified",
-                "subs_modified",
-                "is_alarm",
-                "alarm_zone",
-                "gens_modified",
-                "rens_modified",
-                "storages_modified"
-            ]
-        action_data_table = pd.DataFrame(
-            index=range(size),
-            columns=["timestep","timestamp","timestep_reward"] + cols_loop_action_data_table
- ,
+        observation_space = episode_data.observations.helper
+        n_rho = observation_space.n_line
+
+        # Slice the observation vectors once in (T x n) matrices.
+        # The long format tables are then plain reshapes of these matrices.
+        flow_voltage_attributes = [
+            f"{quantity}_{side}"
+            for side in ["or", "ex"]
+            for quantity in ["p", "q", "a", "v"]
+        ]
+        time_attributes = ["year", "month", "day", "hour_of_day", "minute_of_hour"]
+        obs_matrices = extract_attributes(
+            episode_data.observations,
+            [
+                *time_attributes,
+                "load_p",
+                "gen_p",
+                "rho",
+                *flow_voltage_attributes,
+                "target_dispatch",
+                "actual_dispatch",
+                "curtailment",
+                "storage_power",
+            ],
+            stop=size,
         )
+        time_stamps = [
+            dt.datetime(*time_fields)
+            for time_fields in zip(
+                *[obs_matrices[attribute][:, 0].tolist() for attribute in time_attributes]
+            )
+        ]
 
         computed_rewards = pd.DataFrame(
             index=range(size), columns=["timestep", "rewards", "cum_rewards"]
@@ -191,166 +363,160 @@ class EpisodeAnalytics:
                 episode_data.line_names,
             ]
         )
+        # Blocks of n_lines columns, in the same order as flow_voltage_cols
         flow_voltage_line_table = pd.DataFrame(
-            index=range(size), columns=flow_voltage_cols
+            np.hstack(
+                [obs_matrices[attribute] for attribute in flow_voltage_attributes]
+            ).astype("float16"),
+            columns=flow_voltage_cols,
         )
 
         target_redispatch = pd.DataFrame(
-            index=range(size), columns=episode_data.prod_names
+            obs_matrices["target_dispatch"].astype("float32"),
+            columns=episode_data.prod_names,
         )
         actual_redispatch = pd.DataFrame(
-            index=range(size), columns=episode_data.prod_names
+            obs_matrices["actual_dispatch"].astype("float32"),
+            columns=episode_data.prod_names,
         )
 
-        topo_vect = episode_data.observations[0].topo_vect
+        topo_vect = extract_attributes(
+            episode_data.observations, ["topo_vect"], stop=1
+        )["topo_vect"][0]
         if topo_vect.sum() != len(topo_vect):
             raise ValueError("Not all things are on bus 1")
 
-        obs_0 = episode_data.observations[0]
-
-        # True == connected, False == disconnect
-        # So that len(line_statuses) - line_statuses.sum() is the distance for lines
-        line_statuses = episode_data.observations[0].line_status
-
-        # True == sub has something on bus 2, False == everything on bus 1
-        # So that subs_on_bus2.sum() is the distance for subs
-        subs_on_bus_2 = np.repeat(False, episode_data.observations[0].n_sub)
-
-        # objs_on_bus_2 will store the id of objects connected to bus 2
-        objs_on_bus_2 = {id: [] for id in range(episode_data.observations[0].n_sub)}
-
-        is_alarm=False
-        if(("last_alarm" in episode_data.observations[0].__dict__.keys())):
-            #if(len(episode_data.observations[1].last_alarm)>=1):
-            is_alarm = (episode_data.observations[0].time_since_last_alarm[0]==0)
-        # Distance from original topology is then :
-        # len(line_statuses) - line_statuses.sum() + subs_on_bus_2.sum()
-
-        gens_modified_ids = []
-        actual_redispatch_previous_ts = obs_0.actual_dispatch
-
-        list_actions = []
-        for (time_step, (obs, act)) in tqdm(
-            enumerate(zip(episode_data.observations[:-1], episode_data.actions)),
-            total=size,
-        ):
-            time_stamp = self.timestamp(obs)
-            (
-                action_impacts,
-                list_actions,
-                lines_modified,
-                subs_modified,
-                gens_modified_names,
-                gens_modified_ids,
-                ren_modified_names,
-                ren_modified_ids,
-                storage_modified_names,
-                storage_modified_ids
-
-            ) = self.compute_action_impacts(
-                act, list_actions, obs, gens_modified_ids, actual_redispatch_previous_ts
-            )
-
-            alarm_zone = []
-            if (("last_alarm" in episode_data.observations[1].__dict__.keys())):
-                #is_alarm=(obs.time_since_last_alarm[0]==0)#last_alarm[1]
-                is_alarm = (obs.time_since_last_alarm[0] == 0) &(len(obs.last_alarm)!=0)
-                if is_alarm:
-                    alarm_zone=[obs.alarms_area_names[zone_id]
-                                for zone_id,zone_value in enumerate(obs.last_alarm) if (int(zone_value)==time_step)]
-
-            actual_redispatch_previous_ts = obs.actual_dispatch
-
-            # Building load DF
-            begin = time_step * episode_data.n_loads
-            end = (time_step + 1) * episode_data.n_loads - 1
-            load_data.loc[begin:end, "value"] = obs.load_p.astype(float)
-            load_data.loc[begin:end, "timestamp"] = time_stamp
-            # Building prod DF
-            begin = time_step * episode_data.n_prods
-            end = (time_step + 1) * episode_data.n_prods - 1
-            production.loc[begin:end, "value"] = obs.prod_p.astype(float)
-            # Building RHO DF
-            begin = time_step * n_rho
-            end = (time_step + 1) * n_rho - 1
-            rho.loc[begin:end, "value"] = obs.rho.astype(float)
-
-            pos = time_step
-
-            (
-                distance,
-                line_statuses,
-                subs_on_bus_2,
-                objs_on_bus_2,
-            ) = self.get_distance_from_obs(
-                act, line_statuses, subs_on_bus_2, objs_on_bus_2, obs_0
+        is_alarms = np.zeros(size, dtype=bool)
+        alarm_zones = [[] for _ in range(size)]
+        if "last_alarm" in observation_space.attr_list_vect:
+            alarm_matrices = extract_attributes(
+                episode_data.observations,
+                ["time_since_last_alarm", "last_alarm"],
+                stop=size,
             )
-
-            action_data_table.loc[pos, cols_loop_action_data_table] = [
-                action_impacts.action_id,
-                action_impacts.action_line,
-                action_impacts.action_subs,
-                action_impacts.action_redisp,
-                action_impacts.action_curtail,
-                action_impacts.action_storage,
-                action_impacts.redisp_impact,
-                action_impacts.curtail_impact,
-                action_impacts.storage_impact,
-                action_impacts.line_name,
-                action_impacts.sub_name,
-                action_impacts.gen_name,
-                action_impacts.ren_name,
-                action_impacts.storage_name,
-                distance,
-                lines_modified,
-                subs_modified,
-                is_alarm,
-                alarm_zone,
-                gens_modified_names,
-                ren_modified_names,
-                storage_modified_names
-            ]
-
-
-            flow_voltage_line_table.loc[time_step, :] = np.array(
-                [
-                    obs.p_ex,
-                    obs.q_ex,
-                    obs.a_ex,
-                    obs.v_ex,
-                    obs.p_or,
-                    obs.q_or,
-                    obs.a_or,
-                    obs.v_or,
+            last_alarm = alarm_matrices["last_alarm"]
+            if last_alarm.shape[1]:
+                is_alarms = alarm_matrices["time_since_last_alarm"][:, 0] == 0
+            for time_step in np.flatnonzero(is_alarms):
+                alarm_zones[time_step] = [
+                    observation_space.alarms_area_names[zone_id]
+                    for zone_id in np.flatnonzero(last_alarm[time_step] == time_step)
                 ]
-            ).flatten().astype('float16')
-
-            target_redispatch.loc[time_step, :] = obs.target_dispatch.astype('float32')
-            actual_redispatch.loc[time_step, :] = obs.actual_dispatch.astype('float32')
 
-        load_data["timestep"] = np.repeat(timesteps, episode_data.n_loads)
-        load_data["equipment_name"] = np.tile(episode_data.load_names, size).astype(str)
-        load_data["equipement_id"] = np.tile(range(episode_data.n_loads), size)
+        load_data = pd.DataFrame(
+            {
+                "timestamp": pd.Series(
+                    np.repeat(np.array(time_stamps, dtype=object), episode_data.n_loads),
+                    dtype=object,
+                ),
+                "value": obs_matrices["load_p"].reshape(-1).astype("float32"),
+                "timestep": np.repeat(timesteps, episode_data.n_loads),
+                "equipment_name": np.tile(episode_data.load_names, size).astype(str),
+                "equipement_id": np.tile(range(episode_data.n_loads), size),
+            }
+        )
 
         self.timestamps = sorted(load_data.timestamp.dropna().unique())
         self.timesteps = sorted(load_data.timestep.unique())
 
-        production["timestep"] = np.repeat(timesteps, episode_data.n_prods)
-        production["timestamp"] = np.repeat(self.timestamps, episode_data.n_prods)
-        production.loc[:, "equipment_name"] = np.tile(episode_data.prod_names, size)
-        production.loc[:, "equipement_id"] = np.tile(range(episode_data.n_prods), size)
+        production = pd.DataFrame(
+            {
+                "value": obs_matrices["gen_p"].reshape(-1).astype("float32"),
+                "timestep": np.repeat(timesteps, episode_data.n_prods),
+                "timestamp": np.repeat(self.timestamps, episode_data.n_prods),
+                "equipment_name": np.tile(episode_data.prod_names, size),
+                "equipement_id": np.tile(range(episode_data.n_prods), size),
+            }
+        )
 
-        rho["time"] = np.repeat(timesteps, n_rho).astype('int16')
-        rho["timestamp"] = np.repeat(self.timestamps, n_rho)
-        rho["equipment"] = np.tile(range(n_rho), size)
+        rho = pd.DataFrame(
+            {
+                "value": obs_matrices["rho"].reshape(-1).astype("float16"),
+                "time": np.repeat(timesteps, n_rho).astype('int16'),
+                "timestamp": np.repeat(self.timestamps, n_rho),
+                "equipment": np.tile(range(n_rho), size),
+            }
+        )
 
-        action_data_table["timestep"] = self.timesteps
-        action_data_table["timestamp"] = self.timestamps
-        action_data_table["timestep_reward"] = episode_data.rewards[:size]
+        # Only the changes made by the actions of the agent are counted, not
+        # the disconnections by the environment, e.g. by the protections
+        action_space = episode_data.actions.helper
+        topology_attributes = {
+            "_set_line_status": 0,
+            "_switch_line_status": False,
+            "_set_topo_vect": 0,
+            "_change_bus_vect": False,
+        }
+        topology_changes = extract_attributes(
+            episode_data.actions,
+            [name for name in topology_attributes if name in action_space.actionClass.attr_list_vect],
+            stop=size,
+        )
+        # Actions that cannot change the topology
+        for name, no_change in topology_attributes.items():
+            if name not in topology_changes:
+                n_elements = action_space.dim_topo if "topo" in name or "bus" in name else n_rho
+                topology_changes[name] = np.full((size, n_elements), no_change)
+        # Storage units were never counted
+        counted = np.zeros(observation_space.dim_topo, dtype=bool)
+        counted[
+            np.concatenate(
+                [
+                    observation_space.load_pos_topo_vect,
+                    observation_space.gen_pos_topo_vect,
+                    observation_space.line_or_pos_topo_vect,
+                    observation_space.line_ex_pos_topo_vect,
+                ]
+            )
+        ] = True
+        distances = self.get_topology_distances(
+            extract_attributes(episode_data.observations, ["line_status"], stop=1)[
+                "line_status"
+            ][0],
+            topology_changes["_set_line_status"],
+            topology_changes["_switch_line_status"],
+            topology_changes["_set_topo_vect"],
+            topology_changes["_change_bus_vect"],
+            observation_space.sub_info,
+            counted,
+        )
 
-        load_data["value"] = load_data["value"].astype('float32')
-        production["value"] = production["value"].astype('float32')
-        rho["value"] = rho["value"].astype('float16')
+        actions = self._decode_actions(
+            episode_data.actions.collection[:size], episode_data.actions.helper
+        )
+        action_data_table = pd.DataFrame(
+            {
+                "timestep": self.timesteps,
+                "timestamp": self.timestamps,
+                "timestep_reward": episode_data.rewards[:size],
+                "action_id": actions["action_id"],
+                "action_line": actions["action_line"],
+                "action_subs": actions["action_subs"],
+                "action_redisp": actions["action_redisp"],
+                "action_curtail": actions["action_curtail"],
+                "action_storage": actions["action_storage"],
+                "redisp_impact": np.round(
+                    obs_matrices["actual_dispatch"].sum(axis=1), 2
+                ),
+                "curtail_impact": (
+                    obs_matrices["curtailment"] * observation_space.gen_pmax
+                ).sum(axis=1),
+                "storage_impact": obs_matrices["storage_power"].sum(axis=1),
+                "line_name": actions["line_name"],
+                "sub_name": actions["sub_name"],
+                "gen_name": actions["gen_name"],
+                "ren_name": actions["ren_name"],
+                "storage_name": actions["storage_name"],
+                "distance": distances,
+                "lines_modified": actions["lines_modified"],
+                "subs_modified": actions["subs_modified"],
+                "is_alarm": is_alarms,
+                "alarm_zone": alarm_zones,
+                "gens_modified": actions["gens_modified"],
+                "rens_modified": actions["rens_modified"],
+                "storages_modified": actions["storages_modified"],
+            }
+        )
 
         computed_rewards["timestep"] = self.timestamps
         computed_rewards["rewards"] = episode_data.rewards[:size]
@@ -371,19 +537,23 @@ class EpisodeAnalytics:
         )
         attacks_data_table["timestep"] = self.timesteps
         attacks_data_table["timestamp"] = self.timestamps
-        for time_step, attack in enumerate(episode_data.attacks):
-            (
-                n_lines_modified,
-                str_lines_modified,
-                lines_modified,
-            ) = self.get_lines_modifications(attack)
-            n_subs_modified, *_ = self.get_subs_modifications(attack)
-            is_attacked = n_lines_modified > 0 or n_subs_modified > 0
-            attacks_data_table.loc[time_step, "attack"] = is_attacked
-            if len(lines_modified) == 0:
-                attacks_data_table.loc[time_step, "id_lines"] = ""
-            else:
-                attacks_data_table.loc[time_step, "id_lines"] = lines_modified[0]
+        # As for the agent actions, each distinct attack is decoded only once
+        n_attacks = min(len(episode_data.attacks), size)
+        decoded_attacks = {}
+        attacks = []
+        for time_step, attack_vect in enumerate(
+            episode_data.attacks.collection[:n_attacks] + 0.0
+        ):
+            key = attack_vect.tobytes()
+            if key not in decoded_attacks:
+                decoded_attacks[key] = self._decode_attack(
+                    episode_data.attacks[time_step]
+                )
+            attacks.append(decoded_attacks[key])
+        if attacks:
+            is_attacked, id_lines = zip(*attacks)
+            attacks_data_table.loc[: n_attacks - 1, "attack"] = is_attacked
+            attacks_data_table.loc[: n_attacks - 1, "id_lines"] = id_lines
 
         return (
             load_data,
@@ -397,18 +567,14 @@ class EpisodeAnalytics:
             attacks_data_table,
         )
 
-    @staticmethod
-    def get_action_id(action, list_actions):
-        if not action:
-            return None, list_actions
-        for idx, act_dict in enumerate(list_actions):
-            if action == act_dict:
-                return idx, list_actions
-        # if we havnt found the vect...
-        list_actions.append(action)
-        return len(list_actions) - 1, list_actions
-
     def optimize_memory_footprint(self,opt_obs_act=False):
+        """
+        Convert the tables, and the arrays of the observations and actions if
+        opt_obs_act, to compact dtypes: categories, float16, int8...
+
+        Applied once when the episode is saved in the filesystem cache, so
+        that loading it back needs no conversion.
+        """
         self.flow_and_voltage_line=self.flow_and_voltage_line.astype('float16')
         self.production.equipment_name=self.production.equipment_name.astype('category')
         self.production.value = self.production.value.astype('float16')
@@ -467,135 +633,108 @@ class EpisodeAnalytics:
                 return self.name_sub[sub]
         return None
 
-    def get_distance_from_obs(
-        self, act, line_statuses, subs_on_bus_2, objs_on_bus_2, obs
+    @staticmethod
+    def get_topology_distances(
+        line_status, set_line_status, switch_line_status, set_bus, change_bus, sub_info, counted
     ):
+        """
+        Compute the topological distance to the reference topology (every line
+        connected and every element on bus 1) resulting from the actions of the
+        agent, after each time step.
+
+        The distance is the number of lines disconnected by the actions plus
+        the number of substations having at least one element set on bus 2 by
+        the actions. Changes made by the environment, e.g. lines disconnected
+        by the protections or in maintenance, are not counted.
+
+        Parameters
+        ----------
+        line_status: :class:`numpy.ndarray`
+            The line statuses of the first observation
+        set_line_status: :class:`numpy.ndarray`
+            The (T x n_line) matrix of line statuses set by the actions:
+            1 to reconnect, -1 to disconnect, 0 to leave as is
+        switch_line_status: :class:`numpy.ndarray`
+            The (T x n_line) matrix of line statuses switched by the actions
+        set_bus: :class:`numpy.ndarray`
+            The (T x dim_topo) matrix of buses set by the actions, 0 if not set
+        change_bus: :class:`numpy.ndarray`
+            The (T x dim_topo) matrix of buses changed by the actions
+        sub_info: :class:`numpy.ndarray`
+            The number of elements of each substation
+        counted: :class:`numpy.ndarray`
+            Whether each element of topo_vect is counted
 
-        impact_on_objs = act.impact_on_objects()
-
-        # lines reconnetions/disconnections
-        line_statuses[
-            impact_on_objs["force_line"]["disconnections"]["powerlines"]
-        ] = False
-        line_statuses[
-            impact_on_objs["force_line"]["reconnections"]["powerlines"]
-        ] = True
-        line_statuses[impact_on_objs["switch_line"]["powerlines"]] = np.invert(
-            line_statuses[impact_on_objs["switch_line"]["powerlines"]]
+        Returns
+        -------
+        res: :class:`numpy.ndarray`
+            The distance of each time step
+        """
+        if not len(set_line_status):
+            return np.zeros(0, dtype=int)
+        # A line status is set then switched by the same action, and a bus is
+        # changed then set
+        line_status = _replay_states(
+            np.asarray(line_status, dtype=bool),
+            set_line_status != 0,
+            set_line_status == 1,
+            switch_line_status.astype(bool),
+            toggle_after_set=True,
         )
+        on_bus_2 = _replay_states(
+            np.zeros(set_bus.shape[1], dtype=bool),
+            (set_bus == 1) | (set_bus == 2),
+            set_bus == 2,
+            change_bus.astype(bool),
+            toggle_after_set=False,
+        )
+        on_bus_2 &= counted
+        # The elements of a substation are contiguous in topo_vect
+        sub_starts = np.cumsum(sub_info) - sub_info
+        subs_on_bus_2 = np.logical_or.reduceat(on_bus_2, sub_starts, axis=1)
+        return (~line_status).sum(axis=1) + subs_on_bus_2.sum(axis=1)
 
-        topo_vect_dict = {
-            "load": obs.load_pos_topo_vect,
-            "generator": obs.gen_pos_topo_vect,
-            "line (extremity)": obs.line_ex_pos_topo_vect,
-            "line (origin)": obs.line_or_pos_topo_vect,
-        }
-
-        # Bus manipulation
-        if impact_on_objs["topology"]["changed"]:
-            for modif_type in ["bus_switch", "assigned_bus"]:
-
-                for elem in impact_on_objs["topology"][modif_type]:
-                    objs_on_bus_2 = self.update_objs_on_bus(
-                        objs_on_bus_2, elem, topo_vect_dict, kind=modif_type
-                    )
-
-            for elem in impact_on_objs["topology"]["disconnect_bus"]:
-                # Disconnected bus counts as one for the distance
-                subs_on_bus_2[elem["substation"]] = True
-
-        subs_on_bus_2 = [
-            True if objs_on_2 else False for _, objs_on_2 in objs_on_bus_2.items()
-        ]
-
-        distance = len(line_statuses) - line_statuses.sum() + sum(subs_on_bus_2)
-        return distance, line_statuses, subs_on_bus_2, objs_on_bus_2
-
-    def update_objs_on_bus(self, objs_on_bus_2, elem, topo_vect_dict, kind):
-        for object_type, pos_topo_vect in topo_vect_dict.items():
-            if elem["object_type"] == object_type and elem["bus"]:
-                if kind == "bus_switch":
-                    objs_on_bus_2 = self.update_objs_on_bus_switch(
-                        objs_on_bus_2, elem, pos_topo_vect
-                    )
-                else:
-                    objs_on_bus_2 = self.update_objs_on_bus_assign(
-                        objs_on_bus_2, elem, pos_topo_vect
-                    )
-                break
-        return objs_on_bus_2
-
-    @staticmethod
-    def update_objs_on_bus_switch(objs_on_bus_2, elem, pos_topo_vect):
-        if pos_topo_vect[elem["object_id"]] in objs_on_bus_2[elem["substation"]]:
-            # elem was on bus 2, remove it from objs_on_bus_2
-            objs_on_bus_2[elem["substation"]] = [
-                x
-                for x in objs_on_bus_2[elem["substation"]]
-                if x != pos_topo_vect[elem["object_id"]]
-            ]
-        else:
-            objs_on_bus_2[elem["substation"]].append(pos_topo_vect[elem["object_id"]])
-        return objs_on_bus_2
-
-    @staticmethod
-    def update_objs_on_bus_assign(objs_on_bus_2, elem, pos_topo_vect):
-        if (
-            pos_topo_vect[elem["object_id"]] in objs_on_bus_2[elem["substation"]]
-            and elem["bus"] == 1
-        ):
-            # elem was on bus 2, remove it from objs_on_bus_2
-            objs_on_bus_2[elem["substation"]] = [
-                x
-                for x in objs_on_bus_2[elem["substation"]]
-                if x != pos_topo_vect[elem["object_id"]]
-            ]
-        elif (
-            pos_topo_vect[elem["object_id"]] not in objs_on_bus_2[elem["substation"]]
-            and elem["bus"] == 2
-        ):
-            objs_on_bus_2[elem["substation"]].append(pos_topo_vect[elem["object_id"]])
-        return objs_on_bus_2
-
-    # @jit(forceobj=True)
     def _env_actions_as_df(self, episode_data):
         agent_length = len(
             episode_data.actions
         )  # int(episode_data.meta['nb_timestep_played'])
-        hazards_size = agent_length * episode_data.n_lines
-        cols = ["timestep", "timestamp", "line_id", "line_name", "value"]
-        hazards = pd.DataFrame(index=range(hazards_size), columns=["value"], dtype=int)
-        maintenances = hazards.copy()
-
-        for (time_step, env_act) in tqdm(
-            enumerate(episode_data.env_actions), total=len(episode_data.env_actions)
-        ):
-            if env_act is None:
-                continue
-
-            time_stamp = self.timestamp(episode_data.observations[time_step])
-
-            begin = time_step * episode_data.n_lines
-            end = (time_step + 1) * episode_data.n_lines - 1
-            hazards.loc[begin:end, "value"] = env_act._hazards.astype(int)
-
-            begin = time_step * episode_data.n_lines
-            end = (time_step + 1) * episode_data.n_lines - 1
-            maintenances.loc[begin:end, "value"] = env_act._maintenance.astype(int)
+        n_lines = episode_data.n_lines
+        # (T x n_lines) boolean matrices of the lines in hazard / maintenance
+        env_matrices = extract_attributes(
+            episode_data.env_actions, ["_hazards", "_maintenance"], stop=agent_length
+        )
+        hazards, maintenances = [
+            pd.DataFrame(
+                {
+                    "value": env_matrices[attribute].reshape(-1),
+                    "timestep": np.repeat(range(agent_length), n_lines),
+                    "timestamp": np.repeat(self.timestamps, n_lines),
+                    "line_name": np.tile(episode_data.line_names, agent_length),
+                    "line_id": np.tile(range(n_lines), agent_length),
+                }
+            )
+            for attribute in ["_hazards", "_maintenance"]
+        ]
+        return hazards, maintenances
 
-        hazards["timestep"] = np.repeat(range(agent_length), episode_data.n_lines)
-        maintenances["timestep"] = hazards["timestep"]
-        hazards["timestamp"] = np.repeat(self.timestamps, episode_data.n_lines)
-        maintenances["timestamp"] = hazards["timestamp"]
-        hazards["line_name"] = np.tile(episode_data.line_names, agent_length)
-        maintenances["line_name"] = hazards["line_name"]
-        hazards["line_id"] = np.tile(range(episode_data.n_lines), agent_length)
-        maintenances["line_id"] = hazards["line_id"]
+    def get_prod_types(self, observation_space=None):
+        """
+        Production type of each generator.
 
-        return hazards, maintenances
+        Parameters
+        ----------
+        observation_space: :class:`grid2op.Observation.ObservationSpace`
+            Space giving the types, the one of the episode if None, for an
+            episode not decorated with its spaces yet
 
-    def get_prod_types(self):
-        types = self.observation_space.gen_type
+        Returns
+        -------
+        res: :class:`dict`
+            Type of each generator, by name
+        """
+        if observation_space is None:
+            observation_space = self.observation_space
+        types = observation_space.gen_type
         ret = {}
         if types is None:
             return ret
@@ -612,10 +751,18 @@ class EpisodeAnalytics:
                 for elem in dir(episode_data)
                 if not (elem.startswith("__") or callable(getattr(episode_data, elem)))
              ]:
+            # Objects of an EpisodeReader are only built when accessed,
+            # or when the episode is pickled
             if(attribute=="observations"):
-                self.observations=list(episode_data.observations)#make thos objects pickable
+                if isinstance(episode_data.observations, VectCollection):
+                    self.observations=episode_data.observations
+                else:
+                    self.observations=list(episode_data.observations)#make thos objects pickable
             if(attribute=="actions"):
-                self.actions=list(episode_data.actions)#make thos objects pickable
+                if isinstance(episode_data.actions, VectCollection):
+                    self.actions=episode_data.actions
+                else:
+                    self.actions=list(episode_data.actions)#make thos objects pickable
             if(attribute in ["prod_names",  "line_names", "load_names", "meta",
                           "rewards"]):
                 setattr(self, attribute, getattr(episode_data, attribute))
@@ -631,97 +778,130 @@ class EpisodeAnalytics:
         setattr(self, "reboot", getattr(episode_data, "reboot"))
 
     def decorate_obs_act_spaces(self,agent_path):
+        # Parsed once and shared by all the episodes of the agents of an environment
+        self.observation_space = load_observation_space(agent_path)  # need to add action space maybe also, at least for simulation page
+        self.action_space = load_space(ActionSpace, os.path.join(agent_path, ACTION_SPACE))
 
-        OBS_SPACE = "dict_observation_space.json"
-        ACTION_SPACE = "dict_action_space.json"
+    def _decode_actions(self, action_vects, action_space):
+        """
+        Decode the actions of an episode into the columns of the action data table.
 
-        self.observation_space = ObservationSpace.from_dict(
-            os.path.join(agent_path, OBS_SPACE))  # need to add action space maybe also, at least for simulation page
-        self.action_space = ActionSpace.from_dict(os.path.join(agent_path, ACTION_SPACE))
+        Agents usually play the same few actions over and over, so actions are
+        keyed by the bytes of their raw vector: each distinct vector is turned
+        into an action and decoded only once, and gets its action id in order of
+        first appearance. Doing nothing has no action id.
 
-    def compute_action_impacts(
-        self,
-        action,
-        list_actions,
-        observation,
-        gens_modified_ids,
-        actual_dispatch_previous_ts,
-    ):
+        Parameters
+        ----------
+        action_vects: :class:`numpy.ndarray`
+            The (T x action size) matrix of actions, as stored in actions.npz
+        action_space: :class:`grid2op.Action.ActionSpace`
+            The action space used to convert a vector back to an action
 
+        Returns
+        -------
+        res: :class:`dict`
+            The decoded action columns, each of them with one value per time step
+        """
+        columns = [
+            "action_id",
+            "action_line",
+            "action_subs",
+            "action_redisp",
+            "action_curtail",
+            "action_storage",
+            "line_name",
+            "sub_name",
+            "gen_name",
+            "ren_name",
+            "storage_name",
+            "lines_modified",
+            "subs_modified",
+            "gens_modified",
+            "rens_modified",
+            "storages_modified",
+        ]
+        decoded_actions = {}
+        n_action_ids = 0
+        rows = []
+        # + 0.0 so that -0.0 and 0.0 give the same key
+        for action_vect in action_vects + 0.0:
+            key = action_vect.tobytes()
+            if key not in decoded_actions:
+                action = action_space.from_vect(action_vect, check_legit=False)
+                # Doing nothing has no action id
+                action_id = None
+                if action:
+                    action_id = n_action_ids
+                    n_action_ids += 1
+                decoded_actions[key] = self._decode_action(action, action_id=action_id)
+            rows.append(decoded_actions[key])
+        if not rows:
+            return {column: [] for column in columns}
+        return dict(zip(columns, map(list, zip(*rows))))
+
+    def _decode_action(self, action, action_id):
+        action_dict = action.as_dict()
         (
             n_lines_modified,
             str_lines_modified,
             lines_modified,
-        ) = self.get_lines_modifications(action)
+        ) = self.get_lines_modifications(action, action_dict)
         n_subs_modified, str_subs_modified, subs_modified = self.get_subs_modifications(
-            action
+            action, action_dict
         )
-
         (
             n_gens_modified,
             str_gens_modified,
             gens_modified_names,
-            gens_modified_ids,
-            redisp_volume,
-        ) = self.get_gens_modifications(
-            action, observation, gens_modified_ids, actual_dispatch_previous_ts
-        )
-
+            _,
+        ) = self.get_gens_modifications(action, action_dict)
         (
             n_ren_modified,
             str_ren_modified,
             ren_modified_names,
-            ren_modified_ids,
-            volume_curtailed,
-        ) = self.get_curtailment_modifications(
-            action, observation
-        )
-
+            _,
+        ) = self.get_curtailment_modifications(action, action_dict)
         (
             n_storage_modified,
             str_storage_modified,
             storage_modified_names,
-            storage_modified_ids,
-            volume_stored,
-
-        ) = self.get_storage_modifications(
-            action,
-            observation
-        )
-
-
-        action_id, list_actions = self.get_action_id(action, list_actions)
+            _,
+        ) = self.get_storage_modifications(action, action_dict)
 
         return (
-            ActionImpacts(
-                action_line=n_lines_modified,
-                action_subs=n_subs_modified,
-                action_redisp=n_gens_modified,
-                action_curtail=n_ren_modified,
-                action_storage=n_storage_modified,
-                redisp_impact=redisp_volume,
-                curtail_impact=volume_curtailed,
-                storage_impact=volume_stored,
-                line_name=str_lines_modified,
-                sub_name=str_subs_modified,
-                gen_name=str_gens_modified,
-                ren_name=str_ren_modified,
-                storage_name=str_storage_modified,
-                action_id=action_id,
-            ),
-            list_actions,
+            action_id,
+            n_lines_modified,
+            n_subs_modified,
+            n_gens_modified,
+            n_ren_modified,
+            n_storage_modified,
+            str_lines_modified,
+            str_subs_modified,
+            str_gens_modified,
+            str_ren_modified,
+            str_storage_modified,
             lines_modified,
             subs_modified,
             gens_modified_names,
-            gens_modified_ids,
             ren_modified_names,
-            ren_modified_ids,
             storage_modified_names,
-            storage_modified_ids
         )
 
-    def get_lines_modifications(self, action):
-        action_dict = action.as_dict()
+    def _decode_attack(self, attack):
+        attack_dict = attack.as_dict()
+        n_lines_modified, _, lines_modified = self.get_lines_modifications(
+            attack, attack_dict
+        )
+        n_subs_modified, *_ = self.get_subs_modifications(attack, attack_dict)
+        is_attacked = n_lines_modified > 0 or n_subs_modified > 0
+        if len(lines_modified) == 0:
+            return is_attacked, ""
+        return is_attacked, lines_modified[0]
+
+    def get_lines_modifications(self, action, action_dict=None):
+        if action_dict is None:
+            action_dict = action.as_dict()
         n_lines_modified = 0
         lines_reconnected = []
         lines_disconnected = []
@@ -770,8 +950,9 @@ class EpisodeAnalytics:
 
         return n_lines_modified, str_lines_modified, lines_modified
 
-    def get_subs_modifications(self, action):
-        action_dict = action.as_dict()
+    def get_subs_modifications(self, action, action_dict=None):
+        if action_dict is None:
+            action_dict = action.as_dict()
         n_subs_modified = 0
         subs_modified = []
 
@@ -798,73 +979,37 @@ class EpisodeAnalytics:
         str_subs_modified = " - ".join(subs_modified_set)
         return n_subs_modified, str_subs_modified, subs_modified
 
-    def get_gens_modifications(
-        self,
-        action,
-        observation,
-        gens_modified_previous_time_step,
-        actual_dispatch_previous_ts,
-    ):
-        action_dict = action.as_dict()
+    def get_gens_modifications(self, action, action_dict=None):
+        if action_dict is None:
+            action_dict = action.as_dict()
         n_gens_modified = 0
         gens_modified_ids = []
         gens_modified_names = []
-        volume_redispatched=round(observation.actual_dispatch.sum(),2)
         if "redispatch" in action_dict:
             n_gens_modified = (action_dict["redispatch"] != 0).sum()
             gens_modified_ids = np.where(action_dict["redispatch"] != 0)[0]
             gens_modified_names = action.name_gen[gens_modified_ids]
 
-            #idx_redispathed=list(np.where(observation.target_dispatch > 0.0))
-            #if(len(idx_redispathed))!=0:
-            #    volume_redispatched = round(
-            #        # np.absolute(
-            #        # actual_dispatch_previous_ts[gens_modified_previous_time_step].sum()-
-            #        # observation.actual_dispatch[gens_modified_ids].sum(),
-            #        # ).sum(),
-            #        #action_dict["redispatch"].sum(),#+actual_dispatch_previous_ts.sum(),  # -
-            #        observation.actual_dispatch[idx_redispathed].sum(),
-            #        #observation.actual_dispatch.sum(),
-            #        2,
-            #    )
-
         str_gens_modified = " - ".join(gens_modified_names)
 
-
-
         return (
             n_gens_modified,
             str_gens_modified,
             gens_modified_names,
             gens_modified_ids,
-            volume_redispatched,
         )
 
-    def get_curtailment_modifications(
-        self,
-        action,
-        observation
-    ):
-        action_dict = action.as_dict()
+    def get_curtailment_modifications(self, action, action_dict=None):
+        if action_dict is None:
+            action_dict = action.as_dict()
         n_ren_modified = 0
         ren_modified_names = []
         ren_modified_ids = []
-        volume_curtailed=observation.curtailment_mw.sum()
         if "curtailment" in action_dict:
             n_ren_modified = (action_dict["curtailment"] >0.001).sum()
             ren_modified_ids = np.where(action_dict["curtailment"] >0.001)[0]
             ren_modified_names = action.name_gen[ren_modified_ids]
 
-            #volume_curtailed = round(
-            #    #action_dict["curtailment"].sum(),
-            #    observation.curtailment_mw.sum(),
-            #    #action.curtail_mw.sum(),
-            #    #np.absolute(
-            #    #    action_dict["curtailment"].sum(),#-observation.curtailment_mw.sum(),
-            #    #),
-            #    2,
-            #)
-
         str_ren_modified = " - ".join(ren_modified_names)
 
         return (
@@ -872,30 +1017,19 @@ class EpisodeAnalytics:
             str_ren_modified,
             ren_modified_names,
             ren_modified_ids,
-            volume_curtailed,
         )
 
-    def get_storage_modifications(
-        self,
-        action,
-        observation
-    ):
-        action_dict = action.as_dict()
+    def get_storage_modifications(self, action, action_dict=None):
+        if action_dict is None:
+            action_dict = action.as_dict()
         n_storage_modified = 0
         storage_modified_names = []
         storage_modified_ids = []
-        volume_stored=observation.storage_power.sum()
         if "storage_power" in action_dict:
             n_storage_modified = (action_dict["storage_power"] != 0).sum()
             storage_modified_ids = np.where(action_dict["storage_power"] != 0)[0]
             storage_modified_names = action.name_storage[storage_modified_ids]
 
-            #volume_stored = round(
-            #        observation.storage_power.sum(),#action_dict["storage_power"].sum()#-observation.storage_power).sum()
-#
-            #    2,
-            #)
-
         str_storage_modified = " - ".join(storage_modified_names)
 
         return (
@@ -903,11 +1037,8 @@ class EpisodeAnalytics:
             str_storage_modified,
             storage_modified_names,
             storage_modified_ids,
-            volume_stored,
         )
 
-
-
     def get_subs_and_lines_impacted(self, action):
         line_impact, sub_impact = action.get_topological_impact()
         sub_names = action.name_sub[sub_impact]
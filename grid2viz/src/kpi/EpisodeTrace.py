@@ -25,15 +25,18 @@ dic_light_colors_prod_types["solar"] = "palegoldenrod"
 
 
 def get_total_overflow_trace(episode_analytics, episode_data):
-    df = get_total_overflow_ts(episode_analytics, episode_data)
-    # line_in_overflow=
+    df = episode_analytics.total_overflow_ts
+    offsets = episode_analytics.overflow_line_offsets
+    line_ids = episode_analytics.overflow_line_ids
     return [
         go.Scatter(
             x=df["time"],
-            y=np.array(df["value"].tolist()),
+            y=df["value"].to_numpy(),
             text=[
-                "lines " + str(episode_data.line_names[liste]) if len(liste) > 0 else ""
-                for liste in df["line_ids"]
+                "lines " + str(episode_data.line_names[line_ids[begin:end]])
+                if end > begin
+                else ""
+                for begin, end in zip(offsets[:-1], offsets[1:])
             ],  # could be improve with names maybe, here only ids
             name="Nb of overflows",
         )
@@ -41,23 +44,70 @@ def get_total_overflow_trace(episode_analytics, episode_data):
 
 
 def get_total_overflow_ts(episode_analytics, episode_data):
+    """
+    Compute the overflows of every time step from the timestep_overflow
+    attribute of the observations.
+
+    Parameters
+    ----------
+    episode_analytics: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+        The episode, with its timesteps and timestamps already computed
+    episode_data: :class:`grid2viz.src.kpi.episode_reader.EpisodeReader`
+        The episode logs
+
+    Returns
+    -------
+    df: :class:`pandas.DataFrame`
+        The number of lines in overflow ("value") at each time step ("time")
+    offsets: :class:`numpy.ndarray`
+        Offsets in line_ids of each time step (CSR layout): the ids of the
+        lines starting an overflow at time step t are
+        ``line_ids[offsets[t]:offsets[t + 1]]``
+    line_ids: :class:`numpy.ndarray`
+        The ids of the lines starting an overflow, time step by time step
+    """
+    # Imported here, episode_reader importing grid2op which the pages only
+    # drawing from the summaries of the episodes do not need
+    from .episode_reader import extract_attributes
+
+    size = len(episode_analytics.timesteps)
+    timestep_overflow = extract_attributes(
+        episode_data.observations, ["timestep_overflow"], stop=size
+    )["timestep_overflow"]
     df = pd.DataFrame(
-        index=episode_analytics.timesteps, columns=["time", "value", "line_ids"]
+        {
+            "time": episode_analytics.timestamps[:size],
+            "value": (timestep_overflow > 0).sum(axis=1),
+        },
+        index=episode_analytics.timesteps,
     )
-    for (time_step, obs) in enumerate(episode_data.observations):
-        # TODO: observations length and timsteps length should match
-        try:
-            tstamp = episode_analytics.timestamps[time_step]
-            ov = obs.timestep_overflow
-            overflows = [i for i in range(len(ov)) if ov[i] == 1]
-            df.loc[time_step, :] = [tstamp, (ov > 0).sum(), overflows]
-        except:
-            pass
-    return df
+    time_steps, line_ids = np.nonzero(timestep_overflow == 1)
+    offsets = np.zeros(size + 1, dtype=int)
+    np.cumsum(np.bincount(time_steps, minlength=size), out=offsets[1:])
+    return df, offsets, line_ids
 
 
 def get_prod_share_trace(episode):
-    prod_types = episode.get_prod_types()
+    return make_prod_share_trace(**get_prod_share(episode))
+
+
+def get_prod_share(episode, observation_space=None):
+    """
+    Share of the production of each generator and production type.
+
+    Parameters
+    ----------
+    episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+    observation_space: :class:`grid2op.Observation.ObservationSpace`
+        Space giving the production types, the one of the episode if None
+
+    Returns
+    -------
+    res: :class:`dict`
+        Labels, values, parents and colors of the sectors of the sunburst,
+        see :func:`make_prod_share_trace`
+    """
+    prod_types = episode.get_prod_types(observation_space)
     prod_type_values = list(prod_types.values()) if len(prod_types.values()) > 0 else []
 
     share_prod = observation_model.get_prod(episode)
@@ -84,6 +134,15 @@ def get_prod_share_trace(episode):
                 value = value + df.get(gen)
         values.append(value)
 
+    return {
+        "labels": [str(label) for label in labels],
+        "values": [float(value) for value in values],
+        "parents": parents,
+        "colors": colors,
+    }
+
+
+def make_prod_share_trace(labels, values, parents, colors):
     return [
         go.Sunburst(
             labels=labels,
@@ -0,0 +1,80 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Atomic writes of the files and directories of the filesystem cache.
+
+They are written under a temporary name next to their final path, then
+renamed, so that a crash or a concurrent reader never sees them half written.
+"""
+
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+
+def temporary_path(path):
+    """
+    Unique temporary path next to a path, on the same filesystem.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Final path
+    """
+    return f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+def is_temporary_path(path):
+    """Whether a path was made by :func:`temporary_path`."""
+    return path.endswith(".tmp")
+
+
+@contextmanager
+def atomic_path(path, is_dir=False):
+    """
+    Yield a temporary path to write a file or a directory to, renamed to its
+    final path once written. Nothing is left behind if the writing fails.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Final path, replaced if it exists
+    is_dir: :class:`bool`
+        Whether a directory is written, created beforehand
+    """
+    tmp_path = temporary_path(path)
+    if is_dir:
+        os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+        if is_dir:
+            _replace_dir(tmp_path, path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if is_dir:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _replace_dir(tmp_path, path):
+    # A non empty directory cannot be replaced by a rename: the old one is
+    # moved away first, and only deleted once the new one is in place, so
+    # that the path is missing for the time of a rename only
+    old_path = None
+    if os.path.exists(path):
+        old_path = temporary_path(path)
+        os.rename(path, old_path)
+    try:
+        os.rename(tmp_path, path)
+    except BaseException:
+        if old_path is not None:
+            os.rename(old_path, path)
+        raise
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
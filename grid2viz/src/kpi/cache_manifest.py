@@ -0,0 +1,133 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Manifest of an entry of the filesystem cache.
+
+Whatever its format, an entry of the cache is described by a small json file
+recording the schema version of the cached episode and the size and
+modification time of each log file of the episode it was computed from.
+An entry whose manifest is missing or does not match anymore is stale:
+the logs of the agent were regenerated or grid2viz changed its data model.
+
+The manifest also records the size of the files of the entry, a cheap check
+that none of them was truncated or removed since the entry was written.
+The manifest being written last, an entry without one is incomplete.
+"""
+
+import json
+import os
+
+from .atomic import atomic_path
+
+# To be increased whenever the tables or attributes computed by
+# EpisodeAnalytics change, so that the entries cached before are rebuilt.
+# 2: tables saved with the compact dtypes of optimize_memory_footprint
+SCHEMA_VERSION = 2
+
+
+def source_signature(episode_path):
+    """
+    Size and modification time of the log files of an episode.
+
+    Parameters
+    ----------
+    episode_path: :class:`str`
+        Directory of the episode logs, e.g. ``<agents_dir>/<agent>/<scenario>``
+
+    Returns
+    -------
+    res: :class:`dict`
+        ``[size, mtime_ns]`` of each file of the directory, by file name
+    """
+    with os.scandir(episode_path) as entries:
+        return {
+            entry.name: [entry.stat().st_size, entry.stat().st_mtime_ns]
+            for entry in sorted(entries, key=lambda entry: entry.name)
+            if entry.is_file()
+        }
+
+
+def entry_signature(directory, entry_paths):
+    """
+    Size of the files of a cache entry.
+
+    Parameters
+    ----------
+    directory: :class:`str`
+        Directory of the manifest, the paths of the files being relative to it
+    entry_paths: :class:`list`
+        Files and directories of the entry
+
+    Returns
+    -------
+    res: :class:`dict`
+        Size of each file, by path relative to the directory
+    """
+    res = {}
+    for entry_path in entry_paths:
+        if os.path.isdir(entry_path):
+            files = [
+                os.path.join(root, file_name)
+                for root, _, file_names in os.walk(entry_path)
+                for file_name in file_names
+            ]
+        else:
+            files = [entry_path]
+        for file_path in files:
+            res[os.path.relpath(file_path, directory)] = os.path.getsize(file_path)
+    return res
+
+
+def write_manifest(path, episode_path, entry_paths=()):
+    """
+    Write the manifest of a cache entry computed from an episode.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the manifest
+    episode_path: :class:`str`
+        Directory of the episode logs
+    entry_paths: :class:`list`
+        Files and directories of the entry, whose size is checked when read
+    """
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "sources": source_signature(episode_path),
+        "files": entry_signature(os.path.dirname(path), entry_paths),
+    }
+    with atomic_path(path) as tmp_path, open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+
+
+def is_up_to_date(path, episode_path):
+    """
+    Whether a cache entry is complete and matches the current logs and
+    schema version.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the manifest of the entry
+    episode_path: :class:`str`
+        Directory of the episode logs
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("schema_version") != SCHEMA_VERSION or manifest.get(
+        "sources"
+    ) != source_signature(episode_path):
+        return False
+    directory = os.path.dirname(path)
+    for file_path, size in manifest.get("files", {}).items():
+        try:
+            if os.path.getsize(os.path.join(directory, file_path)) != size:
+                return False
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,83 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Summary of an episode shown on the card of its scenario, on the episodes page.
+
+The card only needs the production share, the daily consumption profile and
+the total duration of the maintenances of the episode of the best agent. They
+are saved in a small json file next to the entry of the filesystem cache, so
+that the cards are drawn without loading the episodes.
+"""
+
+import json
+
+from . import EpisodeTrace, consumption_profiles
+from .atomic import atomic_path
+
+# To be increased whenever the content of the summary changes
+SUMMARY_VERSION = 1
+
+PROFILE_STATS = ["quantile10", "quantile25", "median", "quantile75", "quantile90", "max"]
+
+
+def make_card_summary(episode, observation_space=None):
+    """
+    Summarize an episode for its card.
+
+    Parameters
+    ----------
+    episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+    observation_space: :class:`grid2op.Observation.ObservationSpace`
+        Space giving the production types, the one of the episode if None,
+        e.g. for an episode being cached, not decorated with its spaces
+
+    Returns
+    -------
+    res: :class:`dict`
+        Summary, to be saved with :func:`save_card_summary`
+    """
+    profiles = consumption_profiles.consumption_profiles(episode)
+    return {
+        "version": SUMMARY_VERSION,
+        "prod_share": EpisodeTrace.get_prod_share(episode, observation_space),
+        "consumption": {
+            "timestamp": [str(timestamp) for timestamp in profiles["timestamp"]],
+            **{stat: profiles["load"][stat].astype(float).tolist() for stat in PROFILE_STATS},
+        },
+        "total_maintenance_duration": float(episode.total_maintenance_duration),
+    }
+
+
+def save_card_summary(path, summary):
+    with atomic_path(path) as tmp_path, open(tmp_path, "w") as f:
+        json.dump(summary, f)
+
+
+def load_card_summary(path):
+    """
+    Read a summary saved with :func:`save_card_summary`.
+
+    Returns
+    -------
+    res: :class:`dict`
+        Summary, None if it is missing, unreadable or of another version
+    """
+    try:
+        with open(path) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if summary.get("version") != SUMMARY_VERSION:
+        return None
+    return summary
+
+
+def prod_share_trace(summary):
+    return EpisodeTrace.make_prod_share_trace(**summary["prod_share"])
+
+
+def consumption_traces(summary):
+    consumption = summary["consumption"]
+    return consumption_profiles.make_profiles_traces(consumption["timestamp"], consumption)
@@ -0,0 +1,216 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Compression codecs of the filesystem cache.
+
+Files written with :func:`open_write` start with a header naming their codec,
+so that :func:`open_read` reads them whatever the codec configured when they
+are read. Files of previous versions, without header, are read as gzip files
+or uncompressed ones.
+
+The ``lz4`` and ``zstd`` codecs need the ``lz4`` and ``zstandard`` packages.
+"""
+
+import gzip
+import io
+import pickle
+from contextlib import contextmanager
+
+from .atomic import atomic_path
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"G2VZ"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _gzip_writer(f, level):
+    # Level 6 of zlib rather than 9, much slower for a few percent smaller files
+    return gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6 if level is None else level)
+
+
+def _lz4_writer(f, level):
+    return lz4.frame.LZ4FrameFile(f, mode="wb", compression_level=level or 0)
+
+
+def _zstd_writer(f, level):
+    return zstandard.ZstdCompressor(level=3 if level is None else level).stream_writer(
+        f, closefd=False
+    )
+
+
+# Writer and reader of each codec, None when its package is not installed
+CODECS = {
+    "none": (lambda f, level: f, lambda f: f),
+    "gzip": (_gzip_writer, lambda f: gzip.GzipFile(fileobj=f, mode="rb")),
+    "lz4": None
+    if lz4 is None
+    else (_lz4_writer, lambda f: lz4.frame.LZ4FrameFile(f, mode="rb")),
+    "zstd": None
+    if zstandard is None
+    else (
+        _zstd_writer,
+        lambda f: zstandard.ZstdDecompressor().stream_reader(f, closefd=False),
+    ),
+}
+
+# Codec and level used when none is given, see set_default
+default_codec = "gzip"
+default_level = None
+
+
+def available_codecs():
+    """
+    Codecs whose package is installed.
+
+    Returns
+    -------
+    res: :class:`list`
+    """
+    return [name for name, codec in CODECS.items() if codec is not None]
+
+
+def check_codec(codec):
+    """
+    Raise a ValueError if a codec is unknown or its package is not installed.
+
+    Parameters
+    ----------
+    codec: :class:`str`
+        Name of the codec, e.g. ``"zstd"``
+    """
+    if codec not in CODECS:
+        raise ValueError(
+            f"cache_codec can only be one of {', '.join(CODECS)} or auto. {codec} passed"
+        )
+    if CODECS[codec] is None:
+        package = {"lz4": "lz4", "zstd": "zstandard"}[codec]
+        raise ValueError(
+            f"The {codec} codec needs the {package} package: pip install {package}"
+        )
+
+
+def set_default(codec, level=None):
+    """
+    Set the codec used when none is given.
+
+    Parameters
+    ----------
+    codec: :class:`str`
+        Name of the codec, or ``"auto"`` for the fastest one installed:
+        zstd, then lz4, then gzip
+    level: :class:`int`
+        Compression level, the default one of the codec if None
+    """
+    global default_codec, default_level
+    if codec == "auto":
+        codec = next(name for name in ["zstd", "lz4", "gzip"] if CODECS[name] is not None)
+    check_codec(codec)
+    default_codec = codec
+    default_level = level
+
+
+@contextmanager
+def open_write(path, codec=None, level=None):
+    """
+    Open a file to be written compressed, with a header naming its codec.
+    The file is only renamed to its path once written.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the file
+    codec: :class:`str`
+        Name of the codec, the default one if None
+    level: :class:`int`
+        Compression level, the default one if None
+    """
+    if codec is None:
+        codec = default_codec
+        if level is None:
+            level = default_level
+    check_codec(codec)
+    with atomic_path(path) as tmp_path, open(tmp_path, "wb") as f:
+        f.write(MAGIC + codec.encode() + b"\n")
+        stream = CODECS[codec][0](f, level)
+        try:
+            yield stream
+        finally:
+            stream.close()
+
+
+def read_codec(f):
+    """
+    Read the codec of a file from its header, and move to the data that follows.
+
+    Parameters
+    ----------
+    f: file object
+        File opened in binary mode, at its beginning
+
+    Returns
+    -------
+    res: :class:`str`
+        Name of the codec
+    """
+    head = f.read(len(MAGIC))
+    if head == MAGIC:
+        codec = f.readline().rstrip(b"\n").decode()
+        check_codec(codec)
+        return codec
+    # Files of previous versions
+    f.seek(0)
+    return "gzip" if head.startswith(GZIP_MAGIC) else "none"
+
+
+@contextmanager
+def open_read(path):
+    """
+    Open a file written with :func:`open_write`, or without header.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the file
+    """
+    with open(path, "rb") as f:
+        stream = CODECS[read_codec(f)][1](f)
+        try:
+            yield stream
+        finally:
+            stream.close()
+
+
+def dump(value, path, codec=None, level=None):
+    """Pickle a value in a compressed file."""
+    with open_write(path, codec, level) as f:
+        pickle.dump(value, f, protocol=4)
+
+
+def load(path):
+    """Read a value pickled with :func:`dump`."""
+    # Read at once: streams of some codecs cannot read lines, as pickle may do
+    with open_read(path) as f:
+        return pickle.loads(f.read())
+
+
+def read_bytes(path):
+    """
+    Read the uncompressed content of a file.
+
+    Returns
+    -------
+    res: :class:`io.BytesIO`
+    """
+    with open_read(path) as f:
+        return io.BytesIO(f.read())
@@ -55,46 +55,61 @@ def consumption_profiles(episode, freq="30T"):
 def profiles_traces(episode, freq="30T"):
     episode_data = episode
     df = consumption_profiles(episode_data, freq)
+    return make_profiles_traces(df["timestamp"], df["load"])
+
+
+def make_profiles_traces(timestamp, load):
+    """
+    Traces of the daily consumption profile.
+
+    Parameters
+    ----------
+    timestamp:
+        Time of the day of each point of the profile
+    load:
+        Quantiles (quantile10, quantile25, median, quantile75, quantile90)
+        and max of the load at each point, by name
+    """
     line = {"shape": "spline", "width": 0, "smoothing": 1}
     trace = [
         go.Scatter(
-            x=df["timestamp"], y=df["load"]["quantile10"], name="quantile 10", line=line
+            x=timestamp, y=load["quantile10"], name="quantile 10", line=line
         ),
         go.Scatter(
-            x=df["timestamp"],
-            y=df["load"]["quantile25"],
+            x=timestamp,
+            y=load["quantile25"],
             name="quantile 25",
             fill="tonexty",
             fillcolor="rgba(159, 197, 232, 0.63)",
             line=line,
         ),
         go.Scatter(
-            x=df["timestamp"],
-            y=df["load"]["median"],
+            x=timestamp,
+            y=load["median"],
             name="median",
             fill="tonexty",
             fillcolor="rgba(31, 119, 180, 0.5)",
             line={"color": "rgb(31, 119, 180)", "shape": "spline", "smoothing": 1},
         ),
         go.Scatter(
-            x=df["timestamp"],
-            y=df["load"]["quantile75"],
+            x=timestamp,
+            y=load["quantile75"],
             name="quantile 75",
             fill="tonexty",
             fillcolor="rgba(31, 119, 180, 0.5)",
             line=line,
         ),
         go.Scatter(
-            x=df["timestamp"],
-            y=df["load"]["quantile90"],
+            x=timestamp,
+            y=load["quantile90"],
             name="quantile 90",
             fill="tonexty",
             fillcolor="rgba(159, 197, 232, 0.63)",
             line=line,
         ),
         go.Scatter(
-            x=df["timestamp"],
-            y=df["load"]["max"],
+            x=timestamp,
+            y=load["max"],
             name="Max",
             line={"shape": "spline", "smoothing": 1, "color": "rgba(255,0,0,0.5)"},
         ),
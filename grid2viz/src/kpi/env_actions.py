@@ -2,6 +2,7 @@
 # See AUTHORS.txt
 # SPDX-License-Identifier: MPL-2.0
 
+import numpy as np
 import pandas as pd
 
 
@@ -15,24 +16,90 @@ def env_actions(episode, which="hazards", kind="ts", aggr=True):
             "which argument can only be either hazards or "
             f"maintenances. {which} passed"
         )
+    if kind in ("nb", "dur"):
+        values, line_names = env_actions_matrix(episode, which)
+        nb_events, durations, _ = env_action_events(values)
+        # Lines sorted by name, like the columns of the pivot table of kind ts
+        index = pd.Index(line_names, name="line_name")
+        if kind == "dur":
+            return pd.Series(durations, index=index).sort_index()
+        env_acts = pd.Series(nb_events, index=index).sort_index()
+        if aggr:
+            env_acts = env_acts.sum()
+        return env_acts
+
     env_acts = getattr(episode, which)
     #env_acts = env_acts.fillna(0)
     env_acts = pd.pivot_table(
         env_acts, index="timestamp", columns=["line_name"], values="value"
     )
-
-    if kind == "dur":
-        env_acts = env_acts.sum()
-    if kind == "nb":
-        equipments = env_acts.columns
-        for col in env_acts.columns:
-            env_acts["temp"] = env_acts[col].shift(1).fillna(0)
-            env_acts[col] = env_acts[[col, "temp"]].apply(
-                lambda row: 1 if row[0] == 1 and row[1] == 0 else 0, axis=1
-            )
-        env_acts = env_acts[equipments].sum()
-        if aggr:
-            env_acts = env_acts.sum()
-    if kind == "ts" and aggr:
+    if aggr:
         env_acts = env_acts.sum(axis=1).to_frame(name=which)
     return env_acts
+
+
+def env_actions_matrix(episode, which="hazards"):
+    """
+    Get the hazards or maintenances of an episode as a (T x n_lines) matrix.
+
+    Parameters
+    ----------
+    episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+        The episode, whose hazards and maintenances frames hold one row per
+        time step and line
+    which: :class:`str`
+        Either "hazards" or "maintenances"
+
+    Returns
+    -------
+    values: :class:`numpy.ndarray`
+        Boolean matrix, True when the line is in hazard / maintenance
+    line_names: :class:`numpy.ndarray`
+        Names of the lines, in the order of the matrix columns, i.e. by line id
+    """
+    env_acts = getattr(episode, which)
+    # Placed by time step and line id, whatever the order of the rows
+    timesteps = np.asarray(env_acts.timestep, dtype=np.int64)
+    line_ids = np.asarray(env_acts.line_id, dtype=np.int64)
+    _, rows = np.unique(timesteps, return_inverse=True)
+    n_lines = line_ids.max() + 1 if len(line_ids) else 0
+    values = np.zeros((rows.max() + 1 if len(rows) else 0, n_lines), dtype=bool)
+    values[rows.reshape(-1), line_ids] = env_acts.value.to_numpy(dtype=bool)
+    line_names = np.empty(n_lines, dtype=object)
+    line_names[line_ids] = env_acts.line_name.to_numpy()
+    return values, line_names
+
+
+def env_action_events(values):
+    """
+    Find the events of each column of a 0/1 matrix, an event being a run of
+    consecutive time steps at 1.
+
+    All the events are found with a single diff over the matrix: an event
+    starts on a 0 -> 1 edge and ends on the next 1 -> 0 edge.
+
+    Parameters
+    ----------
+    values: :class:`numpy.ndarray`
+        (T x n) matrix of 0/1 or boolean values
+
+    Returns
+    -------
+    nb_events: :class:`numpy.ndarray`
+        Number of events of each column
+    durations: :class:`numpy.ndarray`
+        Number of time steps at 1 of each column
+    intervals: :class:`numpy.ndarray`
+        (n_events x 3) matrix of the events as (column, start, end) triplets,
+        ``end`` being the first time step after the event
+    """
+    values = np.asarray(values, dtype=np.int8)
+    no_event = np.zeros((1, values.shape[1]), dtype=np.int8)
+    edges = np.diff(np.vstack([no_event, values, no_event]), axis=0)
+    # Transposed so that the edges are sorted by column, then by time step
+    start_columns, starts = np.nonzero(edges.T == 1)
+    _, ends = np.nonzero(edges.T == -1)
+    nb_events = np.bincount(start_columns, minlength=values.shape[1])
+    durations = values.sum(axis=0)
+    intervals = np.column_stack([start_columns, starts, ends])
+    return nb_events, durations, intervals
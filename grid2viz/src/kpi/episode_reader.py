@@ -0,0 +1,274 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Reader of the episode logs written by the grid2op runner.
+
+:func:`grid2op.Episode.EpisodeData.from_disk` builds a grid2op object for every
+action and observation of the episode when it is loaded. :class:`EpisodeReader`
+only loads the npz files as raw matrices: the attributes needed by the KPIs are
+sliced for the whole episode at once with :func:`extract_attributes`, and grid2op
+objects are only built when an element of a collection is accessed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from grid2op.Action import ActionSpace
+from grid2op.Episode import EpisodeData
+from grid2op.Observation import ObservationSpace
+
+
+# Spaces already parsed, by class and content hash of their json file, and the
+# content hash of each json file read, by class and path, with its size and mtime
+_spaces = {}
+_space_files = {}
+_spaces_lock = threading.Lock()
+
+
+def load_space(space_class, path):
+    """
+    Read an action or observation space from its ``dict_*_space.json`` file,
+    parsing each distinct file content only once.
+
+    The spaces are the same for all the episodes of an agent, and usually for
+    all the agents run on the same environment: the spaces returned are shared
+    by all of them, and must not be modified.
+
+    Parameters
+    ----------
+    space_class: :class:`type`
+        :class:`grid2op.Action.ActionSpace` or :class:`grid2op.Observation.ObservationSpace`
+    path: :class:`str`
+        Path of the json file of the space
+
+    Returns
+    -------
+    res: :class:`grid2op.Action.ActionSpace` or :class:`grid2op.Observation.ObservationSpace`
+    """
+    stat = os.stat(path)
+    file_key = (space_class, os.path.abspath(path))
+    with _spaces_lock:
+        known = _space_files.get(file_key)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return _spaces[(space_class, known[2])]
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        space_key = (space_class, content_hash)
+        if space_key not in _spaces:
+            _spaces[space_key] = space_class.from_dict(path)
+        _space_files[file_key] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return _spaces[space_key]
+
+
+def extract_attributes(collection, attributes, start=0, stop=None):
+    """
+    Extract some attributes of a collection of actions or observations
+    directly from their vector representation.
+
+    Parameters
+    ----------
+    collection: :class:`VectCollection` or :class:`grid2op.Episode.EpisodeData.CollectionWrapper` or :class:`list`
+        The collection to read, the attribute layout is given by its ``helper``
+        space (the one read from the ``dict_*_space.json`` file of the agent).
+        A plain list of grid2op objects, like the observations of an episode
+        loaded from the cache, is read object by object
+    attributes: :class:`list`
+        Names of the attributes to extract, as listed in ``attr_list_vect``
+        (e.g. ``"gen_p"`` and not its ``"prod_p"`` alias)
+    start: :class:`int`
+        First time step to extract
+    stop: :class:`int`
+        Time step after the last one to extract, the length of the collection
+        if not given
+
+    Returns
+    -------
+    res: :class:`dict`
+        For each attribute, a (T x n) array whose row ``t`` is the attribute
+        of the element ``start + t`` of the collection, with the attribute's dtype
+    """
+    if stop is None:
+        stop = len(collection)
+    if not hasattr(collection, "collection"):
+        return {
+            attribute: np.stack(
+                [getattr(element, attribute) for element in collection[start:stop]]
+            )
+            for attribute in attributes
+        }
+    vects = collection.collection[start:stop]
+    res = {}
+    for attribute in attributes:
+        beg_, end_, dtype = collection.helper.get_indx_extract(attribute)
+        res[attribute] = vects[:, beg_:end_].astype(dtype)
+    return res
+
+
+class VectCollection:
+    """
+    Read only counterpart of :class:`grid2op.Episode.EpisodeData.CollectionWrapper`
+    building the grid2op objects on demand.
+
+    Like the grid2op collection, its length stops at the first vector that grid2op
+    would not load because of non finite values (the game over).
+
+    Parameters
+    ----------
+    collection: :class:`numpy.ndarray`
+        The matrix of vectors, which may be memory-mapped
+    helper: :class:`grid2op.Action.ActionSpace` or :class:`grid2op.Observation.ObservationSpace`
+        The space used to build the objects from the vectors
+    check_legit: :class:`bool`
+        Whether the objects are checked when built
+    find_game_over: :class:`bool`
+        Whether to look for the game over, which needs to read the whole matrix.
+        Not needed for the collections of the filesystem cache, that only hold
+        the vectors before the game over
+    max_objects: :class:`int`
+        Number of objects kept once built, the ones not accessed for the longest
+        time being dropped first. All of them are kept if None
+    """
+
+    def __init__(
+        self, collection, helper, check_legit=True, find_game_over=True, max_objects=None
+    ):
+        self.collection = collection
+        self.helper = helper
+        self.check_legit = check_legit
+        self._game_over = self._find_game_over() if find_game_over else None
+        self.max_objects = max_objects
+        self._objects = OrderedDict()
+
+    def _find_game_over(self):
+        # Same rule as the from_vect of grid2op: only the attributes
+        # of attr_nan_list_set may hold non finite values
+        must_be_finite = np.ones(self.collection.shape[1], dtype=bool)
+        for attribute in self.helper.subtype.attr_nan_list_set or []:
+            if attribute in self.helper.attr_list_vect:
+                beg_, end_, _ = self.helper.get_indx_extract(attribute)
+                must_be_finite[beg_:end_] = False
+        non_finite = ~np.isfinite(self.collection[:, must_be_finite]).all(axis=1)
+        if non_finite.any():
+            return int(np.argmax(non_finite))
+        return None
+
+    @property
+    def nbytes(self):
+        """Memory held by the objects built so far, estimated from their vectors."""
+        return len(self._objects) * self.collection[0].nbytes
+
+    def __len__(self):
+        if self._game_over is None:
+            return self.collection.shape[0]
+        return self._game_over
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(
+                f"Trying to reach element {i} but there are only {len(self)} elements."
+            )
+        if i in self._objects:
+            self._objects.move_to_end(i)
+            return self._objects[i]
+        # Copied so that the object does not hold a view of a read only
+        # memory-mapped matrix
+        obj = self.helper.from_vect(
+            np.array(self.collection[i, :]), check_legit=self.check_legit
+        )
+        self._objects[i] = obj
+        if self.max_objects is not None and len(self._objects) > self.max_objects:
+            self._objects.popitem(last=False)
+        return obj
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class EpisodeReader:
+    """
+    Episode logs of an agent, loaded as raw matrices.
+
+    It exposes the attributes of :class:`grid2op.Episode.EpisodeData` used to
+    compute an :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`,
+    but cannot reboot the environment: the simulation still needs the grid2op
+    :class:`grid2op.Episode.EpisodeData`.
+
+    Parameters
+    ----------
+    agent_path: :class:`str`
+        Directory of the agent logs
+    name: :class:`str`
+        Name of the episode
+    """
+
+    def __init__(self, agent_path, name):
+        self.agent_path = os.path.abspath(agent_path)
+        self.name = name
+        episode_path = os.path.join(self.agent_path, name)
+
+        self.observation_space = load_space(
+            ObservationSpace, os.path.join(self.agent_path, EpisodeData.OBS_SPACE)
+        )
+        self.action_space = load_space(
+            ActionSpace, os.path.join(self.agent_path, EpisodeData.ACTION_SPACE)
+        )
+        self.helper_action_env = load_space(
+            ActionSpace, os.path.join(self.agent_path, EpisodeData.ENV_MODIF_SPACE)
+        )
+        self.attack_space = load_space(
+            ActionSpace, os.path.join(self.agent_path, EpisodeData.ATTACK_SPACE)
+        )
+
+        with open(os.path.join(episode_path, EpisodeData.META)) as f:
+            self.meta = json.load(fp=f)
+        with open(os.path.join(episode_path, EpisodeData.OTHER_REWARDS)) as f:
+            self.other_rewards = json.load(fp=f)
+
+        def load_npz(file_name):
+            return np.load(os.path.join(episode_path, file_name))["data"]
+
+        self.rewards = load_npz(EpisodeData.REWARDS)
+        self.actions = VectCollection(
+            load_npz(EpisodeData.ACTIONS_FILE), self.action_space, check_legit=False
+        )
+        self.observations = VectCollection(
+            load_npz(EpisodeData.OBSERVATIONS_FILE), self.observation_space
+        )
+        self.env_actions = VectCollection(
+            load_npz(EpisodeData.ENV_ACTIONS_FILE),
+            self.helper_action_env,
+            check_legit=False,
+        )
+        self.attacks = VectCollection(load_npz(EpisodeData.ATTACK), self.attack_space)
+
+        # Same game over for all collections, as in EpisodeData
+        game_overs = [
+            collection._game_over
+            for collection in [self.actions, self.observations, self.env_actions]
+            if collection._game_over is not None
+        ]
+        if "nb_timestep_played" in self.meta:
+            game_overs.append(int(self.meta["nb_timestep_played"]))
+        if game_overs:
+            game_over = min(game_overs)
+            self.actions._game_over = game_over
+            self.observations._game_over = game_over + 1
+            self.env_actions._game_over = game_over
+
+        self.load_names = self.action_space.name_load
+        self.n_loads = len(self.load_names)
+        self.prod_names = self.action_space.name_gen
+        self.n_prods = len(self.prod_names)
+        self.line_names = self.action_space.name_line
+        self.n_lines = len(self.line_names)
+        self.name_sub = self.action_space.name_sub
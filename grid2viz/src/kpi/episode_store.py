@@ -0,0 +1,434 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Columnar filesystem cache of an :class:`EpisodeAnalytics`.
+
+An episode is saved in a directory holding:
+
+- one ``<table>.npz`` file per DataFrame, with one or a few numpy arrays per column,
+- ``observations.npy`` and ``actions.npy``, the vector representation of the
+  grid2op observations and actions of the episode, memory-mapped when loaded,
+- ``attributes.npz`` for the other arrays and lists of the episode,
+- ``manifest.json`` describing all of them, along with the small attributes
+  (names, meta, ...).
+
+The ``.npz`` files are compressed with the codec of
+:mod:`grid2viz.src.kpi.compression` given when saving, which is read back from
+their header.
+
+With ``memory_map=True``, each table is instead saved as a ``<table>/``
+directory of uncompressed ``.npy`` arrays, memory-mapped when loaded: the
+processes serving the app share the pages of these files rather than each
+holding a copy of the tables.
+
+Unlike the gzip pickle of the whole episode, each table can be read on its own:
+:func:`load_episode` returns an episode whose tables and observations are only
+read from disk when first accessed.
+"""
+
+import datetime as dt
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import compression
+from .atomic import atomic_path
+from .EpisodeAnalytics import EpisodeAnalytics
+from .episode_reader import VectCollection
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ATTRIBUTES = "attributes"
+
+# Collections of grid2op objects saved as a matrix of vectors, with the space
+# used to read them back and whether their legality is checked when they are
+COLLECTIONS = {
+    "observations": ("observation_space", True),
+    "actions": ("action_space", False),
+}
+# Number of observations and actions kept in memory once built
+MAX_OBJECTS = 16
+
+
+def is_episode_store(path):
+    """
+    Whether a columnar cache of an episode exists in a directory.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Directory of the cached episode
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def save_episode(path, episode, memory_map=False, codec=None, level=None):
+    """
+    Save an episode as a columnar cache.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Directory of the cached episode, replaced if it exists
+    episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+        The episode, decorated with its observations and actions
+    memory_map: :class:`bool`
+        Whether the tables are saved uncompressed, to be memory-mapped when loaded
+    codec: :class:`str`
+        Compression codec of the files, the default one of
+        :mod:`grid2viz.src.kpi.compression` if None
+    level: :class:`int`
+        Compression level of the codec
+    """
+    # Written in a temporary directory renamed once complete
+    with atomic_path(path, is_dir=True) as tmp_path:
+        _write_episode(tmp_path, episode, memory_map, codec, level)
+
+
+def _write_episode(path, episode, memory_map, codec, level):
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "tables": {},
+        "collections": {},
+        "vectors": {},
+        "attributes": {},
+        "pickled": [],
+    }
+    vectors = {}
+    pickled = {}
+    for name, value in episode.cache_state().items():
+        if isinstance(value, pd.DataFrame):
+            manifest["tables"][name] = _save_frame(
+                os.path.join(path, name), value, memory_map, codec, level
+            )
+        elif name in COLLECTIONS:
+            file_name = name + ".npy"
+            np.save(os.path.join(path, file_name), _collection_matrix(value))
+            manifest["collections"][name] = file_name
+        elif isinstance(value, (np.ndarray, list)):
+            array = np.asarray(value)
+            if isinstance(value, list) and (array.dtype == object or array.ndim != 1):
+                array = np.empty(len(value), dtype=object)
+                array[:] = value
+            try:
+                kind, arrays = _encode_column(array)
+            except TypeError:
+                pickled[name] = value
+                continue
+            vectors.update({f"{name}.{key}": array for key, array in arrays.items()})
+            manifest["vectors"][name] = {
+                "kind": kind,
+                "container": "list" if isinstance(value, list) else "array",
+            }
+        elif _is_json(value):
+            manifest["attributes"][name] = value
+        else:
+            pickled[name] = value
+    _save_arrays(os.path.join(path, ATTRIBUTES + ".npz"), vectors, codec, level)
+    if pickled:
+        compression.dump(pickled, os.path.join(path, ATTRIBUTES + ".pkl"), codec, level)
+        manifest["pickled"] = list(pickled)
+    # The manifest is written last: a cache without it is incomplete
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+
+def load_episode(path):
+    """
+    Load an episode from a columnar cache.
+
+    The tables, observations and actions of the episode are only read when
+    first accessed. The observations and actions are rebuilt with the
+    ``observation_space`` and ``action_space`` of the episode, which must be
+    decorated with them beforehand.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Directory of the cached episode
+
+    Returns
+    -------
+    episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+    """
+    store = EpisodeStore(path)
+    episode = EpisodeAnalytics.__new__(EpisodeAnalytics)
+    episode.__dict__.update(store.load_attributes())
+    episode._table_store = store
+    return episode
+
+
+class EpisodeStore:
+    """
+    Reader of the columnar cache of an episode.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Directory of the cached episode
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"The cache in {path} was written with a newer version of grid2viz "
+                f"(format {self.manifest['format_version']})"
+            )
+        self.tables = list(self.manifest["tables"])
+        self.names = self.tables + list(self.manifest["collections"])
+
+    def load_attributes(self):
+        """
+        Read the attributes of the episode other than its tables and collections.
+
+        Returns
+        -------
+        res: :class:`dict`
+        """
+        res = dict(self.manifest["attributes"])
+        if self.manifest["vectors"]:
+            with _load_arrays(os.path.join(self.path, ATTRIBUTES + ".npz")) as arrays:
+                for name, vector in self.manifest["vectors"].items():
+                    value = _decode_column(vector["kind"], arrays, name + ".")
+                    res[name] = list(value) if vector["container"] == "list" else value
+        if self.manifest["pickled"]:
+            res.update(compression.load(os.path.join(self.path, ATTRIBUTES + ".pkl")))
+        return res
+
+    def load_table(self, name):
+        """
+        Read a single table of the episode.
+
+        Parameters
+        ----------
+        name: :class:`str`
+            Name of the table, e.g. ``"rho"``
+
+        Returns
+        -------
+        res: :class:`pandas.DataFrame`
+        """
+        return _load_frame(os.path.join(self.path, name), self.manifest["tables"][name])
+
+    def load(self, name, episode):
+        """
+        Read a table or collection of an episode loaded with :func:`load_episode`.
+
+        Parameters
+        ----------
+        name: :class:`str`
+            Name of the table or collection
+        episode: :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+            The episode, holding the spaces needed to read its collections
+        """
+        if name in self.tables:
+            return self.load_table(name)
+        space, check_legit = COLLECTIONS[name]
+        # Memory-mapped: only the vectors of the objects built are read
+        matrix = np.load(
+            os.path.join(self.path, self.manifest["collections"][name]), mmap_mode="r"
+        )
+        return VectCollection(
+            matrix,
+            getattr(episode, space),
+            check_legit=check_legit,
+            find_game_over=False,
+            max_objects=MAX_OBJECTS,
+        )
+
+
+def _collection_matrix(collection):
+    # Episodes read with an EpisodeReader or an EpisodeData already hold
+    # the matrix of vectors
+    if hasattr(collection, "collection"):
+        return collection.collection[: len(collection)]
+    return np.stack([element.to_vect() for element in collection])
+
+
+def _is_json(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _save_frame(path, frame, memory_map=False, codec=None, level=None):
+    arrays = {}
+    kinds = []
+    for i in range(frame.shape[1]):
+        column = frame.iloc[:, i]
+        try:
+            kind, column_arrays = _encode_column(column.array)
+        except TypeError:
+            kind, column_arrays = _pickle_column(column.array)
+        kinds.append(kind)
+        arrays.update({f"{i}.{key}": array for key, array in column_arrays.items()})
+    has_index = not frame.index.equals(pd.RangeIndex(len(frame)))
+    if has_index:
+        index_kind, index_arrays = _encode_column(frame.index.array)
+        arrays.update({f"index.{key}": array for key, array in index_arrays.items()})
+    if memory_map:
+        os.makedirs(path, exist_ok=True)
+        for key, array in arrays.items():
+            np.save(os.path.join(path, key + ".npy"), array)
+    else:
+        _save_arrays(path + ".npz", arrays, codec, level)
+    return {
+        "storage": "npy" if memory_map else "npz",
+        "columns": [
+            list(label) if isinstance(label, tuple) else label for label in frame.columns
+        ],
+        "column_levels": frame.columns.nlevels,
+        "column_names": list(frame.columns.names),
+        "kinds": kinds,
+        "index": {"kind": index_kind, "name": frame.index.name} if has_index else None,
+    }
+
+
+def _load_frame(path, table):
+    if table.get("storage") == "npy":
+        columns, index = _decode_frame(_load_npy_dir(path), table)
+    else:
+        with _load_arrays(
+            path + ".npz", allow_pickle="pickle" in table["kinds"]
+        ) as arrays:
+            columns, index = _decode_frame(arrays, table)
+    # Series keep object columns of dates as such. Not copied, nor consolidated,
+    # so that memory-mapped columns stay so
+    frame = pd.DataFrame(
+        {
+            i: pd.Series(column, index=index, dtype=getattr(column, "dtype", None))
+            for i, column in enumerate(columns)
+        },
+        index=index,
+        copy=False,
+    )
+    if table["column_levels"] > 1:
+        frame.columns = pd.MultiIndex.from_tuples(
+            [tuple(label) for label in table["columns"]], names=table["column_names"]
+        )
+    else:
+        frame.columns = pd.Index(table["columns"], name=table["column_names"][0])
+    return frame
+
+
+def _save_arrays(path, arrays, codec=None, level=None):
+    # Uncompressed npz archive, compressed as a whole by the codec
+    with compression.open_write(path, codec, level) as f:
+        np.savez(f, **arrays)
+
+
+def _load_arrays(path, allow_pickle=False):
+    # Also reads the npz archives of previous versions, compressed by numpy
+    return np.load(compression.read_bytes(path), allow_pickle=allow_pickle)
+
+
+def _decode_frame(arrays, table):
+    columns = [
+        _decode_column(kind, arrays, f"{i}.") for i, kind in enumerate(table["kinds"])
+    ]
+    index = None
+    if table["index"] is not None:
+        index = pd.Index(
+            _decode_column(table["index"]["kind"], arrays, "index."),
+            name=table["index"]["name"],
+        )
+    return columns, index
+
+
+def _load_npy_dir(path):
+    arrays = {}
+    for file_name in os.listdir(path):
+        file_path = os.path.join(path, file_name)
+        try:
+            # Copy on write: pages are shared between processes until written
+            arrays[file_name[: -len(".npy")]] = np.load(file_path, mmap_mode="c")
+        except ValueError:
+            # Arrays of python objects, or empty ones, cannot be memory-mapped
+            arrays[file_name[: -len(".npy")]] = np.load(file_path, allow_pickle=True)
+    return arrays
+
+
+def _encode_column(values):
+    """
+    Encode a column as a few numpy arrays that can be saved without pickle.
+
+    Returns the kind of encoding and the arrays:
+
+    - "values": numbers, booleans and dates, saved as is,
+    - "category": pandas categoricals, saved as their codes and categories,
+    - "object": other scalars like strings, saved as codes and unique values,
+    - "list": lists of such scalars, saved as their flattened "object"
+      encoding and the offsets of each list in it.
+
+    Raises a TypeError for any other value.
+    """
+    if isinstance(values, pd.Categorical):
+        kind, categories = _encode_uniques(np.asarray(values.categories, dtype=object))
+        return "category", {"codes": values.codes, "categories." + kind: categories}
+    values = np.asarray(values)
+    if values.dtype != object:
+        return "values", {"values": values}
+    if len(values) and all(isinstance(value, list) for value in values):
+        lengths = np.array([len(value) for value in values])
+        flat = np.empty(lengths.sum(), dtype=object)
+        flat[:] = [element for value in values for element in value]
+        _, arrays = _encode_column(flat)
+        arrays["offsets"] = np.concatenate([[0], np.cumsum(lengths)])
+        return "list", arrays
+    try:
+        codes, uniques = pd.factorize(values)
+    except TypeError:
+        raise TypeError("Column values cannot be encoded")
+    kind, uniques = _encode_uniques(np.asarray(uniques, dtype=object))
+    return "object", {"codes": codes, "uniques." + kind: uniques}
+
+
+def _encode_uniques(uniques):
+    if all(isinstance(value, str) for value in uniques):
+        return "str", np.array(uniques.tolist(), dtype=str)
+    if all(isinstance(value, dt.datetime) for value in uniques):
+        return "datetime", np.array(uniques.tolist(), dtype="datetime64[us]")
+    array = np.array(uniques.tolist())
+    if array.dtype.kind not in "biuf":
+        raise TypeError("Column values cannot be encoded")
+    return "values", array
+
+
+def _pickle_column(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = list(values)
+    return "pickle", {"values": array}
+
+
+def _decode_uniques(arrays, prefix):
+    for kind in ["str", "datetime", "values"]:
+        if prefix + kind in arrays:
+            # Back to python objects: str, datetime.datetime, int or float
+            return arrays[prefix + kind].astype(object)
+
+
+def _decode_column(kind, arrays, prefix):
+    if kind in ["values", "pickle"]:
+        return arrays[prefix + "values"]
+    codes = arrays[prefix + "codes"]
+    if kind == "category":
+        categories = _decode_uniques(arrays, prefix + "categories.")
+        return pd.Categorical.from_codes(codes, categories=categories)
+    # Missing values are coded as -1 and read back as None
+    uniques = np.append(_decode_uniques(arrays, prefix + "uniques."), None)
+    values = uniques[codes]
+    if kind == "list":
+        offsets = arrays[prefix + "offsets"]
+        res = np.empty(len(offsets) - 1, dtype=object)
+        res[:] = [values[beg:end].tolist() for beg, end in zip(offsets[:-1], offsets[1:])]
+        return res
+    return values
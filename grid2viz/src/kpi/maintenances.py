@@ -2,15 +2,15 @@
 # See AUTHORS.txt
 # SPDX-License-Identifier: MPL-2.0
 
-from .env_actions import env_actions
+from .env_actions import env_action_events, env_actions_matrix
 
 
 def total_duration_maintenance(episode):
     timestep_duration = episode.timestamps[1] - episode.timestamps[0]
-    nb_maintenance = env_actions(
-        episode, which="maintenances", kind="dur", aggr=False
-    ).sum()
-    return (timestep_duration * nb_maintenance).total_seconds() / 60.0
+    _, durations, _ = env_action_events(
+        env_actions_matrix(episode, which="maintenances")[0]
+    )
+    return (timestep_duration * int(durations.sum())).total_seconds() / 60.0
 
 
 def hist_duration_maintenances(episode):
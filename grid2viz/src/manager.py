@@ -9,19 +9,30 @@ import os
 import time
 from pathlib import Path
 import pickle
-import gzip
+import queue
+import shutil
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: entries are only locked within a process
+    fcntl = None
 
 from colorama import Fore, Style
-import dill
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from scipy.spatial import ConvexHull
-from grid2op.Episode import EpisodeData
-from grid2op.PlotGrid import PlotPlotly, PlotMatplot
 
-from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+# grid2op, and the modules of grid2viz.src.kpi importing it, scipy and
+# matplotlib are imported on first use in the functions below, so that the
+# server starts without waiting for them
+from grid2viz.src.kpi import cache_manifest, card_summary, compression
+from grid2viz.src.utils import catalog
+from grid2viz.src.utils.json_tail import read_last_record
+from grid2viz.src.utils.ram_cache import RamCache
 
 # refer to https://github.com/rte-france/Grid2Op/blob/master/getting_started/8_PlottingCapabilities.ipynb for better usage
 
@@ -31,6 +42,8 @@ graph_matplotlib = None
 
 # TODO: addSubstationColor - integrate that into grid2op Plotgrid
 def add_substation_color_matplot(subs, plot_helper, fig):
+    import matplotlib.pyplot as plt
+
     radius_size = plot_helper._sub_radius
     # fig = plot_helper.plot_layout()
     ax = fig.gca()
@@ -80,6 +93,8 @@ def add_alarm_area_plotly(line_subs, plot_helper, fig, color="gold"):
         x.append(x_center)
         y.append(y_center)
 
+    from scipy.spatial import ConvexHull
+
     points = [[lx, ly] for lx, ly in zip(x, y)]
     hull = ConvexHull(points)
     hull_vertices_x = [x[i] for i in hull.vertices]
@@ -106,6 +121,8 @@ def make_network(episode, responsive=True):
     """
     global graph
     if graph is None:
+        from grid2op.PlotGrid import PlotPlotly
+
         graph = PlotPlotly(
             grid_layout=episode.observation_space.grid_layout,
             observation_space=episode.observation_space,
@@ -117,6 +134,8 @@ def make_network(episode, responsive=True):
 def make_network_matplotlib(episode,timestep=0):
     global graph_matplotlib
     if graph_matplotlib is None:
+        from grid2op.PlotGrid import PlotMatplot
+
         graph_matplotlib = PlotMatplot(
             grid_layout=episode.observation_space.grid_layout,
             observation_space=episode.observation_space,
@@ -283,9 +302,7 @@ def make_network_agent_overview(episode):
             episode.attacks_data_table.attack
         ].unique()
     )
-    lines_overflowed_ids = list(
-        itertools.chain.from_iterable(episode.total_overflow_ts.line_ids)
-    )
+    lines_overflowed_ids = list(episode.overflow_line_ids)
     # to color assets on our graph with different colors while not overloading it with information
     # we will use plot_obs instead of plot_info for now
     ####
@@ -380,7 +397,17 @@ def make_network_scenario_overview(episode,timestep=0):
     return network_graph
 
 
-store = {}
+# In memory cache of the episodes, bounded by the ram_cache_budget of the config
+store = RamCache()
+# Locks of the entries of the filesystem cache, so that an entry is not
+# computed twice by a page and the background rebuild of stale entries.
+# Entries are also locked across the processes serving the app, see fs_cache_lock
+fs_cache_locks = {}
+fs_cache_locks_lock = threading.Lock()
+# Set in the process running the background cache builds, which holds
+# background_lock_file, see start_background_tasks
+background_builds = threading.Event()
+background_lock_file = None
 
 
 def make_episode(agent, episode_name,with_reboot=False):
@@ -392,17 +419,25 @@ def make_episode(agent, episode_name,with_reboot=False):
     :param episode_name: Name of the studied episode
     :return: Episode with computed data
     """
-    if is_in_ram_cache(episode_name, agent):
-        episode=get_from_ram_cache(episode_name, agent)
-    elif is_in_fs_cache(episode_name, agent):
-        episode = get_from_fs_cache(episode_name, agent)
-        save_in_ram_cache(episode_name, agent, episode)
+    # A single lookup, as the episode may be evicted in between two
+    episode = store.get(make_ram_cache_id(episode_name, agent))
+    if episode is None and is_in_fs_cache(episode_name, agent):
+        # Up to date entries are read without the lock, so that a read-only
+        # cache can be served and readers do not wait for each other
+        episode = try_get_from_fs_cache(episode_name, agent)
         #to see evolution of ram footprint
         #from guppy import hpy
         #h = hpy()
         #print(h.heap())
-    else:
-        episode = compute_episode(episode_name, agent,with_reboot)
+        if episode is not None:
+            save_in_ram_cache(episode_name, agent, episode)
+    if episode is None:
+        # The entry may be being rebuilt in the background
+        with fs_cache_lock(episode_name, agent):
+            if is_in_fs_cache(episode_name, agent):
+                episode = try_get_from_fs_cache(episode_name, agent)
+            if episode is None:
+                episode = compute_episode(episode_name, agent,with_reboot)
         save_in_ram_cache(episode_name, agent, episode)
 
     if(with_reboot and "reboot" not in dir(episode)):
@@ -431,19 +466,40 @@ def make_episode_without_decorate(agent, episode_name,save=False):
         if save:
             return None
         beg = time.time()
-        episode_analytics=get_from_fs_cache(episode_name, agent)
-        return episode_analytics
-    else:
-        episode_data = retrieve_episode_from_disk(episode_name, agent)
-        if episode_data is not None:
-            episode_analytics = EpisodeAnalytics(episode_data, episode_name, agent)
-            if save:
-                episode_analytics.decorate_light_without_reboot(episode_data)
-                save_in_fs_cache(episode_name, agent, episode_analytics)
-                return None #to avoid problem with picklalisable issues in multiprocess
+        episode_analytics=try_get_from_fs_cache(episode_name, agent)
+        if episode_analytics is not None:
             return episode_analytics
-        else:
-            return None
+    if save:
+        # Entries being computed by another builder are skipped
+        with fs_cache_lock(episode_name, agent, blocking=False) as acquired:
+            if acquired and not is_in_fs_cache(episode_name, agent):
+                build_fs_cache_entry(episode_name, agent)
+        return None #to avoid problem with picklalisable issues in multiprocess
+    episode_data = read_episode_from_disk(episode_name, agent)
+    if episode_data is not None:
+        from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+
+        return EpisodeAnalytics(episode_data, episode_name, agent)
+    else:
+        return None
+
+
+def build_fs_cache_entry(episode_name, agent):
+    """
+    Compute an episode from its logs and save it in the filesystem cache.
+    To be called with the lock of the entry, see fs_cache_lock.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    """
+    episode_data = read_episode_from_disk(episode_name, agent)
+    if episode_data is None:
+        return
+    from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+
+    episode_analytics = EpisodeAnalytics(episode_data, episode_name, agent)
+    episode_analytics.decorate_light_without_reboot(episode_data)
+    save_in_fs_cache(episode_name, agent, episode_analytics)
 
 
 def clear_fs_cache():
@@ -451,19 +507,157 @@ def clear_fs_cache():
 
 
 def is_in_fs_cache(episode_name, agent):
+    """
+    Whether an episode is in the filesystem cache and up to date with its logs
+    and the schema version of the cache. Stale entries are computed again
+    when needed.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    """
+    return has_fs_cache_entry(episode_name, agent) and cache_manifest.is_up_to_date(
+        get_fs_manifest_file(episode_name, agent),
+        os.path.join(agents_dir, agent, episode_name),
+    )
+
+
+def is_stale_in_fs_cache(episode_name, agent):
+    """
+    Whether an episode is in the filesystem cache but outdated.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    """
+    return has_fs_cache_entry(episode_name, agent) and not is_in_fs_cache(
+        episode_name, agent
+    )
+
+
+def has_fs_cache_entry(episode_name, agent):
+    from grid2viz.src.kpi import episode_store
+
     dill_path=get_fs_cached_file(episode_name, agent)
-    is_in_fs_cache=(os.path.isfile(dill_path) | os.path.isfile(dill_path+".bz"))
-    return is_in_fs_cache
+    has_fs_cache_entry=(os.path.isfile(dill_path) | os.path.isfile(dill_path+".bz"))
+    return has_fs_cache_entry or episode_store.is_episode_store(
+        get_fs_columnar_dir(episode_name, agent)
+    )
 
 
 def get_fs_cached_file(episode_name, agent):
     episode_dir = os.path.join(cache_dir, episode_name)
-    if not os.path.exists(episode_dir):
-        os.makedirs(episode_dir,exist_ok=True)
     return os.path.join(episode_dir, agent + ".dill")
 
+
+def get_fs_columnar_dir(episode_name, agent):
+    """
+    Directory of the filesystem cache holding an episode in the columnar format.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Path of the directory, which may not exist yet
+    """
+    return os.path.join(cache_dir, episode_name, agent)
+
+
+def get_fs_manifest_file(episode_name, agent):
+    """
+    Manifest of an entry of the filesystem cache, whatever its format.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Path of the manifest, which may not exist yet
+    """
+    return os.path.join(cache_dir, episode_name, agent + ".manifest.json")
+
+
+def get_fs_kpi_cache_dir(episode_name, agent):
+    """
+    Directory of the filesystem cache where the KPIs of an episode are saved
+    one by one, once computed.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Path of the directory, which may not exist yet
+    """
+    return os.path.join(cache_dir, episode_name, agent + "_kpi")
+
+
+def get_fs_card_summary_file(episode_name, agent):
+    """
+    File of the filesystem cache holding the summary of an episode drawn on
+    the card of its scenario, see card_summary.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Path of the file, which may not exist yet
+    """
+    return os.path.join(cache_dir, episode_name, agent + ".card.json")
+
+
+def save_card_summary(episode_name, agent, episode):
+    """
+    Save the summary of an episode drawn on the card of its scenario.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :param episode: Episode, which may not be decorated with its spaces yet
+    :return: Path of the summary
+    """
+    from grid2viz.src.kpi.EpisodeAnalytics import load_observation_space
+
+    path = get_fs_card_summary_file(episode_name, agent)
+    summary = card_summary.make_card_summary(
+        episode, load_observation_space(os.path.join(agents_dir, agent))
+    )
+    card_summary.save_card_summary(path, summary)
+    return path
+
+
+def get_card_summary(episode_name, agent):
+    """
+    Summary of an episode drawn on the card of its scenario, read from the
+    filesystem cache. If the entry of the episode is missing or outdated, or
+    was cached before summaries existed, the episode is loaded once and its
+    summary saved.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Summary, see card_summary.make_card_summary
+    """
+    path = get_fs_card_summary_file(episode_name, agent)
+    if is_in_fs_cache(episode_name, agent):
+        summary = card_summary.load_card_summary(path)
+        if summary is not None:
+            return summary
+    episode = make_episode(agent, episode_name)
+    # Saved along with the entry of the episode if it was computed just now
+    summary = None
+    if is_in_fs_cache(episode_name, agent):
+        summary = card_summary.load_card_summary(path)
+    if summary is None:
+        summary = card_summary.make_card_summary(episode)
+        if os.path.isdir(os.path.dirname(path)):
+            card_summary.save_card_summary(path, summary)
+    return summary
+
+
 def save_in_fs_cache(episode_name, agent, episode):
+    from grid2viz.src.kpi import episode_store
+
     path = get_fs_cached_file(episode_name, agent)
+    # KPIs saved for a previous version of the episode are outdated
+    shutil.rmtree(get_fs_kpi_cache_dir(episode_name, agent), ignore_errors=True)
+    # The manifest is written back once the entry is complete
+    manifest_path = get_fs_manifest_file(episode_name, agent)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    episode_path = os.path.join(agents_dir, agent, episode_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Saved with compact dtypes, so that nothing is left to do when loaded.
+    # The observations and actions of the columnar format are kept as vectors
+    episode.optimize_memory_footprint(opt_obs_act=cache_format == "pickle")
+    # Checked by the manifest along with the files of the entry
+    summary_path = save_card_summary(episode_name, agent, episode)
 
     #####
     #to assess size of objects
@@ -475,47 +669,62 @@ def save_in_fs_cache(episode_name, agent, episode):
     #   print(asizeof.asizeof(value))
     #   print(int(asizeof.asizeof(value)/total_size*100))
 
-    #import bz2
-    #import zipfile
-    #bz2.BZ2File('bz2_test.pbz2', 'wb') as f:
-    with gzip.open(path+".bz", "wb") as f:
-    #with zipfile.ZipFile.write(path+".zip") as f:
-    #with open(path, "wb") as f:
-        #dill.dump(episode, f, protocol=4)
-        pickle.dump(episode, f, protocol=4)
+    columnar_dir = get_fs_columnar_dir(episode_name, agent)
+    if cache_format == "columnar":
+        # Only one format is kept for an episode
+        for old_path in [path, path + ".bz"]:
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        # Replaced once the new one is written
+        episode_store.save_episode(columnar_dir, episode, memory_map=shared_cache)
+        cache_manifest.write_manifest(
+            manifest_path, episode_path, [columnar_dir, summary_path]
+        )
+        return
+
+    shutil.rmtree(columnar_dir, ignore_errors=True)
+    # Compressed with the cache_codec of the config, recorded in the file
+    # header. The .bz suffix is kept for the caches of previous versions
+    compression.dump(episode, path + ".bz")
+    cache_manifest.write_manifest(
+        manifest_path, episode_path, [path + ".bz", summary_path]
+    )
 
 
 
 def get_from_fs_cache(episode_name, agent):
+    from grid2viz.src.kpi import episode_store
+
     beg = time.time()
     path = get_fs_cached_file(episode_name, agent)
     print(f"Loading from filesystem cache agent {agent} on scenario {episode_name}...")
 
     start = time.time()
 
-    if(os.path.exists(path + ".bz")):
+    agent_path = os.path.join(agents_dir, agent)
+    columnar_dir = get_fs_columnar_dir(episode_name, agent)
+    if episode_store.is_episode_store(columnar_dir):
+        # Tables are only read when a page needs them
+        episode_analytics = episode_store.load_episode(columnar_dir)
+        episode_analytics.decorate_obs_act_spaces(agent_path)
+        episode_analytics.kpi_cache_dir = get_fs_kpi_cache_dir(episode_name, agent)
+        end = time.time()
+        print(
+            f"Agent {agent} on scenario {episode_name} loaded from filesystem cache in: {(end - beg):.1f} s"
+        )
+        return episode_analytics
 
-        with gzip.open(path + ".bz", "rb") as f:
-            # with zipfile.ZipFile.open(path + ".zip") as f:
-            print(path)
-            episode_analytics=pickle.load(f)
+    if(os.path.exists(path + ".bz")):
+        episode_analytics = compression.load(path + ".bz")
     else:
-        with open(path, "rb") as f:
-            episode_analytics = pickle.load(f)
+        episode_analytics = compression.load(path)
 
     ######
     #add observation_space only to decorate as it could not be saved in pickle
-    agent_path = os.path.join(agents_dir, agent)
     episode_analytics.decorate_obs_act_spaces(agent_path)
-
-
-    ##########
-    ##Warning for compatibility with older cache version:
-    if("observations" not in dir(episode_analytics)):
-        print("WARNING: the cache management have been updated in grid2viz 1.3.1 for faster loading. "
-              "You Should delete the old _cache folder and recompute it with latest grid2viz version")
-    episode_analytics.optimize_memory_footprint(opt_obs_act=True)#this adds a bit of 25% loading time overhead,
-    # in particular when resetting observations and actions, which only brings a 10% size decrease
+    episode_analytics.kpi_cache_dir = get_fs_kpi_cache_dir(episode_name, agent)
+    # No optimize_memory_footprint anymore, which added 25% of loading time:
+    # episodes are saved with compact dtypes, see save_in_fs_cache
 
     #episode_analytics.decorate(episode_data)
     #episode_analytics=decorate(episode_analytics,episode_data)
@@ -527,17 +736,48 @@ def get_from_fs_cache(episode_name, agent):
     return episode_analytics
 
 
+def try_get_from_fs_cache(episode_name, agent):
+    """
+    Load an episode from the filesystem cache, or None if its entry cannot be
+    read, e.g. a file truncated by a crash of a previous version. The entry
+    is then computed again when saved.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: EpisodeAnalytics instance or None
+    """
+    try:
+        return get_from_fs_cache(episode_name, agent)
+    except (EOFError, OSError, ValueError, KeyError, pickle.UnpicklingError, zlib.error) as e:
+        print(
+            f"WARNING: cache of agent {agent} on scenario {episode_name} cannot be read "
+            f"({type(e).__name__}: {e}), computing it again"
+        )
+        return None
+
+
 def compute_episode(episode_name, agent,with_reboot=False):
     print(f"Loading from logs agent {agent} on scenario {episode_name}...")
     beg = time.time()
-    episode_data = retrieve_episode_from_disk(episode_name, agent)
+    if with_reboot:
+        episode_data = retrieve_episode_from_disk(episode_name, agent)
+    else:
+        episode_data = read_episode_from_disk(episode_name, agent)
+    from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+
     episode_analytics = EpisodeAnalytics(episode_data, episode_name, agent)
     if with_reboot:
         episode_analytics.decorate_with_reboot(episode_data)
     else:
         episode_analytics.decorate_light_without_reboot(episode_data)
         save_in_fs_cache(episode_name, agent, episode_analytics)
-        episode_analytics.decorate_obs_act_spaces(os.path.join(agents_dir, agent))
+        if cache_format == "columnar":
+            # Tables are read back when needed and the observations and
+            # actions are memory-mapped instead of being kept in RAM
+            episode_analytics = get_from_fs_cache(episode_name, agent)
+        else:
+            episode_analytics.decorate_obs_act_spaces(os.path.join(agents_dir, agent))
+            episode_analytics.kpi_cache_dir = get_fs_kpi_cache_dir(episode_name, agent)
     end = time.time()
     print(
         f"Agent {agent} on scenario {episode_name} loaded from logs in: {(end - beg):.1f} s"
@@ -545,16 +785,193 @@ def compute_episode(episode_name, agent,with_reboot=False):
     return episode_analytics
 
 
+def get_fs_cache_lock(episode_name, agent):
+    """
+    Lock to hold while computing an entry of the filesystem cache.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: threading.Lock of the entry
+    """
+    with fs_cache_locks_lock:
+        return fs_cache_locks.setdefault(
+            make_ram_cache_id(episode_name, agent), threading.Lock()
+        )
+
+
+def open_fs_cache_lock_file(episode_name, agent):
+    """
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: Lock file of an entry of the filesystem cache, opened for
+        fcntl.flock, None if file locks are not available or the file cannot
+        be created, e.g. in a read-only cache
+    """
+    if fcntl is None:
+        return None
+    episode_dir = os.path.join(cache_dir, episode_name)
+    try:
+        os.makedirs(episode_dir, exist_ok=True)
+        return open(os.path.join(episode_dir, agent + ".lock"), "a")
+    except OSError as e:
+        print(f"Cache of agent {agent} on scenario {episode_name} not locked across processes: {e}")
+        return None
+
+
+@contextmanager
+def fs_cache_lock(episode_name, agent, blocking=True):
+    """
+    Lock an entry of the filesystem cache while it is computed, both within
+    this process and across the processes serving the app or building the
+    cache, with a lock file per entry. Only one of them computes the entry
+    and the others read it once done, or skip it if not blocking. Without a
+    lock file, see open_fs_cache_lock_file, only the threads of this process
+    are locked.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :param blocking: Whether to wait for the lock, or give up if already held
+    :return: Whether the lock was acquired
+    """
+    thread_lock = get_fs_cache_lock(episode_name, agent)
+    if not thread_lock.acquire(blocking=blocking):
+        yield False
+        return
+    try:
+        lock_file = open_fs_cache_lock_file(episode_name, agent)
+        if lock_file is None:
+            yield True
+            return
+        with lock_file as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
+
+
+def rebuild_stale_fs_cache():
+    """
+    Compute again the entries of the filesystem cache that are outdated,
+    either because the logs of the agent were regenerated or because the
+    schema version of the cache changed. Entries that were never cached are
+    left to make_cache or to the pages that need them.
+    """
+    for agent in list(agents):
+        for episode_name in list(scenarios_agent.get(agent, [])):
+            with fs_cache_lock(episode_name, agent):
+                if not is_stale_in_fs_cache(episode_name, agent):
+                    continue
+                print(f"Rebuilding stale cache of agent {agent} on scenario {episode_name}")
+                build_fs_cache_entry(episode_name, agent)
+
+
+def acquire_background_lock():
+    """
+    Wait for the lock file of the background cache builds, see
+    start_background_tasks. It is not waited for without file locks, or if
+    the lock file cannot be created, e.g. in a read-only cache.
+    """
+    global background_lock_file
+    if fcntl is None:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        lock_file = open(os.path.join(cache_dir, "background.lock"), "a")
+    except OSError as e:
+        print(f"Background cache builds not locked across processes: {e}")
+        return
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    # Never closed, so that the lock is held until the process stops
+    background_lock_file = lock_file
+
+
+def run_background_builds(new_episodes):
+    """
+    Once the lock file of the background cache builds is acquired, rebuild
+    the stale entries of the filesystem cache and cache the new episodes
+    found by the watcher of the agents directory.
+
+    :param new_episodes: queue of (agent, scenario) to be cached
+    """
+    acquire_background_lock()
+    background_builds.set()
+    rebuild_stale_fs_cache()
+    build_new_fs_cache_entries(new_episodes)
+
+
+def start_background_tasks():
+    """
+    Start the background threads of a process serving the app: the watcher
+    of the agents directory, which keeps the catalog of each process up to
+    date, and the cache builds, run by one of the processes only, e.g. one of
+    the gunicorn workers. The process running the cache builds holds a lock
+    file as long as it runs, which the other ones wait for, so that one of
+    them takes over if it stops.
+
+    :return: The started threads
+    """
+    new_episodes = queue.Queue()
+    threads = [
+        threading.Thread(
+            target=run_background_builds,
+            args=(new_episodes,),
+            name="grid2viz-cache-builds",
+            daemon=True,
+        )
+    ]
+    if watch_interval > 0:
+        threads.append(
+            threading.Thread(
+                target=watch_agents_dir,
+                args=(watch_interval, new_episodes),
+                name="grid2viz-agents-dir-watcher",
+                daemon=True,
+            )
+        )
+    for thread in threads:
+        thread.start()
+    return threads
+
+
 def retrieve_episode_from_disk(episode_name, agent):
     path = os.path.join(agents_dir, agent)
     episode_path = os.path.abspath(os.path.join(path, episode_name))
     if os.path.isdir(episode_path):
+        from grid2op.Episode import EpisodeData
+
         episode_data = EpisodeData.from_disk(path, episode_name)
         return episode_data
     else:
         return None
 
 
+def read_episode_from_disk(episode_name, agent):
+    """
+    Load the episode logs as raw matrices, without building the grid2op
+    observations and actions of every time step. Use retrieve_episode_from_disk
+    when the environment needs to be rebooted.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    :return: EpisodeReader instance, None if the episode does not exist
+    """
+    path = os.path.join(agents_dir, agent)
+    episode_path = os.path.abspath(os.path.join(path, episode_name))
+    if os.path.isdir(episode_path):
+        from grid2viz.src.kpi.episode_reader import EpisodeReader
+
+        return EpisodeReader(path, episode_name)
+    else:
+        return None
+
+
 def is_in_ram_cache(episode_name, agent):
     return make_ram_cache_id(episode_name, agent) in store
 
@@ -563,6 +980,17 @@ def save_in_ram_cache(episode_name, agent, episode):
     store[make_ram_cache_id(episode_name, agent)] = episode
 
 
+def pin_in_ram_cache(episode_name, agent):
+    """
+    Keep an episode in the RAM cache whatever its budget, as long as it keeps
+    being used, e.g. the episodes of the reference and studied agents.
+
+    :param episode_name: Name of the studied episode
+    :param agent: Agent Name
+    """
+    store.pin(make_ram_cache_id(episode_name, agent))
+
+
 def get_from_ram_cache(episode_name, agent):
     return store[make_ram_cache_id(episode_name, agent)]
 
@@ -571,73 +999,92 @@ def make_ram_cache_id(episode_name, agent):
     return agent + episode_name
 
 
-def check_all_tree_and_get_meta_and_best(base_dir, agents):
-    best_agents = {}
-    meta_json = {}
-    scenarios = set()
-    survival_dic = {}
-    attention_dic = {}
+def read_episode_summary(scenario_folder):
+    """
+    Read what the catalog keeps of an episode from its logs.
 
-    for agent in agents:
-        survival_dic_agent = {}
-        attention_dic_agent = {}
-        for scenario_name in os.listdir(os.path.join(base_dir, agent)):
-
-            scenario_folder = os.path.join(base_dir, agent, scenario_name)
-            if not os.path.isdir(scenario_folder):
-                continue
-            with open(os.path.join(scenario_folder, "episode_meta.json")) as f:
-                episode_meta = json.load(fp=f)
-                meta_json[scenario_name] = episode_meta
-
-                survival_dic_agent[scenario_name] = int(
-                    int(episode_meta["nb_timestep_played"])
-                    * 100
-                    / int(episode_meta["chronics_max_timestep"])
-                )
-                scenarios.add(scenario_name)
-
-                if scenario_name not in best_agents:
-                    best_agents[scenario_name] = {
-                        "value": -1,
-                        "agent": None,
-                        "out_of": 0,
-                        "cum_reward": -1,
-                    }
-                condition_to_update_best_agent = best_agents[scenario_name][
-                    "value"
-                ] < episode_meta["nb_timestep_played"] or (
-                    best_agents[scenario_name]["value"]
-                    == episode_meta["nb_timestep_played"]
-                    and best_agents[scenario_name]["cum_reward"]
-                    < episode_meta["cumulative_reward"]
-                )
-                if condition_to_update_best_agent:
-                    best_agents[scenario_name]["value"] = episode_meta[
-                        "nb_timestep_played"
-                    ]
-                    best_agents[scenario_name]["agent"] = agent
-                    best_agents[scenario_name]["cum_reward"] = episode_meta[
-                        "cumulative_reward"
-                    ]
-
-            best_agents[scenario_name]["out_of"] = (
-                best_agents[scenario_name]["out_of"] + 1
-            )
-            other_reward_json_path=os.path.join(scenario_folder, "other_rewards.json")
-            if os.path.exists(other_reward_json_path):
-                with open(other_reward_json_path) as f:
-                    other_reward_meta = json.load(fp=f)
-                    last_step_rewards=other_reward_meta[len(other_reward_meta) - 1]
-                    if 'attention_score' in last_step_rewards.keys():
-                        attention_dic_agent[scenario_name] = last_step_rewards['attention_score']
-                    f.close()
+    :param scenario_folder: directory of the episode logs
+    :return: meta of the episode, percentage of the chronic survived and
+        attention score at its last step, None if not logged
+    """
+    with open(os.path.join(scenario_folder, "episode_meta.json")) as f:
+        episode_meta = json.load(fp=f)
+    survival = int(
+        int(episode_meta["nb_timestep_played"])
+        * 100
+        / int(episode_meta["chronics_max_timestep"])
+    )
+    attention = None
+    other_reward_json_path = os.path.join(scenario_folder, "other_rewards.json")
+    if os.path.exists(other_reward_json_path):
+        # Only the last step is parsed, the file holding one record per step
+        last_step_rewards = read_last_record(other_reward_json_path)
+        if last_step_rewards and "attention_score" in last_step_rewards.keys():
+            attention = last_step_rewards["attention_score"]
+    return episode_meta, survival, attention
+
+
+def read_catalog(base_dir, agents):
+    """
+    Update the catalog of the episodes of the agents, only reading the logs
+    of the episodes that changed since it was last updated.
+
+    The catalog is kept in memory only if the cache directory is not writable.
+
+    :param base_dir: directory of the agents logs
+    :param agents: names of the agents
+    :return: (agent, scenario, meta, survival, attention) of each episode
+    """
+    catalog_path = os.path.join(base_dir, "_cache", "catalog.sqlite")
+    try:
+        os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+        return catalog.update_catalog(
+            catalog_path, base_dir, agents, read_episode_summary
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"WARNING: the catalog of the episodes cannot be saved: {e}")
+        return catalog.update_catalog(
+            ":memory:", base_dir, agents, read_episode_summary
+        )
 
 
-        survival_dic[agent] = survival_dic_agent
-        attention_dic[agent] = attention_dic_agent
+def check_all_tree_and_get_meta_and_best(base_dir, agents, episodes=None):
+    if episodes is None:
+        episodes = read_catalog(base_dir, agents)
+    best_agents = {}
+    meta_json = {}
+    scenarios = []
+    survival_dic = {agent: {} for agent in agents}
+    attention_dic = {agent: {} for agent in agents}
+
+    for agent, scenario_name, episode_meta, survival, attention in episodes:
+        meta_json[scenario_name] = episode_meta
+        survival_dic[agent][scenario_name] = survival
+        if scenario_name not in best_agents:
+            scenarios.append(scenario_name)
+            best_agents[scenario_name] = {
+                "value": -1,
+                "agent": None,
+                "out_of": 0,
+                "cum_reward": -1,
+            }
+        condition_to_update_best_agent = best_agents[scenario_name][
+            "value"
+        ] < episode_meta["nb_timestep_played"] or (
+            best_agents[scenario_name]["value"] == episode_meta["nb_timestep_played"]
+            and best_agents[scenario_name]["cum_reward"]
+            < episode_meta["cumulative_reward"]
+        )
+        if condition_to_update_best_agent:
+            best_agents[scenario_name]["value"] = episode_meta["nb_timestep_played"]
+            best_agents[scenario_name]["agent"] = agent
+            best_agents[scenario_name]["cum_reward"] = episode_meta[
+                "cumulative_reward"
+            ]
+        best_agents[scenario_name]["out_of"] = best_agents[scenario_name]["out_of"] + 1
+        if attention is not None:
+            attention_dic[agent][scenario_name] = attention
 
-    scenarios=list(scenarios)#instead of set, to avoid type errors when using pandas for instance
     survival_df = pd.DataFrame(columns=agents, index=scenarios)
     attention_df = pd.DataFrame(columns=agents, index=scenarios)#, dtype=np.int64)
     for agent in agents:
@@ -654,42 +1101,269 @@ def check_all_tree_and_get_meta_and_best(base_dir, agents):
 
     return meta_json, best_agents, survival_df, attention_df
 
-def make_cache(scenarios,agents,n_cores,cache_dir,agent_selection=None):
+def list_agents(base_dir):
+    """
+    :param base_dir: directory of the agents logs
+    :return: sorted names of the agents, the directories not starting with _
+    """
+    return sorted(
+        [
+            file
+            for file in os.listdir(base_dir)
+            if os.path.isdir(os.path.join(base_dir, file)) and not file.startswith("_")
+        ]
+    )
+
+
+def index_episodes(agents, episodes):
+    """
+    :param agents: names of the agents
+    :param episodes: (agent, scenario, ...) of each episode, see read_catalog
+    :return: the scenarios, the scenarios of each agent and the agents of
+        each scenario
+    """
+    scenarios = set()
+    scenarios_agent = {agent: [] for agent in agents}
+    agent_scenario = {}
+    for agent, scen, *_ in episodes:
+        scenarios_agent[agent].append(scen)
+        agent_scenario.setdefault(scen, []).append(agent)
+        scenarios.add(scen)
+    return scenarios, scenarios_agent, agent_scenario
+
+
+def replace_in_place(container, new):
+    """
+    Replace the content of a dict, a set or a list by the one of another,
+    keeping the object, imported by name by the pages. Keys are added before
+    the removed ones are deleted, so that a page reading it meanwhile never
+    misses a key that is kept.
+    """
+    if isinstance(container, list):
+        container[:] = new
+    elif isinstance(container, dict):
+        container.update(new)
+        for key in set(container) - set(new):
+            del container[key]
+    else:
+        container |= new
+        container -= container - set(new)
+
+
+def refresh_catalog():
+    """
+    Update the catalog with the agents and episodes added, changed or removed
+    in the agents directory since it was last read, and refresh the best
+    agents, the heatmaps data and the scenarios of the agents accordingly.
+
+    :return: (agent, scenario) of the episodes added or changed
+    """
+    global catalog_episodes, survival_df, attention_df
+    with catalog_lock:
+        new_agents = list_agents(agents_dir)
+        episodes = read_catalog(agents_dir, new_agents)
+        known = {(agent, scen): rest for agent, scen, *rest in catalog_episodes}
+        changed = [
+            (agent, scen)
+            for agent, scen, *rest in episodes
+            if known.get((agent, scen)) != rest
+        ]
+        (
+            new_meta_json,
+            new_best_agents,
+            survival_df,
+            attention_df,
+        ) = check_all_tree_and_get_meta_and_best(agents_dir, new_agents, episodes)
+        new_scenarios, new_scenarios_agent, new_agent_scenario = index_episodes(
+            new_agents, episodes
+        )
+        replace_in_place(meta_json, new_meta_json)
+        replace_in_place(best_agents, new_best_agents)
+        replace_in_place(scenarios_agent, new_scenarios_agent)
+        replace_in_place(agent_scenario, new_agent_scenario)
+        replace_in_place(scenarios, new_scenarios)
+        replace_in_place(agents, new_agents)
+        catalog_episodes = episodes
+    return changed
+
+
+def build_new_fs_cache_entries(new_episodes):
+    """
+    Build the filesystem cache entries of the episodes put in a queue, as
+    long as the server runs. Episodes being cached by another process, or
+    already cached, are skipped.
+
+    :param new_episodes: queue of (agent, scenario)
+    """
+    while True:
+        agent, episode_name = new_episodes.get()
+        try:
+            with fs_cache_lock(episode_name, agent, blocking=False) as locked:
+                if locked and not is_in_fs_cache(episode_name, agent):
+                    print(f"Caching new episode of agent {agent} on scenario {episode_name}")
+                    build_fs_cache_entry(episode_name, agent)
+        except Exception as e:
+            print(f"Caching of agent {agent} on scenario {episode_name} failed: {e}")
+        finally:
+            new_episodes.task_done()
+
+
+def watch_agents_dir(interval, new_episodes):
+    """
+    Poll the agents directory for new agents and episodes, updating the
+    catalog and putting the episodes added or changed in a queue to be cached,
+    in the process running the background cache builds only.
+
+    :param interval: time in seconds between two polls
+    :param new_episodes: queue of (agent, scenario) to be cached
+    """
+    while True:
+        time.sleep(interval)
+        try:
+            changed = refresh_catalog()
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: the agents directory could not be read again: {e}")
+            continue
+        if changed:
+            print(f"{len(changed)} new or updated episodes found in {agents_dir}")
+        for agent, episode_name in changed:
+            # Episodes computed from the previous logs
+            store.pop(make_ram_cache_id(episode_name, agent))
+            if background_builds.is_set():
+                new_episodes.put((agent, episode_name))
+
+
+def build_cache_entry(agent, episode_name):
+    """
+    Compute an entry of the filesystem cache unless it is already up to date
+    or being computed by another builder.
+
+    :param agent: Agent Name
+    :param episode_name: Name of the studied episode
+    :return: agent, episode_name, status ("built", "valid", "in progress" or
+        "failed"), error message if failed and time spent in seconds
+    """
+    beg = time.time()
+    error = None
+    with fs_cache_lock(episode_name, agent, blocking=False) as acquired:
+        if not acquired:
+            status = "in progress"
+        elif is_in_fs_cache(episode_name, agent):
+            status = "valid"
+        else:
+            try:
+                build_fs_cache_entry(episode_name, agent)
+                status = "built"
+            except Exception as e:
+                status = "failed"
+                error = f"{type(e).__name__}: {e}"
+    return agent, episode_name, status, error, time.time() - beg
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def make_cache(scenarios,agents,n_cores,cache_dir,agent_selection=None,scenario_selection=None):
+    """
+    Build the filesystem cache of the episodes of the agents.
+
+    The build is incremental: entries already up to date are skipped, so that
+    an interrupted build resumes where it stopped and only the episodes of new
+    or regenerated agents are computed. The progress is printed as entries are
+    built, and a summary per agent at the end.
+
+    :param scenarios: Names of the scenarios
+    :param agents: Names of the agents
+    :param n_cores: Number of processes building the cache
+    :param cache_dir: Directory of the filesystem cache
+    :param agent_selection: Names of the only agents to build, all if None
+    :param scenario_selection: Names of the only scenarios to build, all if None
+    :return: pandas.DataFrame of the number of entries per agent and status
+    """
 
     if(agent_selection is not None):
         agents=[agent for agent in agents if agent in agent_selection]
+    if(scenario_selection is not None):
+        scenarios=[scenario for scenario in scenarios if scenario in scenario_selection]
 
     from pathos.multiprocessing import ProcessPool
 
-    if not os.path.exists(cache_dir):
-        print("Starting Multiprocessing for reading the best agent of each scenario")
-
-    # TODO: tous les agents n'ont pas forcément tourner sur exactement tous les mêmes scenarios
-    # Eviter une erreur si un agent n'a pas tourné sur un scenario
+    # Only the scenarios an agent was run on
     agent_scenario_list = [
-        (agent, scenario) for agent in agents for scenario in scenarios
+        (agent, scenario)
+        for agent in agents
+        for scenario in sorted(scenarios)
+        if scenario in scenarios_agent.get(agent, [])
     ]
+    results = []
+    todo = []
+    for agent, scenario in agent_scenario_list:
+        if is_in_fs_cache(scenario, agent):
+            results.append((agent, scenario, "valid", None, 0.0))
+        else:
+            todo.append((agent, scenario))
+    print(
+        f"{len(agent_scenario_list)} episodes: {len(results)} already in cache, "
+        f"{len(todo)} to build with {n_cores} core(s)"
+    )
 
-    agents_data = []
+    beg = time.time()
+    pool = None
     if n_cores == 1:  # no multiprocess useful for debug if needed
-        i = 0
-        for agent_scenario in agent_scenario_list:
-            agents_data.append(
-                make_episode_without_decorate(agent_scenario[0], agent_scenario[1],save=True)
-            )
-            i += 1
+        built = (build_cache_entry(agent, scenario) for agent, scenario in todo)
     else:
         pool = ProcessPool(n_cores)
-        list(
-            pool.imap(
-                make_episode_without_decorate,
-                [agent_scenario[0] for agent_scenario in agent_scenario_list],  # agents
-                [agent_scenario[1] for agent_scenario in agent_scenario_list],
-                [True for agent_scenario in agent_scenario_list],
+        # Unordered, to report entries as soon as they are built
+        built = pool.uimap(
+            build_cache_entry,
+            [agent for agent, _ in todo],
+            [scenario for _, scenario in todo],
+        )
+    try:
+        for i, result in enumerate(built, 1):
+            agent, scenario, status, error, duration = result
+            results.append(result)
+            elapsed = time.time() - beg
+            remaining = len(todo) - i
+            print(
+                f"[{i}/{len(todo)}] agent {agent} on scenario {scenario}: {status}"
+                + (f" ({error})" if error else "")
+                + f" in {duration:.1f} s, {remaining} remaining, "
+                f"ETA {format_duration(elapsed / i * remaining)}"
             )
-        )  # scenarios #we go over all agents and all scenarios for each agent
-        pool.close()
-        print("Multiprocessing done")
+        if pool is not None:
+            pool.close()
+            pool.join()
+    except KeyboardInterrupt:
+        # Entries built so far are kept, the next build resumes from them
+        print("Cache build interrupted, run it again to resume it")
+        if pool is not None:
+            pool.terminate()
+    finally:
+        if pool is not None:
+            pool.clear()
+
+    summary = pd.crosstab(
+        pd.Series([result[0] for result in results], name="agent"),
+        pd.Series([result[2] for result in results], name="status"),
+    )
+    if len(summary):
+        summary["time (s)"] = (
+            pd.Series([result[4] for result in results])
+            .groupby([result[0] for result in results])
+            .sum()
+            .round(1)
+        )
+        print(summary.to_string())
+    print(
+        f"Cache build done in {format_duration(time.time() - beg)}: "
+        f"{sum(result[2] == 'built' for result in results)} built, "
+        f"{sum(result[2] == 'failed' for result in results)} failed"
+    )
+    return summary
 
 
 """
@@ -714,41 +1388,52 @@ agents_dir = parser.get("DEFAULT", "agents_dir")
 print(Fore.BLUE + "Agents data used is located at: {}".format(agents_dir))
 cache_dir = os.path.join(agents_dir, "_cache")
 """Parsing of agent folder tree"""
-agents = sorted(
-    [
-        file
-        for file in os.listdir(agents_dir)
-        if os.path.isdir(os.path.join(agents_dir, file)) and not file.startswith("_")
-    ]
-)
+agents = list_agents(agents_dir)
+# Episodes of the agents, read from the catalog kept in the cache directory
+catalog_episodes = read_catalog(agents_dir, agents)
 meta_json, best_agents, survival_df, attention_df = check_all_tree_and_get_meta_and_best(
-    agents_dir, agents
+    agents_dir, agents, catalog_episodes
 )
-scenarios = []
-scenarios_agent = {}
-agent_scenario = {}
+scenarios, scenarios_agent, agent_scenario = index_episodes(agents, catalog_episodes)
+catalog_lock = threading.Lock()
 
 try:
     n_cores = int(parser.get("DEFAULT", "n_cores"))
 except configparser.NoOptionError:
     n_cores = 1
 
-for agent in agents:
-    scen_path = os.path.join(agents_dir, agent)
-    scens = [
-        file
-        for file in os.listdir(scen_path)
-        if os.path.isdir(os.path.join(scen_path, file))
-    ]
-    scenarios_agent[agent] = scens
-    for scen in scens:
-        if scen not in agent_scenario:
-            agent_scenario[scen] = []
-        if agent not in agent_scenario[scen]:
-            agent_scenario[scen].append(agent)
-    scenarios = scenarios + scens
-
-scenarios = set(scenarios)
+# Format of the episodes saved in the filesystem cache: "columnar", with one
+# file per table, or "pickle" for the compressed pickle of the whole episode.
+# Both formats can be read whatever this option.
+cache_format = parser.get("DEFAULT", "cache_format", fallback="columnar")
+if cache_format not in ["columnar", "pickle"]:
+    raise ValueError(
+        f"cache_format can only be either columnar or pickle. {cache_format} passed"
+    )
+
+# Compression codec of the filesystem cache: none, gzip, lz4 or zstd, the
+# latter two needing the lz4 and zstandard packages, or auto for the fastest
+# one installed. Caches are read whatever their codec.
+cache_codec = parser.get("DEFAULT", "cache_codec", fallback="auto")
+cache_codec_level = parser.getint("DEFAULT", "cache_codec_level", fallback=None)
+compression.set_default(cache_codec, cache_codec_level)
+
+# Whether the tables of the columnar cache are saved uncompressed and
+# memory-mapped, so that the processes serving the app, e.g. gunicorn workers,
+# share a single copy of them
+shared_cache = parser.getboolean("DEFAULT", "shared_cache", fallback=False)
+if shared_cache and cache_format != "columnar":
+    raise ValueError("shared_cache can only be used with the columnar cache_format")
+
+# Memory budget in MB of the episodes kept in RAM, least recently used ones
+# being evicted first. 0 for no limit.
+ram_cache_budget = parser.getfloat("DEFAULT", "ram_cache_budget", fallback=4096)
+store.max_bytes = int(ram_cache_budget * 1e6) if ram_cache_budget > 0 else None
+
+# Time in seconds between two polls of the agents directory for new agents
+# and episodes, while the server runs. 0 to only read it at startup.
+watch_interval = parser.getfloat("DEFAULT", "watch_interval", fallback=60)
+
 env_path = parser.get("DEFAULT", "env_dir")
 # Create a .grid2viz directory in the user home directory
 grid2viz_home_directory = Path.home() / ".grid2viz"
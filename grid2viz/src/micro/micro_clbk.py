@@ -9,7 +9,6 @@ from dash import callback_context
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-from grid2op.Exceptions import Grid2OpException
 from pathlib import Path
 import numpy as np
 
@@ -14,9 +14,6 @@ import dash_antd_components as dac
 from dash import dcc
 from dash import html
 from dash import dash_table as dt
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 
 from grid2viz.src.manager import (
@@ -316,6 +313,11 @@ def layout(scenario, ref_agent):
     if ref_agent is None:
         ref_agent = agent_scenario[scenario][0]
 
+    # Imported on first use, matplotlib being slow to import
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     #fig = plt.figure()
     make_network_scenario_overview(episode)
 #
@@ -19,19 +19,10 @@ from grid2op.Episode import EpisodeReboot
 from grid2op.PlotGrid import PlotPlotly
 
 from grid2viz.src.manager import make_episode, agents_dir
-from grid2viz.src.simulation.reboot import env, params_for_reboot, BACKEND
+from grid2viz.src.simulation.reboot import get_backend, get_env, get_params_for_reboot
 from grid2viz.src.simulation.simulation_assist import BaseAssistant
 from grid2viz.src.kpi.EpisodeAnalytics import compute_losses
 
-try:
-    from lightsim2grid.LightSimBackend import LightSimBackend
-
-    BACKEND = LightSimBackend
-except ModuleNotFoundError:
-    from grid2op.Backend import PandaPowerBackend
-
-    BACKEND = PandaPowerBackend
-
 expert_config = {
     "totalnumberofsimulatedtopos": 25,
     "numberofsimulatedtopospernode": 5,
@@ -190,7 +181,7 @@ class Assist(BaseAssistant):
             else:
                 assistant_size = dict(assist="col-3", graph="col-9")
                 return "", [], assistant_size
-            thermal_limit = env.get_thermal_limit()
+            thermal_limit = get_env().get_thermal_limit()
             # with redirect_stdout(None):
             if nb_simulations is not None:
                 expert_config["totalnumberofsimulatedtopos"] = nb_simulations
@@ -205,12 +196,12 @@ class Assist(BaseAssistant):
             episode_reboot = EpisodeReboot.EpisodeReboot()
 
             episode_reboot.load(
-                #env.backend,
-                BACKEND(),
+                #get_env().backend,
+                get_backend()(),
                 data=episode,
                 agent_path=os.path.join(agents_dir, episode.agent),
                 name=episode.episode_name,
-                env_kwargs=params_for_reboot,
+                env_kwargs=get_params_for_reboot(),
             )
             if(ts<=0):
                 ts=1 #cannot reboot for ts<=0
@@ -237,11 +228,11 @@ class Assist(BaseAssistant):
                 line_id = np.where(episode.line_names == line_to_study)[0][0]
                 ltc = [line_id]
             else:
-                ltc = [get_ranked_overloads(env.observation_space, obs)[0]]
+                ltc = [get_ranked_overloads(get_env().observation_space, obs)[0]]
             with redirect_stdout(None):
                 simulator = Grid2opSimulation(
                     obs,
-                    env.action_space,env.observation_space,
+                    get_env().action_space,get_env().observation_space,
                     param_options=expert_config,
                     debug=False,
                     ltc=ltc,
@@ -252,7 +243,7 @@ class Assist(BaseAssistant):
                     simulator, plot=False, debug=False
                 )
             # reinitialize proper thermal limits
-            episode_reboot.env.set_thermal_limit(env.get_thermal_limit())
+            episode_reboot.env.set_thermal_limit(get_env().get_thermal_limit())
             self.obs_reboot, reward, *_ = episode_reboot.go_to(int(ts))
             self.episode_reboot = episode_reboot #important to not close the associated env that will be necessary later for simulate
 
@@ -307,7 +298,7 @@ class Assist(BaseAssistant):
                 raise PreventUpdate
             selected_row = selected_rows[0]
             action = actions[selected_row]
-            act = env.action_space.from_vect(np.array(action))
+            act = get_env().action_space.from_vect(np.array(action))
             return action, str(act)
 
     def store_to_graph(self, store_data, episode, ts):
@@ -315,16 +306,16 @@ class Assist(BaseAssistant):
             ts=1
         episode_reboot = EpisodeReboot.EpisodeReboot()
         episode_reboot.load(
-           BACKEND(),
+           get_backend()(),
            data=episode,
            agent_path=os.path.join(agents_dir, episode.agent),
            name=episode.episode_name,
-           env_kwargs=params_for_reboot,
+           env_kwargs=get_params_for_reboot(),
         )
-        episode_reboot.env.set_thermal_limit(env.get_thermal_limit())
+        episode_reboot.env.set_thermal_limit(get_env().get_thermal_limit())
 
         obs_reboot, reward, *_ = episode_reboot.go_to(ts)
-        act = env.action_space.from_vect(np.array(store_data))
+        act = get_env().action_space.from_vect(np.array(store_data))
         #if self.obs_reboot is not None:
         if obs_reboot is not None:
             #obs, *_ = self.obs_reboot.simulate(action=act, time_step=0)
@@ -333,7 +324,7 @@ class Assist(BaseAssistant):
             obs.rho = (
                 obs.rho
                 * self.obs_reboot._obs_env.get_thermal_limit()
-                / env.get_thermal_limit()
+                / get_env().get_thermal_limit()
             )
             try:
                 network_graph_factory = PlotPlotly(
@@ -350,14 +341,14 @@ class Assist(BaseAssistant):
             return new_network_graph
 
     def store_to_kpis(self, store_data, episode, ts):
-        act = env.action_space.from_vect(np.array(store_data))
+        act = get_env().action_space.from_vect(np.array(store_data))
         if self.obs_reboot is not None:
             obs, reward, *_ = self.obs_reboot.simulate(action=act, time_step=0)
             # make sure rho is properly calibrated. Problem could be that obs_reboot thermal limits are not properly initialized
             obs.rho = (
                 obs.rho
                 * self.obs_reboot._obs_env.get_thermal_limit()
-                / env.get_thermal_limit()
+                / get_env().get_thermal_limit()
             )
         else:
             raise RuntimeError(
@@ -1,29 +1,67 @@
-from grid2op.MakeEnv import make
-from grid2op.Parameters import Parameters
+"""
+Environment of the simulation page, used to simulate actions from the
+observations of an episode.
+
+Making it takes a few seconds, so it is only made when first used.
+"""
+
+import threading
 
 from grid2viz.src.manager import env_path
 
-try:
-    from lightsim2grid.LightSimBackend import LightSimBackend
-    BACKEND = LightSimBackend
-except ModuleNotFoundError:
-    from grid2op.Backend import PandaPowerBackend
-    BACKEND = PandaPowerBackend
-
-p = Parameters()
-p.NO_OVERFLOW_DISCONNECTION = False
-env = make(
-    env_path,
-    backend=BACKEND(),
-    test=True,
-    param=p,
-
-)
-env.seed(0)
-params_for_runner = env.get_params_for_runner()
-params_to_fetch = ["init_grid_path"]
-params_for_reboot = {
-    key: value for key, value in params_for_runner.items() if key in params_to_fetch
-}
-params_for_reboot["parameters"] = p
+_env_lock = threading.Lock()
+_env = None
+_params_for_reboot = None
+
+
+def get_backend():
+    """
+    :return: The class of the backend of the environment, LightSimBackend if
+        lightsim2grid is installed, PandaPowerBackend otherwise
+    """
+    try:
+        from lightsim2grid.LightSimBackend import LightSimBackend
+
+        return LightSimBackend
+    except ModuleNotFoundError:
+        from grid2op.Backend import PandaPowerBackend
+
+        return PandaPowerBackend
+
+
+def _make_env():
+    global _env, _params_for_reboot
+    from grid2op.MakeEnv import make
+    from grid2op.Parameters import Parameters
+
+    p = Parameters()
+    p.NO_OVERFLOW_DISCONNECTION = False
+    env = make(
+        env_path,
+        backend=get_backend()(),
+        test=True,
+        param=p,
+    )
+    env.seed(0)
+    params_for_runner = env.get_params_for_runner()
+    params_to_fetch = ["init_grid_path"]
+    params_for_reboot = {
+        key: value for key, value in params_for_runner.items() if key in params_to_fetch
+    }
+    params_for_reboot["parameters"] = p
+    _params_for_reboot = params_for_reboot
+    _env = env
+
+
+def get_env():
+    """:return: The environment, made on the first call"""
+    with _env_lock:
+        if _env is None:
+            _make_env()
+    return _env
+
 
+def get_params_for_reboot():
+    """:return: The env_kwargs of EpisodeReboot.load, see get_env"""
+    get_env()
+    return _params_for_reboot
@@ -14,7 +14,7 @@ from grid2op.Episode import EpisodeReboot
 
 from grid2viz.src.manager import make_episode, make_network_agent_study
 from grid2viz.src.manager import make_network, agents_dir
-from grid2viz.src.simulation.reboot import env, params_for_reboot, BACKEND
+from grid2viz.src.simulation.reboot import get_backend, get_env, get_params_for_reboot
 from grid2viz.src.simulation.simulation_lyt import choose_tab_content
 from grid2viz.src.utils.serialization import NoIndent, MyEncoder
 from grid2viz.src.simulation.simulation_utils import action_dict_from_choose_tab
@@ -237,16 +237,16 @@ def register_callbacks_simulation(app, assistant):
 
         episode_reboot = EpisodeReboot.EpisodeReboot()
         episode_reboot.load(
-            BACKEND(),
+            get_backend()(),
             data=episode,
             agent_path=os.path.join(agents_dir, study_agent),
             name=episode.episode_name,
-            env_kwargs=params_for_reboot,
+            env_kwargs=get_params_for_reboot(),
         )
-        episode_reboot.env.set_thermal_limit(env.get_thermal_limit())
+        episode_reboot.env.set_thermal_limit(get_env().get_thermal_limit())
         obs, reward, *_ = episode_reboot.go_to(int(timestep))
-        #obs._obs_env.set_thermal_limit(env.get_thermal_limit())
-        act = env.action_space()
+        #obs._obs_env.set_thermal_limit(get_env().get_thermal_limit())
+        act = get_env().action_space()
 
         if not np.all(
             np.round(episode.observations[int(timestep)].a_or, 2)
@@ -474,11 +474,11 @@ def register_callbacks_simulation(app, assistant):
         if active_tab_choose_assist == "tab-choose-method":
             episode_reboot = EpisodeReboot.EpisodeReboot()
             episode_reboot.load(
-                BACKEND(),
+                get_backend()(),
                 data=episode,
                 agent_path=os.path.join(agents_dir, study_agent),
                 name=episode.episode_name,
-                env_kwargs=params_for_reboot,
+                env_kwargs=get_params_for_reboot(),
             )
             reward = f"0"
             rho_max = f"0"
@@ -488,13 +488,13 @@ def register_callbacks_simulation(app, assistant):
             if(ts<=0):
                 ts=1 #cannot reboot for ts<=0
 
-            episode_reboot.env.set_thermal_limit(env.get_thermal_limit())
+            episode_reboot.env.set_thermal_limit(get_env().get_thermal_limit())
             obs_reboot, reward, *_ = episode_reboot.go_to(int(ts))
             if not np.all(
                 np.round(episode.observations[int(ts)].a_or, 2) == np.round(obs_reboot.a_or, 2)
             ):
                 return reward, rho_max, nb_overflows, losses
-            act = env.action_space()
+            act = get_env().action_space()
             if actions:
                 for action in actions:
                     act.update(action)
@@ -0,0 +1,182 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Persistent catalog of the episodes of the agents.
+
+The summary of each episode read at startup (its meta, survival and attention
+score) is kept in a SQLite database under ``_cache``, along with the
+modification time of the directories it was read from. At the next startup,
+only the episodes whose directory changed are read again, and the scenarios
+of an agent are only listed again if its directory changed.
+"""
+
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+# To be increased whenever the tables below or the summary of an episode
+# change, so that the catalog is built again
+SCHEMA_VERSION = 1
+
+# Number of threads reading the logs of the episodes that changed, mostly
+# waiting for the filesystem
+MAX_WORKERS = 16
+
+TABLES = [
+    """CREATE TABLE IF NOT EXISTS agents (
+        agent TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS episodes (
+        agent TEXT NOT NULL,
+        scenario TEXT NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        meta TEXT NOT NULL,
+        survival INTEGER NOT NULL,
+        attention REAL,
+        PRIMARY KEY (agent, scenario)
+    )""",
+]
+
+
+def update_catalog(path, agents_dir, agents, read_episode):
+    """
+    Update the catalog with the episodes that changed since its last update,
+    and return all of them.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the SQLite database, ``":memory:"`` for a catalog not persisted
+    agents_dir: :class:`str`
+        Directory of the agents logs
+    agents: :class:`list`
+        Names of the agents
+    read_episode: callable
+        Function reading the summary of an episode from its directory:
+        its meta :class:`dict`, survival percentage and attention score or None.
+        The episodes that changed are read in parallel by a pool of threads.
+
+    Returns
+    -------
+    res: :class:`list`
+        ``(agent, scenario, meta, survival, attention)`` of each episode,
+        sorted by agent and scenario
+    """
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        # One transaction, other processes starting at the same time wait for it
+        with connection:
+            _create_tables(connection)
+            changed = []
+            agent_mtimes = {}
+            for agent in agents:
+                agent_mtimes[agent], agent_changed = _find_changed_episodes(
+                    connection, agents_dir, agent
+                )
+                changed += agent_changed
+            skipped = set()
+            with ThreadPoolExecutor(MAX_WORKERS) as pool:
+                summaries = pool.map(
+                    lambda episode: _read_episode(read_episode, *episode), changed
+                )
+                for (agent, scenario, _, mtime), summary in zip(changed, summaries):
+                    if summary is None:
+                        skipped.add(agent)
+                        continue
+                    meta, survival, attention = summary
+                    connection.execute(
+                        "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?)",
+                        (agent, scenario, mtime, json.dumps(meta), survival, attention),
+                    )
+            # The scenarios of an agent with an episode skipped are listed
+            # again at the next update, so that the episode is read then
+            connection.executemany(
+                "INSERT OR REPLACE INTO agents VALUES (?, ?)",
+                [item for item in agent_mtimes.items() if item[0] not in skipped],
+            )
+            connection.executemany(
+                "DELETE FROM agents WHERE agent = ?", [(agent,) for agent in skipped]
+            )
+            # Agents removed since the last update
+            placeholders = ",".join("?" * len(agents))
+            for table in ["agents", "episodes"]:
+                connection.execute(
+                    f"DELETE FROM {table} WHERE agent NOT IN ({placeholders})", agents
+                )
+        rows = connection.execute(
+            "SELECT agent, scenario, meta, survival, attention FROM episodes "
+            "ORDER BY agent, scenario"
+        ).fetchall()
+    finally:
+        connection.close()
+    return [
+        (agent, scenario, json.loads(meta), survival, attention)
+        for agent, scenario, meta, survival, attention in rows
+    ]
+
+
+def _create_tables(connection):
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        connection.execute("DROP TABLE IF EXISTS agents")
+        connection.execute("DROP TABLE IF EXISTS episodes")
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    for table in TABLES:
+        connection.execute(table)
+
+
+def _find_changed_episodes(connection, agents_dir, agent):
+    """
+    Forget the episodes of an agent removed since the last update, and return
+    the modification time of the agent directory and
+    ``(agent, scenario, path, mtime_ns)`` of the episodes added or changed.
+    """
+    agent_path = os.path.join(agents_dir, agent)
+    agent_mtime = os.stat(agent_path).st_mtime_ns
+    known = dict(
+        connection.execute(
+            "SELECT scenario, mtime_ns FROM episodes WHERE agent = ?", (agent,)
+        ).fetchall()
+    )
+    row = connection.execute(
+        "SELECT mtime_ns FROM agents WHERE agent = ?", (agent,)
+    ).fetchone()
+    if row is not None and row[0] == agent_mtime:
+        # No scenario added or removed
+        scenarios = list(known)
+    else:
+        scenarios = [
+            scenario
+            for scenario in os.listdir(agent_path)
+            if os.path.isdir(os.path.join(agent_path, scenario))
+        ]
+        removed = [(agent, scenario) for scenario in known if scenario not in scenarios]
+        connection.executemany(
+            "DELETE FROM episodes WHERE agent = ? AND scenario = ?", removed
+        )
+    changed = []
+    for scenario in scenarios:
+        scenario_path = os.path.join(agent_path, scenario)
+        try:
+            mtime = os.stat(scenario_path).st_mtime_ns
+        except FileNotFoundError:
+            connection.execute(
+                "DELETE FROM episodes WHERE agent = ? AND scenario = ?", (agent, scenario)
+            )
+            continue
+        if known.get(scenario) != mtime:
+            changed.append((agent, scenario, scenario_path, mtime))
+    return agent_mtime, changed
+
+
+def _read_episode(read_episode, agent, scenario, scenario_path, mtime):
+    try:
+        return read_episode(scenario_path)
+    except FileNotFoundError as e:
+        # Episode still being written, read at the next update
+        print(f"Skipping scenario {scenario} of agent {agent}: {e}")
+        return None
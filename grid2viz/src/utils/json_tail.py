@@ -0,0 +1,118 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Reading of the last record of a json list without parsing the whole file.
+
+Logs such as ``other_rewards.json`` hold one record per timestep, while only
+the last one is needed to summarize an episode. It is parsed from the end of
+the file, read by chunks growing until the record is found. Files whose end
+cannot be parsed alone are read by a streaming parse, record by record.
+"""
+
+import json
+import os
+
+# Size in bytes of the end of the file read first
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+def read_last_record(path, chunk_size=CHUNK_SIZE):
+    """
+    Read the last record of a file holding a json list.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        Path of the json file
+    chunk_size: :class:`int`
+        Size in bytes of the end of the file read first, doubled until the
+        last record is found
+
+    Returns
+    -------
+    res:
+        Last record of the list, None if the list is empty
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        read_size = chunk_size
+        while True:
+            offset = max(size - read_size, 0)
+            f.seek(offset)
+            tail = f.read().decode("utf-8", errors="replace")
+            found, record = _parse_last_record(tail)
+            if found:
+                return record
+            if offset == 0:
+                break
+            read_size *= 2
+    with open(path, encoding="utf-8") as f:
+        return _read_last_record_streaming(f, chunk_size)
+
+
+def _parse_last_record(tail):
+    """
+    Parse the last record of the end of a json list, returning whether it was
+    found and the record.
+    """
+    tail = tail.rstrip()
+    if not tail.endswith("]"):
+        return False, None
+    body = tail[:-1].rstrip()
+    if body.endswith("["):
+        # Empty list, if the bracket is not the end of a nested one
+        return body[:-1].rstrip() == "", None
+    end = len(body)
+    # From the end, the first opening brace whose object closes the list and
+    # follows a separator starts the last record. Records other than objects
+    # are left to the streaming parse.
+    start = body.rfind("{")
+    while start != -1:
+        try:
+            record, record_end = _decoder.raw_decode(body, start)
+        except ValueError:
+            pass
+        else:
+            if record_end == end and body[:start].rstrip()[-1:] in (",", "["):
+                return True, record
+        start = body.rfind("{", 0, start)
+    return False, None
+
+
+def _read_last_record_streaming(f, chunk_size):
+    """Parse a json list record by record, keeping only the last one."""
+    buffer = ""
+    started = False
+    record = None
+    eof = False
+    while True:
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != "[":
+                    raise ValueError("Expecting a json list")
+                buffer = buffer[1:]
+                started = True
+                continue
+            buffer = buffer.lstrip(", \t\r\n")
+            if buffer.startswith("]"):
+                return record
+            try:
+                record, end = _decoder.raw_decode(buffer)
+            except ValueError:
+                # Record not read completely yet
+                if eof:
+                    raise
+                break
+            buffer = buffer[end:]
+        if eof:
+            raise ValueError("Unterminated json list")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
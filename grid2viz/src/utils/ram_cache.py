@@ -0,0 +1,242 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+In memory cache of the episodes, bounded by a memory budget.
+
+The least recently used episodes are evicted first once the estimated size of
+the cached episodes exceeds the budget, except the pinned ones: the episodes
+of the reference and studied agents selected in the app, which are pinned
+for as long as they keep being used.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Time in seconds after which an unused pinned entry can be evicted again
+PIN_TTL = 30 * 60
+
+
+def estimate_size(value, depth=2, _seen=None):
+    """
+    Estimate the memory held by a cached value, without going through all the
+    python objects it refers to.
+
+    DataFrames and numpy arrays are counted from their buffers, memory-mapped
+    arrays are not counted, and the attributes of objects are summed up
+    down to a given depth. Objects referred to several times, e.g. the
+    observations of an episode and of its logs, are counted once.
+    Tables of an episode that are not read yet from the filesystem cache are
+    not counted.
+
+    Parameters
+    ----------
+    value:
+        Cached value, usually an
+        :class:`grid2viz.src.kpi.EpisodeAnalytics.EpisodeAnalytics`
+    depth: :class:`int`
+        Number of levels of dicts and objects whose content is counted
+
+    Returns
+    -------
+    res: :class:`int`
+        Estimated size in bytes
+    """
+    if _seen is None:
+        _seen = {}
+    if id(value) in _seen:
+        return 0
+    # Kept alive, so that the id of a temporary object is not reused
+    _seen[id(value)] = value
+    if isinstance(value, pd.DataFrame):
+        return int(value.index.memory_usage()) + sum(
+            estimate_size(column, _seen=_seen) for _, column in value.items()
+        )
+    if isinstance(value, pd.Series):
+        if _is_memory_mapped(value.values):
+            return 0
+        # Object columns only counted as pointers: deep=True is too slow to
+        # be run on each insertion
+        return int(value.memory_usage(index=False))
+    if _is_memory_mapped(value):
+        return 0
+    if hasattr(value, "nbytes"):
+        res = int(value.nbytes)
+        # Matrix of the vectors of a VectCollection, whose nbytes only counts
+        # the objects built so far
+        matrix = getattr(value, "collection", None)
+        if isinstance(matrix, np.ndarray):
+            res += estimate_size(matrix, _seen=_seen)
+        return res
+    if isinstance(value, (list, tuple)):
+        res = sys.getsizeof(value)
+        if value and hasattr(value[0], "to_vect"):
+            # Lists of grid2op observations or actions
+            return res + len(value) * value[0].to_vect().nbytes
+        return res + sum(sys.getsizeof(element) for element in value)
+    if depth == 0:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(element, depth - 1, _seen) for element in value.values()
+        )
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_size(vars(value), depth, _seen)
+    return sys.getsizeof(value)
+
+
+def _is_memory_mapped(value):
+    while isinstance(value, np.ndarray):
+        if isinstance(value, np.memmap):
+            return True
+        value = value.base
+    return False
+
+
+class RamCache:
+    """
+    Least recently used cache with a memory budget.
+
+    Parameters
+    ----------
+    max_bytes: :class:`int`
+        Budget of the cache in bytes, unlimited if None
+    pin_ttl: :class:`float`
+        Time in seconds during which a pinned entry stays pinned once last used
+    """
+
+    def __init__(self, max_bytes=None, pin_ttl=PIN_TTL):
+        self.max_bytes = max_bytes
+        self.pin_ttl = pin_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        # Entries inserted or used since the last estimate of their size
+        self._touched = set()
+        self._pins = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._touched.add(key)
+            if key in self._pins:
+                self._pins[key] = time.monotonic()
+            return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                return self[key]
+            except KeyError:
+                return default
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._touched.add(key)
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Remove an entry, e.g. whose logs changed, and return it."""
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._touched.discard(key)
+            return self._entries.pop(key, default)
+
+    def pin(self, key):
+        """
+        Keep an entry in the cache whatever the budget, until it is not used
+        for pin_ttl seconds.
+        """
+        with self._lock:
+            self._pins[key] = time.monotonic()
+
+    def unpin(self, key):
+        with self._lock:
+            self._pins.pop(key, None)
+
+    def is_pinned(self, key):
+        with self._lock:
+            last_use = self._pins.get(key)
+            if last_use is None:
+                return False
+            if time.monotonic() - last_use > self.pin_ttl:
+                del self._pins[key]
+                return False
+            return True
+
+    @property
+    def nbytes(self):
+        """Estimated size of the cached entries, as of the last insertion."""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def stats(self):
+        """
+        Counters of the cache.
+
+        Returns
+        -------
+        res: :class:`dict`
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "pinned": sum(self.is_pinned(key) for key in list(self._pins)),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._touched.clear()
+
+    def _evict(self):
+        # Entries grow once they are in the cache, e.g. when their tables are
+        # read from the filesystem cache, so the ones used since their last
+        # estimate are estimated again
+        for key in self._touched:
+            self._sizes[key] = estimate_size(self._entries[key])
+        self._touched.clear()
+        if self.max_bytes is None:
+            return
+        total = sum(self._sizes.values())
+        # The entry just inserted is kept even if it does not fit
+        for key in list(self._entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            if self.is_pinned(key):
+                continue
+            total -= self._sizes.pop(key)
+            del self._entries[key]
+            self._touched.discard(key)
+            self.evictions += 1
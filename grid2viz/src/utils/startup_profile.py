@@ -0,0 +1,141 @@
+# Copyright (C) 2021, RTE (http://www.rte-france.com/)
+# See AUTHORS.txt
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+Profile of the startup of the app, see the ``--profile-startup`` option.
+
+The steps of the startup are timed in the current process, while the import
+time of each package is measured in a child process run with
+``python -X importtime``, so that it does not depend on what the current
+process already imported.
+"""
+
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Time in seconds the app should take to serve the episodes page once started
+STARTUP_BUDGET = 1.0
+
+
+class StartupProfile:
+    """Duration of the steps of the startup, in the order they ran."""
+
+    def __init__(self):
+        self.steps = []
+
+    @contextmanager
+    def step(self, name):
+        beg = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - beg))
+
+    @property
+    def total(self):
+        return sum(duration for _, duration in self.steps)
+
+
+def parse_import_times(output):
+    """
+    Time spent importing each top level package, from the output of
+    ``python -X importtime``.
+
+    Parameters
+    ----------
+    output: :class:`str`
+        Standard error of the python process
+
+    Returns
+    -------
+    res: :class:`list`
+        ``(package, seconds)``, slowest first. The time of each module is its
+        own, without its imports, so that the times sum up to the total.
+    """
+    times = defaultdict(float)
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        if not self_time.strip().isdigit():
+            # Header
+            continue
+        times[name.strip().split(".")[0]] += int(self_time) * 1e-6
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)
+
+
+def import_times(module):
+    """
+    Import a module in a child process and measure the import time of each
+    package.
+
+    Parameters
+    ----------
+    module: :class:`str`
+        Name of the module, e.g. ``"grid2viz.app"``
+
+    Returns
+    -------
+    res: :class:`list`
+        See :func:`parse_import_times`
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr[-2000:]}")
+    return parse_import_times(process.stderr)
+
+
+def profile_startup(activate_simulation=False, n_packages=15):
+    """
+    Start the app without serving it, and print the time taken by each step
+    and the import time of the slowest packages.
+
+    Parameters
+    ----------
+    activate_simulation: :class:`bool`
+        Whether the beta features, e.g. the simulation page, are enabled
+    n_packages: :class:`int`
+        Number of packages whose import time is printed
+    """
+    profile = StartupProfile()
+    with profile.step("catalog of the agents (import grid2viz.src.manager)"):
+        from grid2viz.src import manager
+    with profile.step("import grid2viz.app"):
+        from grid2viz.app import app, define_layout_and_callbacks
+    with profile.step("layout and callbacks"):
+        define_layout_and_callbacks(activate_simulation=activate_simulation)
+    client = app.server.test_client()
+    with profile.step("index page"):
+        client.get("/")
+        client.get("/_dash-layout")
+        client.get("/_dash-dependencies")
+    with profile.step("episodes page layout"):
+        from grid2viz.src.episodes import episodes_lyt
+
+        episodes_lyt.layout()
+
+    width = max(len(name) for name, _ in profile.steps)
+    print("Startup steps:")
+    for name, duration in profile.steps:
+        print(f"  {name:<{width}}  {duration:6.2f} s")
+    status = "within" if profile.total <= STARTUP_BUDGET else "OVER"
+    print(
+        f"  {'total':<{width}}  {profile.total:6.2f} s, "
+        f"{status} the budget of {STARTUP_BUDGET:.1f} s"
+    )
+    print(f"  {len(manager.agents)} agents, {len(manager.scenarios)} scenarios")
+
+    print("Import time of the slowest packages, in a new process:")
+    packages = import_times("grid2viz.app")
+    for package, duration in packages[:n_packages]:
+        print(f"  {package:<30}  {duration:6.2f} s")
+    print(f"  {'total':<30}  {sum(duration for _, duration in packages):6.2f} s")
@@ -89,8 +89,9 @@ def test_navigation_scenario_1(dash_duo):
 
     ####
     #switch to page overview scenario
-    dash_duo.wait_for_element("#open_001")
-    dash_duo.multiple_click("#open_001", 1)
+    open_001 = 'button[id*=\'"scenario":"001"\']'
+    dash_duo.wait_for_element(open_001)
+    dash_duo.multiple_click(open_001, 1)
 
     if(dash_duo.wait_for_element("#scen_lbl",timeout=15).text==""):
         while (dash_duo.wait_for_element("#scen_lbl",timeout=15).text==""):
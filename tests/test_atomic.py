@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from grid2viz.src.kpi.atomic import atomic_path
+
+
+class TestAtomicPath(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "agent.dill.bz")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_file_replaced_once_written(self):
+        with open(self.path, "w") as f:
+            f.write("old")
+        with atomic_path(self.path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                f.write("new")
+            with open(self.path) as f:
+                self.assertEqual(f.read(), "old")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "new")
+        self.assertListEqual(os.listdir(self.dir.name), ["agent.dill.bz"])
+
+    def test_failed_write(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_path(self.path) as tmp_path:
+                with open(tmp_path, "w") as f:
+                    f.write("truncated")
+                raise RuntimeError
+        self.assertListEqual(os.listdir(self.dir.name), [])
+
+    def test_directory(self):
+        path = os.path.join(self.dir.name, "agent")
+        os.makedirs(path)
+        with open(os.path.join(path, "rho.npz"), "w") as f:
+            f.write("old")
+        with atomic_path(path, is_dir=True) as tmp_path:
+            with open(os.path.join(tmp_path, "load.npz"), "w") as f:
+                f.write("new")
+            # Still readable while the new one is written
+            self.assertListEqual(os.listdir(path), ["rho.npz"])
+        self.assertListEqual(os.listdir(path), ["load.npz"])
+        self.assertListEqual(os.listdir(self.dir.name), ["agent"])
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from grid2viz.src.kpi import cache_manifest
+
+
+class TestCacheManifest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.episode_path = os.path.join(self.dir.name, "000")
+        os.makedirs(self.episode_path)
+        for name in ["episode_meta.json", "observations.npz"]:
+            with open(os.path.join(self.episode_path, name), "w") as f:
+                f.write(name)
+        self.path = os.path.join(self.dir.name, "agent.manifest.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_up_to_date(self):
+        self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
+        cache_manifest.write_manifest(self.path, self.episode_path)
+        self.assertTrue(cache_manifest.is_up_to_date(self.path, self.episode_path))
+
+    def test_regenerated_logs(self):
+        cache_manifest.write_manifest(self.path, self.episode_path)
+        with open(os.path.join(self.episode_path, "observations.npz"), "a") as f:
+            f.write("more steps")
+        self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
+
+    def test_new_log_file(self):
+        cache_manifest.write_manifest(self.path, self.episode_path)
+        with open(os.path.join(self.episode_path, "other_rewards.json"), "w") as f:
+            f.write("[]")
+        self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
+
+    def test_schema_version(self):
+        cache_manifest.write_manifest(self.path, self.episode_path)
+        with mock.patch.object(
+            cache_manifest, "SCHEMA_VERSION", cache_manifest.SCHEMA_VERSION + 1
+        ):
+            self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
+
+    def test_truncated_entry(self):
+        entry_path = os.path.join(self.dir.name, "agent.dill.bz")
+        with open(entry_path, "w") as f:
+            f.write("episode")
+        cache_manifest.write_manifest(self.path, self.episode_path, [entry_path])
+        self.assertTrue(cache_manifest.is_up_to_date(self.path, self.episode_path))
+        with open(entry_path, "w") as f:
+            f.write("epi")
+        self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
+        os.remove(entry_path)
+        self.assertFalse(cache_manifest.is_up_to_date(self.path, self.episode_path))
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import unittest
+
+from grid2viz.src.kpi import card_summary
+
+
+class TestCardSummary(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "agent.card.json")
+        self.summary = {
+            "version": card_summary.SUMMARY_VERSION,
+            "prod_share": {
+                "labels": ["thermal", "gen_0"],
+                "values": [10.0, 10.0],
+                "parents": ["", "thermal"],
+                "colors": ["#ff0000", "#ff0000"],
+            },
+            "consumption": {
+                "timestamp": ["00:00:00", "00:05:00"],
+                **{stat: [1.0, 2.0] for stat in card_summary.PROFILE_STATS},
+            },
+            "total_maintenance_duration": 0.0,
+        }
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_roundtrip(self):
+        card_summary.save_card_summary(self.path, self.summary)
+        summary = card_summary.load_card_summary(self.path)
+        self.assertEqual(summary, self.summary)
+        self.assertEqual(len(card_summary.prod_share_trace(summary)), 1)
+        self.assertEqual(
+            len(card_summary.consumption_traces(summary)),
+            len(card_summary.PROFILE_STATS),
+        )
+
+    def test_missing_or_outdated(self):
+        self.assertIsNone(card_summary.load_card_summary(self.path))
+        with open(self.path, "w") as f:
+            f.write("{")
+        self.assertIsNone(card_summary.load_card_summary(self.path))
+        with open(self.path, "w") as f:
+            json.dump({**self.summary, "version": -1}, f)
+        self.assertIsNone(card_summary.load_card_summary(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from grid2viz.src.utils import catalog
+
+
+def read_episode(scenario_folder):
+    read_episode.calls.append(scenario_folder)
+    with open(os.path.join(scenario_folder, "episode_meta.json")) as f:
+        meta = json.load(f)
+    return meta, meta["nb_timestep_played"], None
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.agents_dir = self.dir.name
+        self.path = os.path.join(self.agents_dir, "catalog.sqlite")
+        for agent in ["agent_a", "agent_b"]:
+            for scenario in ["000", "001"]:
+                self.write_episode(agent, scenario, 10)
+        read_episode.calls = []
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_episode(self, agent, scenario, played):
+        scenario_folder = os.path.join(self.agents_dir, agent, scenario)
+        os.makedirs(scenario_folder, exist_ok=True)
+        with open(os.path.join(scenario_folder, "episode_meta.json"), "w") as f:
+            json.dump({"nb_timestep_played": played}, f)
+
+    def update(self, agents=("agent_a", "agent_b")):
+        return catalog.update_catalog(
+            self.path, self.agents_dir, list(agents), read_episode
+        )
+
+    def test_build(self):
+        episodes = self.update()
+        self.assertEqual(
+            [(agent, scenario) for agent, scenario, *_ in episodes],
+            [("agent_a", "000"), ("agent_a", "001"), ("agent_b", "000"), ("agent_b", "001")],
+        )
+        self.assertEqual(episodes[0][2:], ({"nb_timestep_played": 10}, 10, None))
+        self.assertEqual(len(read_episode.calls), 4)
+
+    def test_unchanged_episodes_not_read_again(self):
+        first = self.update()
+        read_episode.calls = []
+        self.assertEqual(self.update(), first)
+        self.assertEqual(read_episode.calls, [])
+
+    def test_incremental_update(self):
+        self.update()
+        read_episode.calls = []
+        self.write_episode("agent_a", "002", 5)
+        shutil.rmtree(os.path.join(self.agents_dir, "agent_b", "001"))
+        episodes = self.update()
+        self.assertEqual(
+            read_episode.calls, [os.path.join(self.agents_dir, "agent_a", "002")]
+        )
+        self.assertEqual(
+            [(agent, scenario) for agent, scenario, *_ in episodes],
+            [("agent_a", "000"), ("agent_a", "001"), ("agent_a", "002"), ("agent_b", "000")],
+        )
+
+    def test_removed_agent(self):
+        self.update()
+        episodes = self.update(agents=["agent_a"])
+        self.assertEqual({agent for agent, *_ in episodes}, {"agent_a"})
+
+    def test_incomplete_episode_skipped(self):
+        os.makedirs(os.path.join(self.agents_dir, "agent_a", "002"))
+        episodes = self.update()
+        self.assertNotIn("002", [scenario for _, scenario, *_ in episodes])
+
+        # Read once its meta is written, the agent directory being unchanged
+        self.write_episode("agent_a", "002", 5)
+        episodes = self.update()
+        self.assertIn(("agent_a", "002"), [(agent, scenario) for agent, scenario, *_ in episodes])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import gzip
+import os
+import pickle
+import tempfile
+import unittest
+
+from grid2viz.src.kpi import compression
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "episode.dill.bz")
+        self.value = {"rho": list(range(1000)), "name": "000"}
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        for codec in compression.available_codecs():
+            compression.dump(self.value, self.path, codec)
+            with open(self.path, "rb") as f:
+                self.assertEqual(compression.read_codec(f), codec)
+            self.assertEqual(compression.load(self.path), self.value)
+
+    def test_default_codec(self):
+        codec, level = compression.default_codec, compression.default_level
+        try:
+            compression.set_default("none")
+            compression.dump(self.value, self.path)
+            with open(self.path, "rb") as f:
+                self.assertEqual(compression.read_codec(f), "none")
+        finally:
+            compression.set_default(codec, level)
+
+    def test_files_without_header(self):
+        with gzip.open(self.path, "wb") as f:
+            pickle.dump(self.value, f, protocol=4)
+        self.assertEqual(compression.load(self.path), self.value)
+        with open(self.path, "wb") as f:
+            pickle.dump(self.value, f, protocol=4)
+        self.assertEqual(compression.load(self.path), self.value)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            compression.set_default("brotli")
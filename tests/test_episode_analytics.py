@@ -1,7 +1,12 @@
 import os
 import pathlib
+import pickle
+import tempfile
 import unittest
 
+import numpy as np
+import pandas as pd
+
 # We need to make this below so that the manager.py finds the config.ini
 os.environ["GRID2VIZ_ROOT"] = os.path.join(
     pathlib.Path(__file__).parent.absolute(), "data"
@@ -13,7 +18,9 @@ config_file_path = os.path.join(os.environ["GRID2VIZ_ROOT"], "config.ini")
 
 from grid2op.Episode.EpisodeData import EpisodeData
 from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
 from grid2viz.src.kpi.actions_model import get_action_per_line, get_action_per_sub
+from grid2viz.src.kpi.env_actions import env_action_events, env_actions
 
 
 class TestEpisodeAnalytics(unittest.TestCase):
@@ -44,6 +51,196 @@ class TestEpisodeAnalytics(unittest.TestCase):
             self.episode_analytics.action_data_table.distance[37:40].tolist(), [2, 2, 3]
         )
 
+    def test_observation_tables(self):
+        n_loads = self.episode_data.n_loads
+        n_prods = self.episode_data.n_prods
+        load = self.episode_analytics.load
+        production = self.episode_analytics.production
+        rho = self.episode_analytics.rho
+
+        self.assertEqual(len(load), len(self.episode_data.actions) * n_loads)
+        for time_step in [0, 1, 37]:
+            obs = self.episode_data.observations[time_step]
+            np.testing.assert_array_equal(
+                load.value[time_step * n_loads : (time_step + 1) * n_loads],
+                obs.load_p.astype("float32"),
+            )
+            np.testing.assert_array_equal(
+                production.value[time_step * n_prods : (time_step + 1) * n_prods],
+                obs.prod_p.astype("float32"),
+            )
+            np.testing.assert_array_equal(
+                rho.value[rho.time == time_step], obs.rho.astype("float16")
+            )
+            self.assertEqual(
+                load.timestamp[time_step * n_loads],
+                EpisodeAnalytics.timestamp(obs),
+            )
+
+    def test_flow_and_redispatch_tables(self):
+        flow_and_voltage = self.episode_analytics.flow_and_voltage_line
+        target_redispatch = self.episode_analytics.target_redispatch
+        actual_redispatch = self.episode_analytics.actual_redispatch
+
+        self.assertTrue((flow_and_voltage.dtypes == "float16").all())
+        self.assertTrue((target_redispatch.dtypes == "float32").all())
+        self.assertTrue((actual_redispatch.dtypes == "float32").all())
+
+        line_name = self.episode_data.line_names[3]
+        gen_name = self.episode_data.prod_names[1]
+        for time_step in [0, 37]:
+            obs = self.episode_data.observations[time_step]
+            self.assertEqual(
+                flow_and_voltage["or"]["active"][line_name][time_step],
+                obs.p_or[3].astype("float16"),
+            )
+            self.assertEqual(
+                flow_and_voltage["ex"]["voltage"][line_name][time_step],
+                obs.v_ex[3].astype("float16"),
+            )
+            self.assertEqual(
+                actual_redispatch[gen_name][time_step], obs.actual_dispatch[1]
+            )
+
+    def test_action_ids(self):
+        action_data_table = self.episode_analytics.action_data_table
+        actions = self.episode_data.actions
+        # Identical actions share the same id, ids follow first appearance and
+        # doing nothing has none
+        expected_ids = []
+        ids = {}
+        for time_step in range(len(actions)):
+            action = actions[time_step]
+            if not action:
+                expected_ids.append(None)
+            else:
+                key = (actions.collection[time_step] + 0.0).tobytes()
+                expected_ids.append(ids.setdefault(key, len(ids)))
+        self.assertIn(None, expected_ids)
+        self.assertListEqual(
+            [None if pd.isna(action_id) else action_id for action_id in action_data_table.action_id],
+            expected_ids,
+        )
+        for time_step in [0, 37]:
+            self.assertAlmostEqual(
+                action_data_table.redisp_impact[time_step],
+                round(self.episode_data.observations[time_step].actual_dispatch.sum(), 2),
+                places=2,
+            )
+
+    def test_topology_distances(self):
+        # 2 substations of 2 elements each, the last one a storage unit, 2 lines.
+        # Line 0 is disconnected, then switched back on while element 1 is set
+        # on bus 2, which is then changed back to bus 1
+        set_line_status = np.array([[-1, 0], [0, 0], [0, 0]])
+        switch_line_status = np.array([[False, False], [True, False], [False, False]])
+        set_bus = np.array([[0, 0, 0, 0], [0, 2, 0, 0], [0, 0, 0, 2]])
+        change_bus = np.zeros((3, 4), dtype=bool)
+        change_bus[2, 1] = True
+        self.assertListEqual(
+            EpisodeAnalytics.get_topology_distances(
+                np.array([True, True]),
+                set_line_status,
+                switch_line_status,
+                set_bus,
+                change_bus,
+                np.array([2, 2]),
+                np.array([True, True, True, False]),
+            ).tolist(),
+            [1, 1, 0],
+        )
+
+    def test_episode_reader(self):
+        episode_reader = EpisodeReader(
+            os.path.join(self.agents_path, self.agent_name), self.scenario_name
+        )
+        self.assertEqual(len(episode_reader.actions), len(self.episode_data.actions))
+        self.assertEqual(
+            len(episode_reader.observations), len(self.episode_data.observations)
+        )
+        np.testing.assert_array_equal(
+            episode_reader.observations[37].to_vect(),
+            self.episode_data.observations[37].to_vect(),
+        )
+
+        episode_analytics = EpisodeAnalytics(
+            episode_reader, self.scenario_name, self.agent_name
+        )
+        for table in ["load", "production", "rho", "action_data_table"]:
+            pd.testing.assert_frame_equal(
+                getattr(episode_analytics, table),
+                getattr(self.episode_analytics, table),
+            )
+
+    def test_env_actions(self):
+        episode_reader = EpisodeReader(
+            os.path.join(self.agents_path, "redispatching-baseline"), "000"
+        )
+        # Put line 3 in maintenance from time step 5 to 7
+        beg_, _, _ = episode_reader.env_actions.helper.get_indx_extract("_maintenance")
+        episode_reader.env_actions.collection[5:8, beg_ + 3] = 1
+        episode_analytics = EpisodeAnalytics(
+            episode_reader, "000", "redispatching-baseline"
+        )
+
+        maintenances = episode_analytics.maintenances
+        self.assertEqual(maintenances.value.dtype, bool)
+        self.assertEqual(len(maintenances), 10 * episode_reader.n_lines)
+        self.assertListEqual(
+            maintenances.timestep[maintenances.value].tolist(), [5, 6, 7]
+        )
+        self.assertListEqual(
+            maintenances.line_id[maintenances.value].tolist(), [3, 3, 3]
+        )
+        self.assertFalse(episode_analytics.hazards.value.any())
+        self.assertEqual(episode_analytics.nb_maintenances, 1)
+        self.assertEqual(episode_analytics.total_maintenance_duration, 15.0)
+
+        # Lines sorted by name, whatever the order of the rows
+        episode_analytics.maintenances = maintenances.sample(frac=1, random_state=0)
+        durations = env_actions(episode_analytics, which="maintenances", kind="dur")
+        self.assertListEqual(list(durations.index), sorted(episode_reader.line_names))
+        self.assertEqual(durations[episode_reader.line_names[3]], 3)
+        self.assertEqual(durations.sum(), 3)
+
+    def test_lazy_kpis(self):
+        self.assertNotIn("overflow_csr", vars(self.episode_analytics))
+        nb_maintenances = self.episode_analytics.nb_maintenances
+        self.assertIn("nb_maintenances", vars(self.episode_analytics))
+        # Neither the lazy KPIs nor the episode logs go in the main pickle
+        state = pickle.loads(pickle.dumps(self.episode_analytics)).__dict__
+        self.assertNotIn("nb_maintenances", state)
+        self.assertNotIn("_episode_data", state)
+
+        with tempfile.TemporaryDirectory() as kpi_cache_dir:
+            episode_reader = EpisodeReader(
+                os.path.join(self.agents_path, self.agent_name), self.scenario_name
+            )
+            episode_analytics = EpisodeAnalytics(
+                episode_reader, self.scenario_name, self.agent_name
+            )
+            episode_analytics.kpi_cache_dir = kpi_cache_dir
+            total_overflow_ts = episode_analytics.total_overflow_ts
+            episode_analytics.overflow_line_ids
+            # Computed and saved once for the three of them
+            self.assertListEqual(os.listdir(kpi_cache_dir), ["overflow_csr.bz"])
+
+            # A reloaded episode reads the saved KPI instead of recomputing it
+            reloaded = pickle.loads(pickle.dumps(episode_analytics))
+            reloaded.kpi_cache_dir = kpi_cache_dir
+            pd.testing.assert_frame_equal(reloaded.total_overflow_ts, total_overflow_ts)
+            self.assertEqual(reloaded.nb_maintenances, nb_maintenances)
+            self.assertEqual(len(os.listdir(kpi_cache_dir)), 2)
+
+    def test_env_action_events(self):
+        values = np.array([[1, 0, 0], [1, 0, 1], [0, 0, 1], [1, 0, 0], [1, 0, 1]])
+        nb_events, durations, intervals = env_action_events(values)
+        self.assertListEqual(nb_events.tolist(), [2, 0, 2])
+        self.assertListEqual(durations.tolist(), [4, 0, 3])
+        self.assertListEqual(
+            intervals.tolist(), [[0, 0, 2], [0, 3, 5], [2, 1, 3], [2, 4, 5]]
+        )
+
     def test_action_repartition(self):
         nb_actions = self.episode_analytics.action_data_table[
             ["action_line", "action_subs"]
@@ -101,6 +298,15 @@ class TestEpisodeAnalytics(unittest.TestCase):
             [1, 2, 2, 0, 3],
         )
 
+        total_overflow_ts = self.episode_analytics.total_overflow_ts
+        offsets = self.episode_analytics.overflow_line_offsets
+        line_ids = self.episode_analytics.overflow_line_ids
+        self.assertEqual(total_overflow_ts["value"].sum(), 38)
+        self.assertListEqual(total_overflow_ts["value"][:3].tolist(), [0, 1, 1])
+        # Only the line starting an overflow is listed
+        self.assertListEqual(line_ids[offsets[1] : offsets[2]].tolist(), [17])
+        self.assertListEqual(line_ids[offsets[2] : offsets[3]].tolist(), [])
+
     def test_alarm(self):
         self.agent_name = "alarm-baseline"
         self.scenario_name = "000"
@@ -118,4 +324,18 @@ class TestEpisodeAnalytics(unittest.TestCase):
         action_data_table=self.episode_analytics.action_data_table
 
         assert(action_data_table.is_alarm[action_data_table.is_alarm==True].count()==2)
-        assert(action_data_table.alarm_zone[2][0]=="whole_grid")
\ No newline at end of file
+        assert(action_data_table.alarm_zone[2][0]=="whole_grid")
+
+    def test_shared_spaces(self):
+        # Spaces are parsed once and shared by the episodes of all the agents
+        # run on the same environment
+        episode_reader = EpisodeReader(
+            os.path.join(self.agents_path, self.agent_name), "001"
+        )
+        self.episode_analytics.decorate_obs_act_spaces(
+            os.path.join(self.agents_path, "do-nothing-baseline")
+        )
+        self.assertIs(
+            self.episode_analytics.observation_space, episode_reader.observation_space
+        )
+        self.assertIs(self.episode_analytics.action_space, episode_reader.action_space)
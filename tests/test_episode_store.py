@@ -0,0 +1,138 @@
+import os
+import pathlib
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# We need to make this below so that the manager.py finds the config.ini
+os.environ["GRID2VIZ_ROOT"] = os.path.join(
+    pathlib.Path(__file__).parent.absolute(), "data"
+)
+
+agents_path = os.path.join(pathlib.Path(__file__).parent.absolute(), "data", "agents")
+
+from grid2viz.src.kpi import episode_store
+from grid2viz.src.kpi.EpisodeAnalytics import EpisodeAnalytics
+from grid2viz.src.kpi.episode_reader import EpisodeReader
+from grid2viz.src.utils.ram_cache import estimate_size
+
+TABLES = [
+    "load",
+    "production",
+    "rho",
+    "action_data_table",
+    "computed_reward",
+    "flow_and_voltage_line",
+    "target_redispatch",
+    "actual_redispatch",
+    "attacks_data_table",
+    "hazards",
+    "maintenances",
+]
+
+
+class TestEpisodeStore(unittest.TestCase):
+    def setUp(self):
+        self.agent_name = "greedy-baseline"
+        self.scenario_name = "000"
+        self.agent_path = os.path.join(agents_path, self.agent_name)
+        episode_reader = EpisodeReader(self.agent_path, self.scenario_name)
+        self.episode_analytics = EpisodeAnalytics(
+            episode_reader, self.scenario_name, self.agent_name
+        )
+        self.episode_analytics.decorate_light_without_reboot(episode_reader)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.cache_dir.name, self.agent_name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def load_episode(self):
+        episode = episode_store.load_episode(self.path)
+        episode.decorate_obs_act_spaces(self.agent_path)
+        return episode
+
+    def assert_same_episode(self, episode):
+        for table in TABLES:
+            pd.testing.assert_frame_equal(
+                getattr(episode, table), getattr(self.episode_analytics, table)
+            )
+        self.assertListEqual(
+            episode.action_data_table.subs_modified.tolist(),
+            self.episode_analytics.action_data_table.subs_modified.tolist(),
+        )
+        self.assertListEqual(episode.timestamps, self.episode_analytics.timestamps)
+        np.testing.assert_array_equal(
+            episode.line_names, self.episode_analytics.line_names
+        )
+        self.assertDictEqual(episode.meta, self.episode_analytics.meta)
+        self.assertEqual(len(episode.observations), len(self.episode_analytics.observations))
+        np.testing.assert_array_equal(
+            episode.observations[37].to_vect(),
+            self.episode_analytics.observations[37].to_vect(),
+        )
+
+    def test_round_trip(self):
+        episode_store.save_episode(self.path, self.episode_analytics)
+        self.assertTrue(episode_store.is_episode_store(self.path))
+        # Every attribute of the episode is saved without pickle
+        self.assertFalse(os.path.exists(os.path.join(self.path, "attributes.pkl")))
+        episode = self.load_episode()
+        # Object columns of dates are not turned into datetime64 columns
+        self.assertEqual(episode.load.timestamp.dtype, object)
+        self.assert_same_episode(episode)
+
+    def test_categorical_round_trip(self):
+        self.episode_analytics.optimize_memory_footprint()
+        episode_store.save_episode(self.path, self.episode_analytics)
+        episode = self.load_episode()
+        self.assertEqual(episode.rho.timestamp.dtype, "category")
+        self.assert_same_episode(episode)
+
+    def test_memory_mapped_tables(self):
+        episode_store.save_episode(self.path, self.episode_analytics, memory_map=True)
+        self.assertTrue(os.path.isdir(os.path.join(self.path, "rho")))
+        episode = self.load_episode()
+        self.assertEqual(estimate_size(episode.rho["value"]), 0)
+        self.assert_same_episode(episode)
+
+    def test_lazy_tables(self):
+        episode_store.save_episode(self.path, self.episode_analytics)
+        episode = self.load_episode()
+        self.assertNotIn("rho", vars(episode))
+        self.assertNotIn("observations", vars(episode))
+        self.assertEqual(len(episode.rho), len(self.episode_analytics.rho))
+        self.assertIn("rho", vars(episode))
+        self.assertNotIn("load", vars(episode))
+
+        # Tables not read yet are read before the episode is pickled
+        state = episode.__getstate__()
+        self.assertNotIn("_table_store", state)
+        pd.testing.assert_frame_equal(state["load"], self.episode_analytics.load)
+
+    def test_memory_mapped_observations(self):
+        # The observations of the reader are not built by the decoration
+        self.assertEqual(len(self.episode_analytics.observations._objects), 0)
+        episode_store.save_episode(self.path, self.episode_analytics)
+        self.assertEqual(len(self.episode_analytics.observations._objects), 0)
+
+        episode = self.load_episode()
+        observations = episode.observations
+        self.assertIsInstance(observations.collection, np.memmap)
+        for observation in observations:
+            pass
+        self.assertEqual(len(observations._objects), episode_store.MAX_OBJECTS)
+        np.testing.assert_array_equal(
+            observations[-1].to_vect(),
+            self.episode_analytics.observations[-1].to_vect(),
+        )
+
+        # Pickled episodes hold the observations themselves
+        unpickled = pickle.loads(pickle.dumps(self.episode_analytics))
+        self.assertIsInstance(unpickled.observations, list)
+        np.testing.assert_array_equal(
+            unpickled.observations[37].to_vect(), observations[37].to_vect()
+        )
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+from grid2viz.src.utils.json_tail import read_last_record
+
+AGENTS_DIR = os.path.join(os.path.dirname(__file__), "data", "agents")
+
+
+class TestJsonTail(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "other_rewards.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, content):
+        with open(self.path, "w", encoding="utf-8") as f:
+            if isinstance(content, str):
+                f.write(content)
+            else:
+                json.dump(content, f, indent=4)
+
+    def test_last_record(self):
+        records = [{"attention_score": i, "nested": {"step": [i, {}]}} for i in range(1000)]
+        self.write(records)
+        self.assertEqual(read_last_record(self.path), records[-1])
+        # Last record larger than the chunks read
+        self.assertEqual(read_last_record(self.path, chunk_size=8), records[-1])
+
+    def test_braces_in_strings(self):
+        records = [{"a": "}, {"}, {"b": "{ \"c\": 1 }, ["}]
+        self.write(records)
+        self.assertEqual(read_last_record(self.path, chunk_size=4), records[-1])
+
+    def test_empty_list(self):
+        self.write("[\n]\n")
+        self.assertIsNone(read_last_record(self.path))
+
+    def test_streaming_fallback(self):
+        self.write([{"a": 1}, [1, 2], 3])
+        self.assertEqual(read_last_record(self.path, chunk_size=2), 3)
+        self.write("{}")
+        with self.assertRaises(ValueError):
+            read_last_record(self.path)
+
+    def test_logs(self):
+        for agent in os.listdir(AGENTS_DIR):
+            if agent.startswith("_"):
+                continue
+            path = os.path.join(AGENTS_DIR, agent, "000", "other_rewards.json")
+            with open(path) as f:
+                expected = json.load(f)[-1]
+            self.assertEqual(read_last_record(path), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,11 @@ import pathlib
 import shutil
 import subprocess
 import unittest
-from grid2viz.src.manager import make_cache,scenarios,agents,n_cores,cache_dir,get_from_fs_cache
+from unittest import mock
+
+from grid2viz.src import manager
+from grid2viz.src.kpi import card_summary
+from grid2viz.src.manager import make_cache,scenarios,agents,n_cores,cache_dir,get_from_fs_cache,is_in_fs_cache,get_fs_card_summary_file
 
 
 # We need to make this below so that the manager.py finds the config.ini
@@ -25,6 +29,9 @@ class TestMakeCache(unittest.TestCase):
                 os.remove(cache_file_path)
             if os.path.exists(cache_file_path+".bz"):
                 os.remove(cache_file_path+".bz")
+            shutil.rmtree(os.path.join(self.agent_path, "_cache", scenario, self.agent), ignore_errors=True)
+            if os.path.exists(get_fs_card_summary_file(scenario, self.agent)):
+                os.remove(get_fs_card_summary_file(scenario, self.agent))
         #if os.path.isdir(os.path.join(self.agent_path, "_cache")):
         #    shutil.rmtree(os.path.join(self.agent_path, "_cache"))
 
@@ -36,6 +43,27 @@ class TestMakeCache(unittest.TestCase):
             print(e)
             assert(False)
 
+        for scenario in ["000","001"]:
+            self.assertTrue(is_in_fs_cache(scenario, self.agent))
+            # The cards of the episodes page are drawn without loading the episodes
+            summary = card_summary.load_card_summary(get_fs_card_summary_file(scenario, self.agent))
+            self.assertIsNotNone(summary)
+            self.assertEqual(len(summary["prod_share"]["labels"]), len(summary["prod_share"]["values"]))
+
+        # Episodes are saved with compact dtypes, and loaded as such
+        episode = get_from_fs_cache("000", self.agent)
+        self.assertEqual(episode.rho.value.dtype, "float16")
+        self.assertEqual(episode.load.equipment_name.dtype, "category")
+
+        # Entries already in cache are skipped by the next build
+        summary = make_cache(
+            scenarios, agents, 1, cache_dir,
+            agent_selection=[self.agent], scenario_selection=["000"],
+        )
+        self.assertListEqual(list(summary.index), [self.agent])
+        self.assertEqual(summary.loc[self.agent, "valid"], 1)
+        self.assertNotIn("built", summary.columns)
+
         #try to load one then
         #don't try it on circleci as we might not have had the rights to write the dill.file
         #try:
@@ -53,3 +81,11 @@ class TestMakeCache(unittest.TestCase):
         #self.assertEqual(rv.returncode, 0)
         #self.assertEqual(rv, 0)
 
+    def test_read_only_cache(self):
+        make_cache(scenarios, agents, 1, cache_dir, agent_selection=[self.agent], scenario_selection=["000"])
+        manager.store.pop(manager.make_ram_cache_id("000", self.agent))
+        # Neither the lock file nor the cache can be written
+        with mock.patch.object(manager, "open", side_effect=PermissionError, create=True):
+            with manager.fs_cache_lock("000", self.agent) as acquired:
+                self.assertTrue(acquired)
+            self.assertIsNotNone(manager.make_episode(self.agent, "000"))
@@ -0,0 +1,97 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grid2viz.src.utils.ram_cache import RamCache, estimate_size
+
+
+class Episode:
+    def __init__(self, n_rows):
+        self.rho = pd.DataFrame({"value": np.zeros(n_rows)})
+        self.timesteps = np.arange(n_rows)
+
+
+class Collection:
+    """Matrix of vectors, of which no object is built yet"""
+
+    nbytes = 0
+
+    def __init__(self, matrix):
+        self.collection = matrix
+
+
+class TestRamCache(unittest.TestCase):
+    def setUp(self):
+        self.episode_size = estimate_size(Episode(1000))
+        # Room for two episodes
+        self.cache = RamCache(max_bytes=int(2.5 * self.episode_size))
+
+    def test_estimate_size(self):
+        self.assertGreater(self.episode_size, 16000)
+        self.assertLess(self.episode_size, 20000)
+
+    def test_lru_eviction(self):
+        self.cache["a"] = Episode(1000)
+        self.cache["b"] = Episode(1000)
+        self.cache["a"]
+        self.cache["c"] = Episode(1000)
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertIn("c", self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertLessEqual(self.cache.nbytes, self.cache.max_bytes)
+
+    def test_pinned_entries(self):
+        self.cache.pin("a")
+        self.cache["a"] = Episode(1000)
+        self.cache["b"] = Episode(1000)
+        self.cache["c"] = Episode(1000)
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+
+        self.cache.pin_ttl = -1
+        self.cache["d"] = Episode(1000)
+        self.assertNotIn("a", self.cache)
+
+    def test_entry_larger_than_budget(self):
+        self.cache["a"] = Episode(10000)
+        self.assertIn("a", self.cache)
+
+    def test_pop(self):
+        self.cache["a"] = np.zeros(10)
+        self.assertEqual(len(self.cache.pop("a")), 10)
+        self.assertNotIn("a", self.cache)
+        self.assertEqual(self.cache.nbytes, 0)
+        self.assertIsNone(self.cache.pop("a"))
+
+    def test_counters(self):
+        self.cache["a"] = Episode(10)
+        self.assertIsNone(self.cache.get("b"))
+        self.cache.get("a")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        # Membership checks are neither hits nor misses
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_estimate_collections(self):
+        episode = Episode(1000)
+        episode.observations = Collection(np.zeros((100, 100)))
+        # Held by both the episode and its logs, counted once
+        episode.logs = Episode(0)
+        episode.logs.observations = episode.observations
+        self.assertGreater(estimate_size(episode), self.episode_size + 80000)
+        self.assertLess(estimate_size(episode), self.episode_size + 2 * 80000)
+
+    def test_estimate_used_entries(self):
+        self.cache.max_bytes = None
+        self.cache["a"] = Episode(10)
+        self.cache["b"] = Episode(10)
+        nbytes = self.cache.nbytes
+        # Entries grow once cached, and are estimated again once used
+        self.cache["a"].load = pd.DataFrame({"value": np.zeros(1000)})
+        self.cache["c"] = Episode(10)
+        self.assertGreater(self.cache.nbytes, nbytes + 8000)
@@ -0,0 +1,63 @@
+import os
+import pathlib
+import shutil
+import unittest
+from unittest import mock
+
+# We need to make this below so that the manager.py finds the config.ini
+os.environ["GRID2VIZ_ROOT"] = os.path.join(
+    pathlib.Path(__file__).parent.absolute(), "data"
+)
+
+from grid2viz.src import manager
+
+
+class TestRefreshCatalog(unittest.TestCase):
+    def setUp(self):
+        self.agent = "zz-copied-baseline"
+        self.agent_path = os.path.join(manager.agents_dir, self.agent)
+        shutil.rmtree(self.agent_path, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.agent_path, ignore_errors=True)
+        manager.refresh_catalog()
+
+    def test_new_agent(self):
+        agents = manager.agents
+        out_of = manager.best_agents["000"]["out_of"]
+        shutil.copytree(
+            os.path.join(manager.agents_dir, "greedy-baseline"), self.agent_path
+        )
+
+        changed = manager.refresh_catalog()
+        self.assertEqual(sorted(changed), [(self.agent, "000"), (self.agent, "001")])
+        # Same objects, imported by name by the pages
+        self.assertIs(manager.agents, agents)
+        self.assertIn(self.agent, manager.agents)
+        self.assertEqual(manager.best_agents["000"]["out_of"], out_of + 1)
+        self.assertIn(self.agent, manager.agent_scenario["000"])
+        self.assertEqual(sorted(manager.scenarios_agent[self.agent]), ["000", "001"])
+        self.assertIn(self.agent, manager.survival_df.columns)
+        self.assertEqual(manager.refresh_catalog(), [])
+
+        shutil.rmtree(self.agent_path)
+        manager.refresh_catalog()
+        self.assertNotIn(self.agent, manager.agents)
+        self.assertEqual(manager.best_agents["000"]["out_of"], out_of)
+
+
+    def test_background_tasks(self):
+        with mock.patch.object(manager, "watch_interval", 0), mock.patch.object(
+            manager, "rebuild_stale_fs_cache"
+        ) as rebuild, mock.patch.object(manager, "build_new_fs_cache_entries"):
+            (builds,) = manager.start_background_tasks()
+            builds.join(10)
+        self.assertTrue(manager.background_builds.is_set())
+        rebuild.assert_called_once()
+        if manager.fcntl is not None:
+            # Held by this process until it stops
+            self.assertIsNotNone(manager.background_lock_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
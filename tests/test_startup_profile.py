@@ -0,0 +1,43 @@
+import unittest
+
+from grid2viz.src.utils.startup_profile import (
+    StartupProfile,
+    import_times,
+    parse_import_times,
+)
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:      2000 |       2000 |     pandas._libs
+import time:      1000 |       3000 |   pandas
+import time:       500 |       3600 | grid2viz.app
+some other output
+"""
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_parse_import_times(self):
+        times = dict(parse_import_times(IMPORTTIME_OUTPUT))
+        self.assertEqual(set(times), {"_io", "pandas", "grid2viz"})
+        self.assertAlmostEqual(times["pandas"], 0.003)
+        self.assertAlmostEqual(times["grid2viz"], 0.0005)
+        self.assertEqual(parse_import_times(IMPORTTIME_OUTPUT)[0][0], "pandas")
+
+    def test_import_times(self):
+        self.assertIn("json", dict(import_times("json")))
+        with self.assertRaises(RuntimeError):
+            import_times("not_a_module")
+
+    def test_steps(self):
+        profile = StartupProfile()
+        with profile.step("first"):
+            pass
+        with self.assertRaises(ValueError):
+            with profile.step("failed"):
+                raise ValueError
+        self.assertEqual([name for name, _ in profile.steps], ["first", "failed"])
+        self.assertGreaterEqual(profile.total, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()